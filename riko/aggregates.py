@@ -0,0 +1,736 @@
+# -*- coding: utf-8 -*-
+# vim: sw=4:ts=4:expandtab
+"""
+riko.aggregates
+~~~~~~~~~~~~~~~
+Provides single pass hash aggregation
+
+Examples:
+    basic usage::
+
+        >>> from riko.aggregates import aggregate
+        >>>
+        >>> stream = [
+        ...     {'x': 'a', 'y': 1}, {'x': 'b', 'y': 2}, {'x': 'a', 'y': 3}]
+        >>> specs = [('count', None), ('sum', 'y'), ('max', 'y')]
+        >>> aggregate(stream, ['x'], specs) == {
+        ...     ('a',): [2, Decimal('4'), 3], ('b',): [1, Decimal('2'), 2]}
+        True
+
+Attributes:
+    AGGREGATORS (dict): The accumulator class of each aggregate
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals)
+
+import itertools as it
+
+from decimal import Decimal, InvalidOperation
+from hashlib import md5
+from math import ceil, log
+from random import random
+from struct import unpack
+
+from builtins import *  # noqa # pylint: disable=unused-import
+from meza.fntools import listize
+
+
+class Accumulator(object):
+    """Base class of the per group state of an aggregate. Accumulators of
+    chunks of a stream can be merged (in stream order) to get the state of
+    the whole stream.
+
+    Args:
+        field (str): The item attribute to aggregate (default: None)
+    """
+    __slots__ = ('field',)
+
+    def __init__(self, field=None):
+        self.field = field
+
+    def _get_slots(self):
+        classes = type(self).__mro__
+        return [s for c in classes for s in c.__dict__.get('__slots__', ())]
+
+    def __getstate__(self):
+        return [getattr(self, slot) for slot in self._get_slots()]
+
+    def __setstate__(self, state):
+        for slot, value in zip(self._get_slots(), state):
+            setattr(self, slot, value)
+
+
+class Count(Accumulator):
+    """Counts items
+
+    Examples:
+        >>> acc = Count()
+        >>> acc.add({'x': 'a'})
+        >>> acc.add({'x': 'b'})
+        >>> acc.value
+        2
+    """
+    __slots__ = ('count',)
+
+    def __init__(self, field=None):
+        super(Count, self).__init__(field)
+        self.count = 0
+
+    def add(self, item):
+        self.count += 1
+
+    def merge(self, other):
+        self.count += other.count
+
+    @property
+    def value(self):
+        return self.count
+
+
+class Sum(Accumulator):
+    """Sums a field as Decimals
+
+    Examples:
+        >>> acc = Sum('x')
+        >>> acc.add({'x': 1})
+        >>> acc.add({'x': '2.5'})
+        >>> acc.value == Decimal('3.5')
+        True
+    """
+    __slots__ = ('total',)
+
+    def __init__(self, field=None):
+        super(Sum, self).__init__(field)
+        self.total = Decimal(0)
+
+    def add(self, item):
+        self.total += Decimal(item[self.field])
+
+    def merge(self, other):
+        self.total += other.total
+
+    @property
+    def value(self):
+        return self.total
+
+
+class Mean(Accumulator):
+    """Averages a field as Decimals
+
+    Examples:
+        >>> acc = Mean('x')
+        >>> acc.value is None
+        True
+        >>> acc.add({'x': 1})
+        >>> acc.add({'x': '2'})
+        >>> acc.value == Decimal('1.5')
+        True
+    """
+    __slots__ = ('total', 'count')
+
+    def __init__(self, field=None):
+        super(Mean, self).__init__(field)
+        self.total = Decimal(0)
+        self.count = 0
+
+    def add(self, item):
+        self.total += Decimal(item[self.field])
+        self.count += 1
+
+    def merge(self, other):
+        self.total += other.total
+        self.count += other.count
+
+    @property
+    def value(self):
+        return self.total / self.count if self.count else None
+
+
+def get_rank(value):
+    """Gets the key `Min` and `Max` compare values by. `None` comes first,
+    followed by numeric values (including numeric strings) compared as
+    Decimals, then strings, and finally any other values (compared by their
+    type name and repr, since they may not be comparable with each other).
+
+    Examples:
+        >>> get_rank(None) < get_rank('9') < get_rank(10.5) < get_rank('a')
+        True
+        >>> get_rank('a') < get_rank({'x': 1}) < get_rank({'y': 1})
+        True
+    """
+    try:
+        number = Decimal(value)
+    except (InvalidOperation, TypeError, ValueError):
+        number = None
+
+    if value is None:
+        rank = (0,)
+    elif number is not None and not number.is_nan():
+        rank = (1, number)
+    elif isinstance(value, (str, bytes)):
+        rank = (2, type(value).__name__, value)
+    else:
+        rank = (3, type(value).__name__, repr(value))
+
+    return rank
+
+
+class Min(Accumulator):
+    """Finds the smallest value of a field (see `get_rank`)
+
+    Examples:
+        >>> acc = Min('x')
+        >>> acc.add({'x': 2})
+        >>> acc.add({'x': 1})
+        >>> acc.value
+        1
+        >>> acc = Min('x')
+        >>> for x in ('10', '9', '100'):
+        ...     acc.add({'x': x})
+        >>> acc.value == '9'
+        True
+        >>> acc = Min('x')
+        >>> for x in ('a', None):
+        ...     acc.add({'x': x})
+        >>> acc.value is None
+        True
+    """
+    __slots__ = ('value', 'rank', 'seen')
+
+    def __init__(self, field=None):
+        super(Min, self).__init__(field)
+        self.value = self.rank = None
+        self.seen = False
+
+    def add(self, item):
+        value = item[self.field]
+        rank = get_rank(value)
+
+        if not self.seen or rank < self.rank:
+            self.value, self.rank, self.seen = value, rank, True
+
+    def merge(self, other):
+        if other.seen:
+            self.add({self.field: other.value})
+
+
+class Max(Accumulator):
+    """Finds the largest value of a field (see `get_rank`)
+
+    Examples:
+        >>> acc = Max('x')
+        >>> acc.add({'x': 1})
+        >>> acc.add({'x': 2})
+        >>> acc.value
+        2
+        >>> acc = Max('x')
+        >>> for x in ('10', '9', '100'):
+        ...     acc.add({'x': x})
+        >>> acc.value == '100'
+        True
+        >>> acc = Max('x')
+        >>> for x in ('a', None, {'y': 1}):
+        ...     acc.add({'x': x})
+        >>> acc.value == {'y': 1}
+        True
+    """
+    __slots__ = ('value', 'rank', 'seen')
+
+    def __init__(self, field=None):
+        super(Max, self).__init__(field)
+        self.value = self.rank = None
+        self.seen = False
+
+    def add(self, item):
+        value = item[self.field]
+        rank = get_rank(value)
+
+        if not self.seen or rank > self.rank:
+            self.value, self.rank, self.seen = value, rank, True
+
+    def merge(self, other):
+        if other.seen:
+            self.add({self.field: other.value})
+
+
+class First(Accumulator):
+    """Keeps the first value of a field
+
+    Examples:
+        >>> acc = First('x')
+        >>> acc.add({'x': 1})
+        >>> acc.add({'x': 2})
+        >>> acc.value
+        1
+    """
+    __slots__ = ('value', 'seen')
+
+    def __init__(self, field=None):
+        super(First, self).__init__(field)
+        self.value = None
+        self.seen = False
+
+    def add(self, item):
+        if not self.seen:
+            self.value, self.seen = item[self.field], True
+
+    def merge(self, other):
+        if not self.seen:
+            self.value, self.seen = other.value, other.seen
+
+
+class Last(Accumulator):
+    """Keeps the last value of a field
+
+    Examples:
+        >>> acc = Last('x')
+        >>> acc.add({'x': 1})
+        >>> acc.add({'x': 2})
+        >>> acc.value
+        2
+    """
+    __slots__ = ('value', 'seen')
+
+    def __init__(self, field=None):
+        super(Last, self).__init__(field)
+        self.value = None
+        self.seen = False
+
+    def add(self, item):
+        self.value, self.seen = item[self.field], True
+
+    def merge(self, other):
+        if other.seen:
+            self.value, self.seen = other.value, other.seen
+
+
+class Distinct(Accumulator):
+    """Estimates the number of distinct values of a field with a HyperLogLog
+    sketch. It uses `2 ** precision` bytes, and the standard error of the
+    estimate is about `1.04 / sqrt(2 ** precision)`.
+
+    Args:
+        field (str): The item attribute to count the distinct values of
+        precision (int): The number of hash bits that pick a register (4 to
+            16, default: 12, i.e., 4 KiB and a 1.6% error)
+
+    Examples:
+        >>> acc = Distinct('x')
+        >>> for x in [1, 2, 1, 3]:
+        ...     acc.add({'x': x})
+        >>> acc.value
+        3
+    """
+    __slots__ = ('precision', 'registers')
+
+    def __init__(self, field=None, precision=12):
+        super(Distinct, self).__init__(field)
+
+        if not 4 <= precision <= 16:
+            raise ValueError('precision must be between 4 and 16.')
+
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, item):
+        digest = md5(repr(item[self.field]).encode('utf-8')).digest()
+        hashed = unpack(str('<Q'), digest[:8])[0]
+        bits = 64 - self.precision
+        index, rest = hashed >> bits, hashed & ((1 << bits) - 1)
+
+        # the position of the first 1 bit in the rest of the hash
+        rank = bits - rest.bit_length() + 1
+
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError('Can only merge sketches of the same precision.')
+
+        pairs = zip(self.registers, other.registers)
+        self.registers = bytearray(max(pair) for pair in pairs)
+
+    @property
+    def value(self):
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size ** 2 / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+
+        if zeros and estimate <= 2.5 * size:
+            # linear counting is more accurate for small cardinalities
+            estimate = size * log(size / zeros)
+
+        return int(round(estimate))
+
+
+class Quantile(Accumulator):
+    """Estimates a quantile of a field (as Decimals) with a KLL sketch. It
+    keeps O(k) values, and the rank error of the estimate is about `1.7 / k`.
+
+    Args:
+        field (str): The item attribute to get the quantile of
+        quantile (float): The quantile, e.g., 0.95 for the 95th percentile
+            (default: 0.5, i.e., the median)
+
+        k (int): The size of the largest compactor (default: 200)
+
+    Examples:
+        >>> acc = Quantile('x', 0.5)
+        >>> for x in [3, 1, 2, 5, 4]:
+        ...     acc.add({'x': x})
+        >>> acc.value == Decimal('3')
+        True
+    """
+    __slots__ = ('quantile', 'k', 'compactors', 'size', 'max_size')
+
+    def __init__(self, field=None, quantile=0.5, k=200):
+        super(Quantile, self).__init__(field)
+
+        if not 0 <= quantile <= 1:
+            raise ValueError('quantile must be between 0 and 1.')
+
+        self.quantile = quantile
+        self.k = k
+        self.compactors = []
+        self.size = 0
+        self._grow()
+
+    def _get_capacity(self, height):
+        depth = len(self.compactors) - height - 1
+        return int(ceil(self.k * (2 / 3) ** depth)) + 1
+
+    def _grow(self):
+        self.compactors.append([])
+        heights = range(len(self.compactors))
+        self.max_size = sum(map(self._get_capacity, heights))
+
+    def _compress(self):
+        while self.size >= self.max_size:
+            for height, compactor in enumerate(self.compactors):
+                if len(compactor) >= self._get_capacity(height):
+                    break
+
+            if height + 1 == len(self.compactors):
+                self._grow()
+
+            # keep every other value (from a random offset) at twice the
+            # weight, leaving an odd one out behind
+            compactor.sort()
+            leftover = [compactor.pop()] if len(compactor) % 2 else []
+            promoted = compactor[int(random() < 0.5)::2]
+            self.compactors[height + 1].extend(promoted)
+            self.compactors[height] = leftover
+            self.size -= len(compactor) - len(promoted)
+
+    def add(self, item):
+        self.compactors[0].append(Decimal(item[self.field]))
+        self.size += 1
+
+        if self.size >= self.max_size:
+            self._compress()
+
+    def merge(self, other):
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+
+        for compactor, values in zip(self.compactors, other.compactors):
+            compactor.extend(values)
+
+        self.size += other.size
+        self._compress()
+
+    @property
+    def value(self):
+        weighted = sorted(
+            (value, 2 ** height)
+            for height, compactor in enumerate(self.compactors)
+            for value in compactor)
+
+        total = sum(weight for _, weight in weighted)
+        target, cumulative = self.quantile * total, 0
+
+        for value, weight in weighted:
+            cumulative += weight
+
+            if cumulative >= target:
+                return value
+
+
+AGGREGATORS = {
+    'count': Count,
+    'sum': Sum,
+    'mean': Mean,
+    'min': Min,
+    'max': Max,
+    'first': First,
+    'last': Last,
+    'distinct': Distinct,
+    'quantile': Quantile,
+}
+
+
+def get_group_keys(group_key=None):
+    """Gets the list of item attributes to group by
+
+    Args:
+        group_key (str): The item attribute (or list of attributes) to group
+            by (default: None)
+
+    Returns:
+        List[str]: The group keys
+
+    Examples:
+        >>> get_group_keys()
+        []
+        >>> get_group_keys('x')
+        ['x']
+    """
+    return listize(group_key) if group_key else []
+
+
+def get_keyfunc(keys):
+    """Creates a function that gets the group an item belongs to
+
+    Args:
+        keys (List[str]): The item attributes to group by
+
+    Returns:
+        func: The key function. It returns a tuple of the item's values for
+            `keys`. Unhashable values are replaced with their repr.
+
+    Examples:
+        >>> get_keyfunc([])({'a': 1})
+        ()
+        >>> get_keyfunc(['a'])({'a': 1, 'b': 2})
+        (1,)
+        >>> get_keyfunc(['a', 'b'])({'a': 1, 'b': [2]})
+        (1, '[2]')
+    """
+    def get_value(item, key):
+        value = item.get(key)
+
+        try:
+            hash(value)
+        except TypeError:
+            value = repr(value)
+
+        return value
+
+    return lambda item: tuple(get_value(item, key) for key in keys)
+
+
+def accumulate(stream, keys, specs):
+    """Folds each item of a stream into its group's accumulators
+
+    Args:
+        stream (Iter[dict]): The source
+        keys (List[str]): The item attributes to group by
+        specs (List[tuple]): The aggregates to compute as (name, field)
+            pairs. `name` must be a key of AGGREGATORS. `field` is ignored by
+            'count'. Any other elements are passed on to the accumulator,
+            e.g., ('quantile', 'size', 0.95).
+
+    Returns:
+        dict: The accumulators of each group keyed by the tuple of the group's
+            values. If there are no `keys`, the one group is keyed by ().
+
+    Examples:
+        >>> stream = [{'x': 'a', 'y': 1}, {'x': 'b', 'y': 2}]
+        >>> groups = accumulate(stream, ['x'], [('min', 'y')])
+        >>> sorted(groups)
+        [('a',), ('b',)]
+        >>> groups[('b',)][0].value
+        2
+        >>> accumulate([], [], [('count', None)])[()][0].value
+        0
+    """
+    new_accs = lambda: [AGGREGATORS[spec[0]](*spec[1:]) for spec in specs]
+    get_key = lambda item: tuple(map(item.get, keys))
+    safe_key = get_keyfunc(keys)
+    groups = {} if keys else {(): new_accs()}
+
+    for item in stream:
+        key = get_key(item)
+
+        try:
+            accs = groups[key]
+        except KeyError:
+            accs = groups[key] = new_accs()
+        except TypeError:
+            # the item has an unhashable group value
+            key = safe_key(item)
+            accs = groups.setdefault(key, new_accs())
+
+        for acc in accs:
+            acc.add(item)
+
+    return groups
+
+
+def combine(partials):
+    """Merges the accumulators of chunks of a stream
+
+    Args:
+        partials (Iter[dict]): The output of `accumulate` for each chunk (in
+            stream order)
+
+    Returns:
+        dict: The accumulators of each group of the whole stream
+
+    Examples:
+        >>> chunks = [[{'x': 'a', 'y': 1}], [{'x': 'a', 'y': 3}]]
+        >>> partials = (accumulate(c, ['x'], [('mean', 'y')]) for c in chunks)
+        >>> combine(partials)[('a',)][0].value == Decimal('2')
+        True
+    """
+    groups = {}
+
+    for partial in partials:
+        for key, accs in partial.items():
+            try:
+                combined = groups[key]
+            except KeyError:
+                groups[key] = accs
+            else:
+                for acc, other in zip(combined, accs):
+                    acc.merge(other)
+
+    return groups
+
+
+def finalize(groups):
+    """Gets the aggregate values of accumulated groups
+
+    Args:
+        groups (dict): The output of `accumulate` or `combine`
+
+    Returns:
+        dict: The aggregate values of each group
+
+    Examples:
+        >>> groups = accumulate([{'y': 1}, {'y': 3}], [], [('max', 'y')])
+        >>> finalize(groups)
+        {(): [3]}
+    """
+    return {key: [acc.value for acc in accs] for key, accs in groups.items()}
+
+
+def aggregate(stream, keys, specs):
+    """Computes aggregates of a stream in a single pass. Only one set of
+    accumulators per group is held in memory.
+
+    Args:
+        stream (Iter[dict]): The source
+        keys (List[str]): The item attributes to group by
+        specs (List[tuple]): The aggregates to compute (see `accumulate`)
+
+    Returns:
+        dict: The aggregate values of each group keyed by the tuple of the
+            group's values
+
+    Examples:
+        >>> stream = ({'y': y} for y in range(5))
+        >>> aggregate(stream, [], [('mean', 'y')]) == {(): [Decimal('2')]}
+        True
+    """
+    return finalize(accumulate(stream, keys, specs))
+
+
+def gen_groups(groups, keys, assign):
+    """Converts aggregated groups into items, ordered by group
+
+    Args:
+        groups (dict): The output of `aggregate` for a single aggregate
+        keys (List[str]): The item attributes that were grouped by
+        assign (str): Attribute to assign the aggregate value to. Only used
+            if there are multiple `keys`.
+
+    Yields:
+        dict: an item per group. If grouping by one key, the item maps the
+            group's value to the aggregate value. Otherwise, the item holds
+            the group's values along with the aggregate value.
+
+    Examples:
+        >>> groups = {('b',): [1], ('a',): [2]}
+        >>> list(gen_groups(groups, ['x'], 'count')) == [{'a': 2}, {'b': 1}]
+        True
+        >>> groups = {('a', 1): [2]}
+        >>> items = gen_groups(groups, ['x', 'y'], 'count')
+        >>> next(items) == {'x': 'a', 'y': 1, 'count': 2}
+        True
+    """
+    try:
+        ordered = sorted(groups)
+    except TypeError:
+        # values of different types that can't be compared
+        ordered = list(groups)
+
+    for key in ordered:
+        value = groups[key][0]
+
+        if len(keys) == 1:
+            item = {key[0]: value}
+        else:
+            item = dict(zip(keys, key))
+            item[assign] = value
+
+        yield item
+
+
+def get_aggregate(stream, name, field=None, group_key=None, **kwargs):
+    """Computes a single aggregate of a stream the way the aggregator pipes
+    report it
+
+    Args:
+        stream (Iter[dict]): The source
+        name (str): The aggregate, e.g., 'sum'. Must be a key of AGGREGATORS.
+        field (str): The item attribute to aggregate (default: None)
+        group_key (str): The item attribute (or list of attributes) to group
+            by (default: None)
+
+        kwargs (dict): Keyword arguments
+
+    Kwargs:
+        assign (str): Attribute to assign the aggregate value to (default:
+            None)
+
+        params (tuple): Other arguments of the aggregate's accumulator
+            (default: ()).
+
+        partials (Iter[dict]): Accumulators of chunks of the stream that were
+            aggregated elsewhere, e.g., by workers (default: None). They're
+            merged with the accumulators of `stream`.
+
+    Returns:
+        mixed: The output either a dict (if not grouping) or an iterator of
+            dicts (one per group)
+
+    Examples:
+        >>> stream = [{'x': 'a', 'y': 1}, {'x': 'b', 'y': 2}]
+        >>> get_aggregate(stream, 'max', 'y', assign='max')
+        {'max': 2}
+        >>> next(get_aggregate(stream, 'max', 'y', 'x')) == {'a': 1}
+        True
+        >>> partials = [accumulate(stream, [], [('max', 'y')])]
+        >>> get_aggregate([], 'max', 'y', assign='max', partials=partials)
+        {'max': 2}
+    """
+    keys = get_group_keys(group_key)
+    spec = (name, field) + tuple(kwargs.get('params', ()))
+    groups = accumulate(stream, keys, [spec])
+    partials = kwargs.get('partials')
+    assign = kwargs.get('assign')
+
+    if partials is not None:
+        groups = combine(it.chain([groups], partials))
+
+    values = finalize(groups)
+
+    if keys:
+        aggregated = gen_groups(values, keys, assign)
+    else:
+        aggregated = {assign: values[()][0]}
+
+    return aggregated
@@ -10,16 +10,23 @@ from __future__ import (
 
 import pygogo as gogo
 
+from hashlib import md5
 from itertools import chain
 from html.parser import HTMLParser
 
 from builtins import *  # noqa # pylint: disable=unused-import
-from meza.compat import decode
+from meza.compat import decode, encode
+from mezmorize import get_cache
 from riko.utils import fetch
-from riko.bado import coroutine, return_value, microdom
-from riko.bado.io import async_url_open
+from riko.bado import coroutine, return_value
+from riko.bado.util import async_parse_elements
 
 TIMEOUT = 10
+
+# discovered feed urls are cached for a day
+CACHE_TIMEOUT = 24 * 60 * 60
+CACHES = {}
+
 logger = gogo.Gogo(__name__, monolog=True).logger
 
 
@@ -27,9 +34,12 @@ class LinkParser(HTMLParser):
     def reset(self):
         HTMLParser.reset(self)
         self.entry = iter([])
+        self.done = False
 
     def handle_starttag(self, tag, attrs):
-        entry = dict(attrs)
+        # feed links live in the head
+        self.done = self.done or tag == 'body'
+        entry = {} if self.done else dict(attrs)
         alternate = entry.get('rel') == 'alternate'
         rss = 'rss' in entry.get('type', '')
 
@@ -38,27 +48,41 @@ class LinkParser(HTMLParser):
             entry['tag'] = tag
             self.entry = chain(self.entry, [entry])
 
+    def handle_endtag(self, tag):
+        self.done = self.done or tag == 'head'
+
 
 def file2entries(f, parser):
-    for line in f:
-        parser.feed(decode(line))
+    try:
+        for line in f:
+            parser.feed(decode(line))
 
-        for entry in parser.entry:
-            yield entry
+            for entry in parser.entry:
+                yield entry
+
+            if parser.done:
+                break
+    finally:
+        # stop downloading the rest of the page
+        f.close() if hasattr(f, 'close') else None
+
+
+def node2entry(node):
+    entry = getattr(node, 'attributes', None) or {}
+    alternate = entry.get('rel') == 'alternate'
+    rss = 'rss' in entry.get('type', '')
+
+    if (alternate or rss) and 'href' in entry:
+        entry['link'] = entry['href']
+        entry['tag'] = node.nodeName
+        return entry
 
 
 def doc2entries(document):
     for node in document.childNodes:
-        if hasattr(node, 'attributes') and node.attributes:
-            entry = node.attributes
-            alternate = entry.get('rel') == 'alternate'
-            rss = 'rss' in entry.get('type', '')
-        else:
-            alternate = rss = None
+        entry = node2entry(node)
 
-        if (alternate or rss) and 'href' in entry:
-            entry['link'] = entry['href']
-            entry['tag'] = node.nodeName
+        if entry:
             yield entry
 
     for node in document.childNodes:
@@ -66,18 +90,137 @@ def doc2entries(document):
             yield entry
 
 
+def _get_cache(cache_type):
+    # reuse caches so that in-process ('simple') caches stay warm
+    if cache_type not in CACHES:
+        CACHES[cache_type] = get_cache(cache_type=cache_type)
+
+    return CACHES[cache_type]
+
+
+def get_cache_key(url):
+    return 'autorss_%s' % md5(encode(url)).hexdigest()
+
+
+def get_cache_kwargs(objconf):
+    """Get the `get_rss` cache options from a pipe configuration
+
+    Args:
+        objconf (obj): The pipe configuration (an Objectify instance)
+
+    Returns:
+        dict: The cache options
+
+    Examples:
+        >>> from meza.fntools import Objectify
+        >>>
+        >>> get_cache_kwargs(Objectify({'memoize': True}))
+        {'cache_type': 'auto'}
+        >>> get_cache_kwargs(Objectify({'memoize': False}))
+        {}
+    """
+    kwargs = {}
+
+    if objconf.memoize:
+        kwargs['cache_type'] = objconf.cache_type or 'auto'
+
+    if objconf.memoize and objconf.cache_timeout:
+        kwargs['cache_timeout'] = objconf.cache_timeout
+
+    return kwargs
+
+
 @coroutine
-def async_get_rss(url, convert_charrefs=False):
+def async_get_rss(url, convert_charrefs=False, cache_type=None, **kwargs):
+    """Asynchronously finds the feeds linked to in a web page's head
+
+    Args:
+        url (str): The web page url (or content)
+        convert_charrefs (bool): Unused (kept for parity with `get_rss`)
+        cache_type (str): The `mezmorize` cache type used to store the
+            discovered feeds (default: None, i.e., don't cache).
+
+        kwargs (dict): Keyword arguments
+
+    Kwargs:
+        cache_timeout (int): Number of seconds to cache the discovered feeds
+            (default: `CACHE_TIMEOUT`)
+
+    Returns:
+        Deferred: twisted.internet.defer.Deferred iterator of link entries
+    """
+    cache = _get_cache(cache_type) if cache_type else None
+    key = get_cache_key(url) if cache else None
+    entries = cache.get(key) if cache else None
+
+    if entries is not None:
+        return_value(iter(entries))
+
+    timeout = kwargs.get('cache_timeout', CACHE_TIMEOUT)
+    entries = []
+
+    def callback(node):
+        entry = node2entry(node)
+        entries.append(entry) if entry else None
+
+        # feed links live in the head, so stop reading once it closes
+        return node.nodeName.lower() == 'head'
+
+    # entries are found as soon as each tag closes instead of after the
+    # entire page has been parsed
+    kwargs = {'xml': False, 'callback': callback, 'timeout': TIMEOUT}
+
     try:
-        f = yield async_url_open(url, timeout=TIMEOUT)
+        yield async_parse_elements(url, '*', **kwargs)
     except ValueError:
         f = filter(None, url.splitlines())
+        yield async_parse_elements(f, '*', **kwargs)
 
-    document = microdom.parse(f, lenient=True)
-    return_value(doc2entries(document))
+    if cache:
+        cache.set(key, entries, timeout=timeout)
 
+    return_value(iter(entries))
+
+
+def get_rss(url, convert_charrefs=False, cache_type=None, **kwargs):
+    """Finds the feeds linked to in a web page's head. The page is only read
+    up to the end of its head.
+
+    Args:
+        url (str): The web page url (or content)
+        convert_charrefs (bool): Convert entity and character references
+            (default: False)
+
+        cache_type (str): The `mezmorize` cache type used to store the
+            discovered feeds, e.g., 'auto', 'simple', 'filesystem', or
+            'redis' (default: None, i.e., don't cache).
+
+        kwargs (dict): Keyword arguments
+
+    Kwargs:
+        cache_timeout (int): Number of seconds to cache the discovered feeds
+            (default: `CACHE_TIMEOUT`)
+
+    Returns:
+        Iter[dict]: The link entries
+
+    Examples:
+        >>> from riko import get_path
+        >>> from riko.utils import get_abspath
+        >>>
+        >>> url = get_abspath(get_path('cnn.html'))
+        >>> [e['link'] for e in get_rss(url, cache_type='simple')]
+        ['http://rss.cnn.com/rss/edition.rss']
+        >>> [e['link'] for e in _get_cache('simple').get(get_cache_key(url))]
+        ['http://rss.cnn.com/rss/edition.rss']
+    """
+    cache = _get_cache(cache_type) if cache_type else None
+    key = get_cache_key(url) if cache else None
+    entries = cache.get(key) if cache else None
+
+    if entries is not None:
+        return iter(entries)
 
-def get_rss(url, convert_charrefs=False):
     try:
         parser = LinkParser(convert_charrefs=convert_charrefs)
     except TypeError:
@@ -88,4 +231,11 @@ def get_rss(url, convert_charrefs=False):
     except ValueError:
         f = filter(None, url.splitlines())
 
-    return file2entries(f, parser)
+    entries = file2entries(f, parser)
+
+    if cache:
+        entries = list(entries)
+        timeout = kwargs.get('cache_timeout', CACHE_TIMEOUT)
+        cache.set(key, entries, timeout=timeout)
+
+    return iter(entries)
@@ -17,13 +17,14 @@ from __future__ import (
 import pygogo as gogo
 
 from io import open
+from functools import partial
 from tempfile import NamedTemporaryFile
 from os import remove
 
 from builtins import *  # noqa # pylint: disable=unused-import
 from meza.compat import encode
 
-from . import coroutine, return_value
+from . import coroutine, return_value, requests as treq
 
 try:
     from twisted.test.proto_helpers import AccumulatingProtocol
@@ -35,9 +36,14 @@ else:
     from twisted.web.client import getPage, downloadPage
     from twisted.test.proto_helpers import StringTransport
 
+CHUNK_SIZE = 2 ** 14
 logger = gogo.Gogo(__name__, monolog=True).logger
 
 
+class StopFeed(Exception):
+    pass
+
+
 # http://stackoverflow.com/q/26314586/408556
 # http://stackoverflow.com/q/8157197/408556
 # http://stackoverflow.com/a/33708936/408556
@@ -127,3 +133,79 @@ def async_url_read(url, timeout=0, **kwargs):
         content = async_read_file(url, StringTransport(), **kwargs)
 
     return content
+
+
+def is_done(protocol):
+    return getattr(protocol, 'done', False)
+
+
+def feed_chunks(chunks, protocol):
+    """Feeds chunks to `protocol.dataReceived` until the protocol is done"""
+    for chunk in chunks:
+        protocol.dataReceived(chunk)
+
+        if is_done(protocol):
+            break
+
+
+@coroutine
+def feed_response(response, protocol):
+    """Feeds a treq response body to `protocol.dataReceived` as it arrives,
+    and drops the connection once the protocol is done
+    """
+    def collect(chunk):
+        protocol.dataReceived(chunk)
+
+        if is_done(protocol):
+            # makes treq drop the connection
+            raise StopFeed()
+
+    try:
+        yield treq.collect(response, collect)
+    except StopFeed:
+        pass
+
+
+@coroutine
+def async_feed(source, protocol, timeout=0, chunksize=CHUNK_SIZE, **kwargs):
+    """Feeds the content of a source to `protocol.dataReceived` chunk by chunk
+    as it arrives (rather than after the entire source has been read).
+
+    Args:
+        source (str): A url, file like object, treq response, or iterable of
+            chunks.
+
+        protocol (obj): A twisted.internet.protocol.Protocol instance
+        timeout (int): Http request timeout (default: 0, i.e., None)
+        chunksize (int): Number of bytes to read at a time from files
+            (default: 16384).
+
+        kwargs (dict): Keyword arguments passed to `treq.get`, e.g., `params`
+
+    Returns:
+        Deferred: twisted.internet.defer.Deferred protocol (after its
+            connection has been lost)
+
+    Notes:
+        Reading stops (and http connections are closed) as soon as the
+        protocol sets its `done` attribute.
+    """
+    protocol.makeConnection(None)
+
+    if source and hasattr(source, 'startswith') and source.startswith('http'):
+        kwargs['timeout'] = timeout or None
+        source = yield treq.get(source, **kwargs)
+
+    if hasattr(source, 'deliverBody'):
+        yield feed_response(source, protocol)
+    elif hasattr(source, 'read'):
+        chunks = iter(lambda: source.read(chunksize) or None, None)
+        feed_chunks(chunks, protocol)
+    elif hasattr(source, 'startswith'):
+        with open(source.replace('file://', ''), 'rb') as f:
+            feed_chunks(iter(partial(f.read, chunksize), b''), protocol)
+    else:
+        feed_chunks(source, protocol)
+
+    protocol.connectionLost(None)
+    return_value(protocol)
@@ -30,20 +30,26 @@ from builtins import *  # noqa # pylint: disable=unused-import
 
 from meza.compat import encode, decode
 
-try:
-    from twisted.python.util import InsensitiveDict
-except ImportError:
-    pass
-
 from .sux import XMLParser, ParseError
 from riko.utils import invert_dict
 from riko.parsers import ESCAPE, entity2text, text2entity
 from meza.process import merge
 
+try:
+    from sys import intern
+except ImportError:
+    # python 2 can't intern unicode
+    intern = lambda text: text
+
 HTML_ESCAPE_CHARS = {'&amp;', '&lt;', '&gt;', '&quot;'}
 entity_prog = re.compile('&(.*?);')
 escape_prog = re.compile("['%s']" % ''.join(ESCAPE))
 
+# read-only stand-ins for the (lazily created) child lists and attribute dicts
+# of nodes that don't have any
+NO_CHILDREN = ()
+NO_ATTRIBUTES = {}
+
 
 def unescape(text):
     def repl(matchobj):
@@ -108,6 +114,64 @@ def get_element_by_id(nodes, node_id):
             return get_element_by_id(node.childNodes, node_id)
 
 
+def _lower(key):
+    return key.lower() if isinstance(key, str) else key
+
+
+class InsensitiveDict(dict):
+    """A case insensitive dict. Keys are stored lower cased, so unlike
+    twisted's version, this doesn't keep a (key, value) tuple per item.
+
+    Examples:
+        >>> attrs = InsensitiveDict({'HREF': 'a'})
+        >>> attrs['href'], attrs.get('Href'), 'hReF' in attrs
+        ('a', 'a', True)
+        >>> attrs
+        InsensitiveDict({'href': 'a'})
+    """
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self)
+        self.update(*args, **kwargs)
+
+    def __getitem__(self, key):
+        return dict.__getitem__(self, _lower(key))
+
+    def __setitem__(self, key, value):
+        key = _lower(key)
+        key = intern(key) if isinstance(key, str) else key
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, _lower(key))
+
+    def __contains__(self, key):
+        return dict.__contains__(self, _lower(key))
+
+    def __repr__(self):
+        return 'InsensitiveDict(%s)' % dict.__repr__(self)
+
+    def get(self, key, default=None):
+        return dict.get(self, _lower(key), default)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+
+        return self[key]
+
+    def pop(self, key, *args):
+        return dict.pop(self, _lower(key), *args)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def copy(self):
+        return InsensitiveDict(self)
+
+
 class MismatchedTags(Exception):
     def __init__(self, *args):
         (
@@ -121,11 +185,23 @@ class MismatchedTags(Exception):
 
 
 class Node(object):
+    __slots__ = ('parentNode', '_childNodes')
     nodeName = "Node"
 
     def __init__(self, parentNode=None):
         self.parentNode = parentNode
-        self.childNodes = []
+        self._childNodes = None
+
+    @property
+    def childNodes(self):
+        if self._childNodes is None:
+            self._childNodes = []
+
+        return self._childNodes
+
+    @childNodes.setter
+    def childNodes(self, childNodes):
+        self._childNodes = childNodes
 
     def isEqualToNode(self, other):
         """
@@ -136,10 +212,13 @@ class Node(object):
         @type other: L{Node}
         @rtype: C{bool}
         """
-        if len(self.childNodes) != len(other.childNodes):
+        children = self._childNodes or NO_CHILDREN
+        other_children = other._childNodes or NO_CHILDREN
+
+        if len(children) != len(other_children):
             return False
 
-        for a, b in zip(self.childNodes, other.childNodes):
+        for a, b in zip(children, other_children):
             if not a.isEqualToNode(b):
                 return False
 
@@ -163,7 +242,10 @@ class Node(object):
         raise NotImplementedError()
 
     def hasChildNodes(self):
-        return self.childNodes
+        return bool(self._childNodes)
+
+    def hasAttributes(self):
+        return False
 
     def appendChild(self, child):
         """
@@ -215,8 +297,8 @@ class Node(object):
         if not isinstance(child, Node):
             raise TypeError("expected Node instance")
 
-        if child in self.childNodes:
-            self.childNodes.remove(child)
+        if self._childNodes and child in self._childNodes:
+            self._childNodes.remove(child)
             child.parentNode = None
 
         return child
@@ -325,10 +407,17 @@ class Document(Node):
 
 
 class EntityReference(Node):
+    __slots__ = ('eref',)
+
     def __init__(self, eref, parentNode=None):
         Node.__init__(self, parentNode)
         self.eref = eref
-        self.nodeValue = self.data = "&" + eref + ";"
+
+    @property
+    def nodeValue(self):
+        return "&" + self.eref + ";"
+
+    data = nodeValue
 
     def isEqualToEntityReference(self, n):
         if not isinstance(n, EntityReference):
@@ -345,9 +434,19 @@ class EntityReference(Node):
 
 
 class CharacterData(Node):
+    __slots__ = ('data',)
+
     def __init__(self, data, parentNode=None):
         Node.__init__(self, parentNode)
-        self.value = self.data = self.nodeValue = data
+        self.data = data
+
+    def get_data(self):
+        return self.data
+
+    def set_data(self, data):
+        self.data = data
+
+    value = nodeValue = property(get_data, set_data)
 
     def isEqualToCharacterData(self, n):
         return self.value == n.value
@@ -357,6 +456,8 @@ class CharacterData(Node):
 
 class Comment(CharacterData):
     """A comment node"""
+    __slots__ = ()
+
     def writexml(self, stream, *args, **kwargs):
         val = encode(self.data)
         stream.write("<!--%s-->" % val)
@@ -366,6 +467,8 @@ class Comment(CharacterData):
 
 
 class Text(CharacterData):
+    __slots__ = ('raw',)
+
     def __init__(self, data, parentNode=None, raw=0):
         CharacterData.__init__(self, data, parentNode)
         self.raw = raw
@@ -398,6 +501,8 @@ class Text(CharacterData):
 
 
 class CDATASection(CharacterData):
+    __slots__ = ()
+
     def cloneNode(self, deep=0, parent=None):
         return CDATASection(self.nodeValue, parent)
 
@@ -409,10 +514,21 @@ class CDATASection(CharacterData):
 
 class _Attr(CharacterData):
     "Support class for getAttributeNode."
+    __slots__ = ()
 
 
 class Element(Node):
-    nsprefixes = None
+    """An element node
+
+    Elements are by far the most common nodes, so they are kept compact:
+    names are interned, and the attribute dict is only created once an
+    attribute is set. `nodeName`, `preserve_case`, and the `tag_is_*` flags
+    are all derived on access.
+    """
+    __slots__ = (
+        'tagName', 'endTagName', 'case_insensitive', 'namespace', 'nsprefixes',
+        '_attributes', '_filename', '_markpos')
+
     create_attr = lambda k, v: (' ', k, '="', escape(v), '"')
 
     SINGLETONS = (
@@ -433,24 +549,58 @@ class Element(Node):
         markpos=None, case_insensitive=1, namespace=None
     ):
         Node.__init__(self, parentNode)
-        preserve_case = not case_insensitive
-        tagName = tagName if preserve_case else tagName.lower()
-        unescaped = unescape_dict(attributes or {})
-
-        if case_insensitive:
-            self.attributes = InsensitiveDict(unescaped, preserve=preserve_case)
-        else:
-            self.attributes = unescaped
-
-        self.preserve_case = not case_insensitive
+        tagName = intern(tagName.lower() if case_insensitive else tagName)
         self.case_insensitive = case_insensitive
-        self.endTagName = self.nodeName = self.tagName = tagName
+        self.endTagName = self.tagName = tagName
+        self._attributes = None
         self._filename = filename
         self._markpos = markpos
         self.namespace = namespace
-        self.tag_is_blockelement = tagName in self.BLOCKELEMENTS
-        self.tag_is_nice_format = tagName in self.NICEFORMATS
-        self.tag_is_singleton = tagName.lower() in self.SINGLETONS
+        self.nsprefixes = None
+
+        if attributes:
+            self._attributes = self._new_attributes(unescape_dict(attributes))
+
+    def _new_attributes(self, attributes):
+        if self.case_insensitive:
+            attributes = InsensitiveDict(attributes)
+
+        return attributes
+
+    @property
+    def attributes(self):
+        if self._attributes is None:
+            self._attributes = self._new_attributes({})
+
+        return self._attributes
+
+    @attributes.setter
+    def attributes(self, attributes):
+        self._attributes = attributes
+
+    def get_nodeName(self):
+        return self.tagName
+
+    def set_nodeName(self, nodeName):
+        self.tagName = nodeName
+
+    nodeName = property(get_nodeName, set_nodeName)
+
+    @property
+    def preserve_case(self):
+        return not self.case_insensitive
+
+    @property
+    def tag_is_blockelement(self):
+        return self.tagName in self.BLOCKELEMENTS
+
+    @property
+    def tag_is_nice_format(self):
+        return self.tagName in self.NICEFORMATS
+
+    @property
+    def tag_is_singleton(self):
+        return self.tagName.lower() in self.SINGLETONS
 
     def addPrefixes(self, pfxs):
         if self.nsprefixes is None:
@@ -465,7 +615,8 @@ class Element(Node):
         self.endTagName = endTagName
 
     def isEqualToElement(self, n):
-        same_attrs = self.attributes == n.attributes
+        attrs = self._attributes or NO_ATTRIBUTES
+        same_attrs = attrs == (n._attributes or NO_ATTRIBUTES)
 
         if self.case_insensitive:
             eq = same_attrs and (self.nodeName.lower() == n.nodeName.lower())
@@ -483,7 +634,8 @@ class Element(Node):
         return (
             self.nodeName.lower() == other.nodeName.lower() and
             self.namespace == other.namespace and
-            self.attributes == other.attributes and
+            (self._attributes or NO_ATTRIBUTES) ==
+            (other._attributes or NO_ATTRIBUTES) and
             Node.isEqualToNode(self, other))
 
     def cloneNode(self, deep=0, parent=None):
@@ -491,13 +643,12 @@ class Element(Node):
             self.tagName, parentNode=parent, namespace=self.namespace,
             case_insensitive=self.case_insensitive)
 
-        clone.attributes.update(self.attributes)
+        if self._attributes:
+            clone.attributes.update(self._attributes)
 
-        if deep:
+        if deep and self._childNodes:
             clone.childNodes = [
-                child.cloneNode(1, clone) for child in self.childNodes]
-        else:
-            clone.childNodes = []
+                child.cloneNode(1, clone) for child in self._childNodes]
 
         return clone
 
@@ -506,19 +657,20 @@ class Element(Node):
         return get_elements_by_tag_name(self.childNodes, name, icase)
 
     def hasAttributes(self):
-        return 1
+        return bool(self._attributes)
 
     def getAttribute(self, name, default=None):
-        return self.attributes.get(name, default)
+        return (self._attributes or NO_ATTRIBUTES).get(name, default)
 
     def getAttributeNS(self, ns, name, default=None):
         nsk = (ns, name)
+        attributes = self._attributes or NO_ATTRIBUTES
 
-        if nsk in self.attributes:
-            return self.attributes[nsk]
+        if nsk in attributes:
+            return attributes[nsk]
 
         if ns == self.namespace:
-            return self.attributes.get(name, default)
+            return attributes.get(name, default)
 
         return default
 
@@ -529,14 +681,14 @@ class Element(Node):
         self.attributes[name] = attr
 
     def removeAttribute(self, name):
-        if name in self.attributes:
-            del self.attributes[name]
+        if self._attributes and name in self._attributes:
+            del self._attributes[name]
 
     def hasAttribute(self, name):
-        return name in self.attributes
+        return name in (self._attributes or NO_ATTRIBUTES)
 
     def gen_prefixes(self, nsprefixes):
-        for k, v in self.nsprefixes.items():
+        for k, v in (self.nsprefixes or NO_ATTRIBUTES).items():
             if k not in nsprefixes:
                 yield (k, v)
 
@@ -577,7 +729,9 @@ class Element(Node):
 
         prefixes = ('p%s' % str(i) for i in it.count())
 
-        for attr, val in sorted(self.attributes.items()):
+        attributes = self._attributes or NO_ATTRIBUTES
+
+        for attr, val in sorted(attributes.items()):
             if val and isinstance(attr, tuple):
                 ns, key = attr
 
@@ -593,7 +747,7 @@ class Element(Node):
         return begin, namespace, endTagName, newprefixes
 
     def _write_child(self, stream, newl, newindent, **kwargs):
-        for child in self.childNodes:
+        for child in self._childNodes or NO_CHILDREN:
             if self.tag_is_blockelement and self.tag_is_nice_format:
                 stream.write(''.join((newl, newindent)))
 
@@ -640,7 +794,7 @@ class Element(Node):
         downprefixes = newprefixes
         stream.write(''.join(begin))
 
-        if self.childNodes:
+        if self._childNodes:
             stream.write(">")
             newindent = indent + addindent
 
@@ -666,8 +820,8 @@ class Element(Node):
     def __repr__(self):
         rep = "Element(%s" % repr(self.nodeName)
 
-        if self.attributes:
-            rep += ", attributes=%r" % (self.attributes,)
+        if self._attributes:
+            rep += ", attributes=%r" % (self._attributes,)
 
         if self._filename:
             rep += ", filename=%r" % (self._filename,)
@@ -692,7 +846,7 @@ class Element(Node):
         if self._filename or self._markpos:
             rep += ")"
 
-        for item in self.attributes.items():
+        for item in (self._attributes or NO_ATTRIBUTES).items():
             rep += " %s=%r" % item
 
         if self.hasChildNodes():
@@ -848,7 +1002,9 @@ class MicroDOMParser(XMLParser):
         parent = self._getparent()
         parent = self._check_parent(parent, name)
 
-        unesc_attributes = unescape_dict(attributes)
+        unesc_attributes = {
+            intern(k): unescape(v) for k, v in attributes.items()}
+
         namespaces = self.nsstack[-1][0]
         newspaces = dict(self._gen_newspaces(unesc_attributes))
         new_unesc_attributes = dict(self._gen_new_attrs(unesc_attributes))
@@ -863,7 +1019,9 @@ class MicroDOMParser(XMLParser):
 
         el = Element(*el_args, **kwargs)
         revspaces = invert_dict(newspaces)
-        el.addPrefixes(revspaces)
+
+        if revspaces:
+            el.addPrefixes(revspaces)
 
         if newspaces:
             rscopy = merge([self.nsstack[-1][2], revspaces])
@@ -988,6 +1146,83 @@ class MicroDOMParser(XMLParser):
                 raise MismatchedTags(*args)
 
 
+class MicroDOMStreamer(MicroDOMParser):
+    """A MicroDOMParser that hands off each element matching `path` as soon
+    as its end tag is parsed. Matched elements are detached from the tree, so
+    memory use is proportional to the size of an element, not the document.
+
+    Args:
+        path (str): '/' separated tag names to match against the end of an
+            element's ancestry, e.g., 'channel/item' or 'results/*'. Paths
+            starting with '/' must match the entire ancestry. '*' matches any
+            tag, and an empty path matches the document element (default: '').
+
+        callback (func): Called with each matching element (default: append
+            the element to `self.elements`). If it returns True, the stream is
+            marked `done`, any further elements are ignored, and feeders (e.g.,
+            `riko.bado.io.async_feed`) stop reading the source.
+
+    Examples:
+        >>> content = '<rss><channel><item>a</item><item>b</item></channel>'
+        >>> content += '</rss>'
+        >>> mds = MicroDOMStreamer('channel/item')
+        >>> mds.makeConnection(None)
+        >>> mds.dataReceived(content[:28])
+        >>> [el.firstChild().nodeValue for el in mds.elements]
+        ['a']
+        >>> mds.dataReceived(content[28:])
+        >>> [el.firstChild().nodeValue for el in mds.elements]
+        ['a', 'b']
+        >>> mds.documents[0].childNodes[0].childNodes
+        []
+        >>> mds = MicroDOMStreamer('channel/item', lambda el: True)
+        >>> mds.makeConnection(None)
+        >>> mds.dataReceived(content)
+        >>> mds.done
+        True
+        >>> mds = MicroDOMStreamer('/channel/item')
+        >>> mds.makeConnection(None)
+        >>> mds.dataReceived(content)
+        >>> mds.elements
+        []
+    """
+    def __init__(self, path='', callback=None, **kwargs):
+        MicroDOMParser.__init__(self, **kwargs)
+        tags = path.strip('/').split('/') if path.strip('/') else []
+        self.tags = [t.lower() for t in tags] if self.case_insensitive else tags
+        self.absolute = path.startswith('/')
+        self.elements = []
+        self.callback = callback or self.elements.append
+        self.done = False
+
+    def matches(self, ancestry):
+        if not self.tags:
+            return len(ancestry) == 1
+
+        tail = ancestry if self.absolute else ancestry[-len(self.tags):]
+        same = (tag in {'*', name} for tag, name in zip(self.tags, tail))
+        return len(tail) == len(self.tags) and all(same)
+
+    def gotTagEnd(self, name):
+        stack = list(self.elementstack)
+        MicroDOMParser.gotTagEnd(self, name)
+
+        # in lenient mode, a single end tag may close several elements
+        ancestry = [el.tagName for el in stack]
+        closed = range(len(self.elementstack), len(stack))
+
+        for pos in reversed(closed):
+            el = stack[pos]
+
+            if self.done:
+                break
+            elif self.matches(ancestry[:pos + 1]):
+                if el.parentNode:
+                    el.parentNode.removeChild(el)
+
+                self.done = self.callback(el) is True
+
+
 def parse(f, *args, **kwargs):
     """Parse HTML or XML readable."""
     fp = f.fp if hasattr(f, 'fp') else f
@@ -21,6 +21,8 @@ try:
 except ImportError:
     get = lambda _: lambda: None
     json_content = lambda _: lambda: None
+    collect = lambda _: lambda: None
 else:
     get = treq.get
     json = treq.json_content
+    collect = treq.collect
@@ -23,12 +23,15 @@ does not:
 from __future__ import (
     absolute_import, division, print_function, unicode_literals)
 
+import re
 import pygogo as gogo
 
+from codecs import getincrementaldecoder, utf_8_decode
+
 from builtins import *  # noqa # pylint: disable=unused-import
 
 from chardet import detect
-from meza.compat import decode
+from riko import ENCODING
 
 try:
     from twisted.internet.protocol import Protocol
@@ -46,8 +49,34 @@ END_HANDLER = 2
 IDENTCHARS = '.-_:'
 LENIENT_IDENTCHARS = IDENTCHARS + ';+#/%~'
 
+SNIFF_SIZE = 2 ** 16
+
 nop = lambda *args, **kwargs: None
 
+# Runs of characters which don't change a state (and are just accumulated into
+# the named attribute) so they can be consumed in bulk instead of one `do_*`
+# call per character.
+IDENT_RUN = re.compile(r'[\w.:-]+', re.U)
+RUNS = {
+    'bodydata': (re.compile(r'[^<&]+'), 'bodydata'),
+    'spacebodydata': (re.compile(r'[^<&]+'), 'bodydata'),
+    'waitforendscript': (re.compile(r'[^<]+'), 'bodydata'),
+    'comment': (re.compile(r'[^>]+'), 'commentbuf'),
+    'cdata': (re.compile(r'[^>]+'), 'cdatabuf'),
+    'doctype': (re.compile(r'[^>]+'), 'doctype'),
+    'waitforgt': (re.compile(r'[^>]+'), None),
+    'attrs': (re.compile(r'\s+', re.U), None),
+    'entityref': (re.compile(r'[^\s<;]+', re.U), 'erefbuf'),
+    'messyattr': (re.compile(r'[^\s>]+', re.U), 'attrval'),
+    'attrname': (IDENT_RUN, 'attrname'),
+    'tagstart': (IDENT_RUN, 'tagName'),
+}
+
+ATTRVAL_RUNS = {
+    '"': (re.compile(r'[^"]+'), 'attrval'),
+    "'": (re.compile(r"[^']+"), 'attrval'),
+}
+
 
 def zipfndict(*args):
     for fndict in args:
@@ -55,6 +84,30 @@ def zipfndict(*args):
             yield (key, tuple(x.get(key, nop) for x in args))
 
 
+def is_utf8(data):
+    try:
+        # allow a multi-byte character to be split at the end of the chunk
+        utf_8_decode(data, 'strict', False)
+    except UnicodeDecodeError:
+        return False
+    else:
+        return True
+
+
+def get_encoding(data):
+    if not isinstance(data, bytes):
+        encoding = None
+    elif is_utf8(data):
+        # chardet is slow, so only use it when the cheap check fails
+        encoding = ENCODING
+    else:
+        encoding = detect(data[:SNIFF_SIZE])['encoding']
+
+    # the first chunk of a document is often pure ascii even though later
+    # chunks aren't, so use its superset
+    return ENCODING if encoding in {None, 'ascii'} else encoding
+
+
 def get_method_obj_dict(obj, prefix):
     names = find_method_names(obj.__class__, prefix)
     return {name: getattr(obj, prefix + name) for name in names}
@@ -75,6 +128,7 @@ class ParseError(Exception):
 class XMLParser(Protocol):
     state = None
     encoding = None
+    decoder = None
     bom = None
     attrname = ''
     attrval = ''
@@ -104,19 +158,27 @@ class XMLParser(Protocol):
 
     def _build_state_table(self):
         '''Return a dictionary of begin, do, end state function tuples'''
-        # _build_state_table leaves something to be desired but it does what it
-        # does.. probably slowly, so I'm doing some evil caching so it doesn't
-        # get called more than once per class.
-        stateTable = getattr(self.__class__, '__stateTable', None)
+        # the table holds bound methods, so it can only be cached per instance
+        stateTable = getattr(self, '_stateTable', None)
 
         if stateTable is None:
             prefixes = ('begin_', 'do_', 'end_')
             fndicts = (get_method_obj_dict(self, p) for p in prefixes)
-            stateTable = dict(zipfndict(*fndicts))
-            self.__class__.__stateTable = stateTable
+            stateTable = self._stateTable = dict(zipfndict(*fndicts))
 
         return stateTable
 
+    def _get_run(self, state):
+        if state == 'attrval':
+            run = ATTRVAL_RUNS.get(self.quotetype)
+        elif state == 'tagstart' and self.tagName.startswith(('!', '?')):
+            # '<!-' followed by '-' starts a comment, so go char by char
+            run = None
+        else:
+            run = RUNS.get(state)
+
+        return run
+
     def check_encoding(self, data):
         if self.encoding.startswith('UTF-16'):
             data = data[2:]
@@ -144,12 +206,24 @@ class XMLParser(Protocol):
 
         return 'bodydata'
 
+    def decode(self, data):
+        '''Decode a chunk of data, keeping any trailing partial character
+        around until the next chunk arrives'''
+        if not isinstance(data, bytes):
+            return data
+
+        if not self.decoder:
+            Decoder = getincrementaldecoder(self.encoding)
+            self.decoder = Decoder(errors='replace')
+
+        return self.decoder.decode(data)
+
     def dataReceived(self, data):
         stateTable = self._build_state_table()
-        self.encoding = self.encoding or detect(data)['encoding']
+        self.encoding = self.encoding or get_encoding(data)
         self.check_encoding(data)
         self.state = self.state or 'begin'
-        content = decode(data, self.encoding)
+        content = self.decode(data)
 
         # bring state, lineno, colno into local scope
         lineno, colno = self.lineno, self.colno
@@ -161,9 +235,35 @@ class XMLParser(Protocol):
 
         # fetch functions from the stateTable
         beginFn, doFn, endFn = stateTable[curState]
+        pos, length = 0, len(content)
 
         try:
-            for char in content:
+            while pos < length:
+                run = self._get_run(curState)
+                match = run[0].match(content, pos) if run else None
+
+                if match:
+                    # consume characters that can't change the state in bulk
+                    text = match.group()
+                    pos = match.end()
+
+                    if run[1]:
+                        setattr(self, run[1], getattr(self, run[1]) + text)
+
+                    newlines = text.count('\n')
+
+                    if newlines:
+                        lineno += newlines
+                        colno = len(text) - text.rfind('\n') - 1
+                    else:
+                        colno += len(text)
+
+                    if pos == length:
+                        break
+
+                char = content[pos]
+                pos += 1
+
                 # do newline stuff
                 if char == '\n':
                     lineno += 1
@@ -20,19 +20,22 @@ from functools import partial
 
 from builtins import *  # noqa # pylint: disable=unused-import
 
-from riko.parsers import _make_content, entity2text
+from . import coroutine, return_value
+from riko.parsers import _add_content, entity2text, RecordParser
 
 try:
     from twisted.internet.defer import maybeDeferred, Deferred
 except ImportError:
     maybeDeferred = lambda *args: None
+    Protocol = object
 else:
+    from twisted.internet.protocol import Protocol
     from twisted.internet import defer
     from twisted.internet.utils import getProcessOutput
     from twisted.internet.reactor import callLater
 
-    from . import microdom
-    from .microdom import EntityReference
+    from . import microdom, io
+    from .microdom import Element, EntityReference
 
     async_none = defer.succeed(None)
     async_return = partial(defer.succeed)
@@ -64,33 +67,161 @@ def xml2etree(f, xml=True):
     return parse(f)
 
 
+def _node_value(node):
+    value = getattr(node, 'nodeValue', None)
+    return entity2text(value) if isinstance(node, EntityReference) else value
+
+
+def _new_content(node, tag='content'):
+    # microdom creates attribute dicts and child lists lazily, so avoid
+    # touching them unless they exist
+    i = dict(node.attributes) if node.hasAttributes() else {}
+    _add_content(i, tag, _node_value(node))
+    return i
+
+
+def _iter_children(node):
+    return iter(node.childNodes if node.hasChildNodes() else [])
+
+
 def etree2dict(element, tag='content'):
     """Convert a microdom element tree into a dict imitating how Yahoo Pipes
-    does it.
+    does it. The tree is walked iteratively, so deeply nested documents can't
+    exceed the recursion limit.
 
     TODO: checkout twisted.words.xish
     """
-    i = dict(element.attributes) if hasattr(element, 'attributes') else {}
-    value = element.nodeValue if hasattr(element, 'nodeValue') else None
-
-    if isinstance(element, EntityReference):
-        value = entity2text(value)
+    stack = [(tag, _new_content(element, tag), _iter_children(element))]
 
-    i.update(_make_content(i, value, tag))
-
-    for child in element.childNodes:
-        tag = child.tagName if hasattr(child, 'tagName') else 'content'
-        value = etree2dict(child, tag)
+    while stack:
+        child = next(stack[-1][2], None)
 
         # try to join the content first since microdom likes to split up
         # elements that contain a mix of text and entity reference
-        try:
-            i.update(_make_content(i, value, tag, append=False))
-        except TypeError:
-            i.update(_make_content(i, value, tag))
-
-    if ('content' in i) and not set(i).difference(['content']):
-        # element is leaf node and doesn't have attributes
-        i = i['content']
+        if isinstance(child, Element):
+            content = _new_content(child)
+            stack.append((child.tagName, content, _iter_children(child)))
+        elif child is not None:
+            # text, comments, etc. don't have attributes or children, so they
+            # are converted to their value
+            _add_content(stack[-1][1], 'content', _node_value(child), True)
+        else:
+            tag, i, _ = stack.pop()
+
+            if ('content' in i) and not set(i).difference(['content']):
+                # element is leaf node and doesn't have attributes
+                i = i['content']
+
+            if stack:
+                _add_content(stack[-1][1], tag, i, True)
 
     return i
+
+
+@coroutine
+def async_parse_elements(source, path='', xml=True, callback=None, **kwargs):
+    """Asynchronously and incrementally parses an XML/HTML source, handing
+    off each element that matches `path` as soon as its end tag is parsed.
+
+    Args:
+        source (str): A url, file like object, or treq response
+        path (str): '/' separated tag names to match against the end of an
+            element's ancestry, e.g., 'channel/item' or 'results/*'. Paths
+            starting with '/' must match the entire ancestry (default: '',
+            i.e., the document element)
+
+        xml (bool): Use the strict XML parser (default: True)
+        callback (func): Called with each matching element (default: None,
+            i.e., convert the element with `etree2dict` and collect it)
+
+        kwargs (dict): Keyword arguments passed to `riko.bado.io.async_feed`
+
+    Returns:
+        Deferred: twisted.internet.defer.Deferred
+            iterator of converted elements (empty if `callback` is given)
+
+    Examples:
+        >>> from riko import get_path
+        >>> from riko.bado import react, _issync
+        >>> from riko.bado.mock import FakeReactor
+        >>>
+        >>> def run(reactor):
+        ...     callback = lambda x: print(next(x)['guid']['content'])
+        ...     url = get_path('ouseful.xml')
+        ...     d = async_parse_elements(url, 'channel/item')
+        ...     return d.addCallbacks(callback, print)
+        >>>
+        >>> if _issync:
+        ...     print('http://blog.ouseful.info/?p=12065')
+        ... else:
+        ...     try:
+        ...         react(run, _reactor=FakeReactor())
+        ...     except SystemExit:
+        ...         pass
+        http://blog.ouseful.info/?p=12065
+    """
+    items = []
+    callback = callback or (lambda element: items.append(etree2dict(element)))
+    streamer = microdom.MicroDOMStreamer(path, callback, lenient=not xml)
+    yield io.async_feed(source, streamer, **kwargs)
+    return_value(iter(items))
+
+
+class RecordReceiver(Protocol):
+    """A protocol that feeds the data it receives to a
+    `riko.parsers.RecordParser`, collecting the completed records"""
+    def __init__(self, parser):
+        self.parser = parser
+        self.records = []
+
+    def dataReceived(self, data):
+        self.records.extend(self.parser.feed(data))
+
+    def connectionLost(self, reason):
+        self.records.extend(self.parser.close())
+
+
+@coroutine
+def async_iterparse_records(source, path=None, xml=True, fields=None,
+                            **kwargs):
+    """Asynchronously and incrementally parses an XML/HTML source, converting
+    each record element into a dict as soon as its end tag is parsed. The
+    asynchronous counterpart of `riko.parsers.iterparse_records`.
+
+    Args:
+        source (str): A url, file like object, or treq response
+        path (str): '/' or '.' separated tag names of the repeating record
+            element (see `riko.parsers.RecordParser`)
+
+        xml (bool): Use the XML parser (default: True)
+        fields (Iter[str]): Only include (and convert) these fields of each
+            record (default: None, i.e., include all fields)
+
+        kwargs (dict): Keyword arguments passed to `riko.bado.io.async_feed`
+
+    Returns:
+        Deferred: twisted.internet.defer.Deferred iterator of records
+
+    Examples:
+        >>> from riko import get_path
+        >>> from riko.bado import react, _issync
+        >>> from riko.bado.mock import FakeReactor
+        >>>
+        >>> def run(reactor):
+        ...     callback = lambda x: print(next(x)['district_name'])
+        ...     url = get_path('schools.xml')
+        ...     d = async_iterparse_records(url, 'data.row')
+        ...     return d.addCallbacks(callback, print)
+        >>>
+        >>> if _issync:
+        ...     print('Turkana')
+        ... else:
+        ...     try:
+        ...         react(run, _reactor=FakeReactor())
+        ...     except SystemExit:
+        ...         pass
+        Turkana
+    """
+    receiver = RecordReceiver(RecordParser(path, xml, fields))
+    yield io.async_feed(source, receiver, **kwargs)
+    return_value(iter(receiver.records))
@@ -32,12 +32,54 @@ Examples:
         ...     .tokenizer(conf=str_conf, **str_kwargs)
         ...     .count().list) == [{'count': 169}]
         True
+        >>> # sorts with processes (not threads) run in a pool of processes
+        >>> pipe = SyncPipe('fetchdata', conf=fconf).sort(conf=sort_conf)
+        >>> ppipe = (SyncPipe('fetchdata', conf=fconf, parallel=True,
+        ...     threads=False).sort(conf=sort_conf))
+        >>> ppipe.list == pipe.list
+        True
+        >>> # only the fields read downstream are fetched
+        >>> pipe = SyncPipe('fetchdata', conf=fconf).sort(conf=sort_conf)
+        >>> sorted(next(pipe.get_output(['link'])))
+        ['link', 'title']
+        >>> # item wise pipes run in the workers of a parallel fetchtext
+        >>> tconf = {'url': get_path('lorem.txt'), 'parallel': True}
+        >>> rule = {'field': 'content', 'op': 'contains', 'value': 'lorem'}
+        >>> (SyncPipe('fetchtext', conf=tconf)
+        ...     .filter(conf={'rule': rule})
+        ...     .count().list) == [{'count': 12}]
+        True
+        >>> # workers only send back their partial aggregations
+        >>> cconf = {'count_key': 'content'}
+        >>> pipe = (SyncPipe('fetchdata', conf=fconf)
+        ...     .tokenizer(conf=str_conf, **str_kwargs)
+        ...     .count(conf=cconf))
+        >>> ppipe = (SyncPipe('fetchdata', conf=fconf, parallel=True,
+        ...     threads=False)
+        ...     .tokenizer(conf=str_conf, **str_kwargs)
+        ...     .count(conf=cconf))
+        >>> ppipe.list == pipe.list
+        True
+        >>> # a sort followed by truncate (or tail) only keeps the needed items
+        >>> pipe = SyncPipe('fetchdata', conf=fconf).sort(conf=sort_conf)
+        >>> top = pipe.truncate(conf={'count': 3}).list
+        >>> top == pipe.list[:3]
+        True
         >>> fconf['type'] = 'fetchdata'
         >>> sources = [{'url': {'value': get_path('feed.xml')}}, fconf]
         >>> len(SyncCollection(sources).list)
         56
         >>> len(SyncCollection(sources, parallel=True).list)
         56
+        >>> # feeds that are already sorted by date are merged lazily
+        >>> names = ['greenhughes.xml', 'ouseful.xml']
+        >>> sources = [{'url': {'value': get_path(name)}} for name in names]
+        >>> rule = {'sort_key': 'pubDate', 'sort_dir': 'desc', 'type': 'date'}
+        >>> timeline = SyncCollection(sources, merge_rule=rule).list
+        >>> ordered = SyncCollection(sources).pipe().sort(conf={'rule': rule})
+        >>> titles = [item['title'] for item in ordered.list]
+        >>> [item['title'] for item in timeline] == titles
+        True
 
     async usage::
 
@@ -67,9 +109,17 @@ Examples:
         ...     d2 = yield AsyncCollection(sources).list
         ...     print(len(d2))
         ...
+        ...     names = ['greenhughes.xml', 'ouseful.xml']
+        ...     sources = [{'url': {'value': get_path(n)}} for n in names]
+        ...     rule = {'sort_key': 'pubDate', 'sort_dir': 'desc'}
+        ...     rule['type'] = 'date'
+        ...     d3 = yield AsyncCollection(sources, merge_rule=rule).list
+        ...     print(len(d3))
+        ...
         >>> if _issync:
         ...     True
         ...     56
+        ...     20
         ... else:
         ...     try:
         ...         react(run, _reactor=FakeReactor())
@@ -77,6 +127,7 @@ Examples:
         ...         pass
         True
         56
+        20
 """
 from __future__ import (
     absolute_import, division, print_function, unicode_literals)
@@ -92,11 +143,19 @@ import pygogo as gogo
 from builtins import *  # noqa # pylint: disable=unused-import
 
 from riko.utils import multiplex, multi_try
+from riko.aggregates import accumulate
 from riko.bado import coroutine, return_value
 from riko.bado import util, itertools as ait
+from riko.modules import (
+    __sources__, __projectable__, __chainable__, __itemwise__,
+    __combinable__, get_source_fields)
+from riko.modules.sortedmerge import merge_sorted
+from meza.fntools import chunk, listize, Objectify
 from meza.process import merge
 
 logger = gogo.Gogo(__name__, monolog=True).logger
+PROJECTABLE_SOURCES = set(__sources__).intersection(__projectable__)
+COMBINE_CHUNKSIZE = 2 ** 10
 
 
 class PyPipe(object):
@@ -132,10 +191,12 @@ class SyncPipe(PyPipe):
             self.is_processor = self.pipe.__dict__.get('type') == 'processor'
             self.mapify = self.is_processor and self.source
             self.parallelize = self.parallel and self.mapify
+            self.itemwise = self.is_processor or self.name in __itemwise__
         else:
             self.pipe = lambda source, **kw: source
             self.mapify = False
             self.parallelize = False
+            self.itemwise = False
 
         if self.parallelize:
             ordered = kwargs.get('ordered')
@@ -152,6 +213,9 @@ class SyncPipe(PyPipe):
             self.map = map
 
     def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+
         kwargs = {
             'parallel': self.parallel,
             'threads': self.threads,
@@ -159,23 +223,154 @@ class SyncPipe(PyPipe):
             'reuse_pool': self.reuse_pool,
             'workers': self.workers}
 
-        return SyncPipe(name, source=self.output, **kwargs)
+        # the source's output isn't created until this pipe's output is
+        # requested, at which point we know which fields are actually read
+        return SyncPipe(name, source=self, **kwargs)
+
+    def get_chain(self):
+        """Gets the parallel source (if any) that this pipe and the item wise
+        pipes between them can be run in
+
+        Returns:
+            Tuple[SyncPipe, List[Tuple[str, dict]]]: The source pipe (or None)
+                and the (module name, pipe keyword arguments) pairs of the
+                pipes after it
+        """
+        conf = self.kwargs.get('conf') or {}
+        source = self.source
+
+        if self.name in __chainable__ and not self.mapify:
+            root = self if conf.get('parallel') else None
+            chain = []
+        elif self.itemwise and isinstance(source, SyncPipe):
+            root, chain = source.get_chain()
+            chain = chain + [(self.name, self.kwargs)] if root else []
+        else:
+            root, chain = None, []
 
-    @property
-    def output(self):
-        pipeline = partial(self.pipe, **self.kwargs)
+        return root, chain
+
+    def get_output(self, fields=None, limit=None, last=False):
+        """Creates the output stream
+
+        Args:
+            fields (Iter[str]): The item fields read from the output (default:
+                None, i.e., all of them). Sources that support projection
+                only materialize these fields.
+
+            limit (int): The number of items read from the output (default:
+                None, i.e., all of them). A sort only keeps this many items.
+
+            last (bool): The `limit` items are read from the end of the output
+                (default: False).
+
+        Returns:
+            Iter[dict]: The output stream
+        """
+        kwargs = self.kwargs
+        root, chain = self.get_chain() if self.itemwise else (None, [])
+        parallel_source = getattr(self.source, 'parallelize', False)
+        combine = self.name in __combinable__ and parallel_source
+
+        if chain:
+            # run this pipe and the ones before it in the source's workers
+            return root.pipe(chain=chain, **root.kwargs)
+        elif combine:
+            # only ship the source workers' partial aggregations back
+            needed = get_source_fields(self.name, fields, **kwargs)
+            partials = self.source.get_partials(self.name, needed, **kwargs)
+            return self.pipe(partials=partials, **kwargs)
+
+        source, pipeline = self.get_pipeline(fields, limit, last)
 
         if self.parallelize:
-            zipped = zip(self.source, repeat(pipeline))
+            zipped = zip(source, repeat(pipeline))
             mapped = self.map(listpipe, zipped, chunksize=self.chunksize)
         elif self.mapify:
-            mapped = self.map(pipeline, self.source)
+            mapped = self.map(pipeline, source)
 
         if self.parallelize and not self.reuse_pool:
             self.pool.close()
             self.pool.join()
 
-        return multiplex(mapped) if self.mapify else pipeline(self.source)
+        return multiplex(mapped) if self.mapify else pipeline(source)
+
+    def get_pipeline(self, fields=None, limit=None, last=False):
+        """Creates the source stream and the function that runs this pipe on
+        it (or on each of its items if this pipe is a processor)
+
+        Args:
+            fields (Iter[str]): The item fields read from the output (default:
+                None, i.e., all of them)
+
+            limit (int): The number of items read from the output (default:
+                None, i.e., all of them)
+
+            last (bool): The `limit` items are read from the end of the output
+                (default: False).
+
+        Returns:
+            Tuple[Iter[dict], func]: The source stream and the pipe function
+        """
+        kwargs = self.kwargs
+
+        if isinstance(self.source, PyPipe):
+            needed = get_source_fields(self.name, fields, **kwargs)
+            hint = get_limit(self.name, **kwargs)
+            source = self.source.get_output(needed, *hint)
+        else:
+            source = self.source
+
+        projectable = self.name in PROJECTABLE_SOURCES
+        fields = None if 'fields' in kwargs else fields
+        conf = kwargs.get('conf') or {}
+
+        if projectable and fields is not None:
+            kwargs = merge([kwargs, {'fields': sorted(fields)}])
+
+        if self.name == 'sort' and limit is not None and 'limit' not in conf:
+            conf = merge([conf, {'limit': limit, 'last': last}])
+            kwargs = merge([kwargs, {'conf': conf}])
+
+        if self.name == 'sort' and self.parallel and not self.threads:
+            # sorting is cpu bound, so only a process pool helps
+            pconf = {'parallel': True, 'workers': self.workers}
+            kwargs = merge([kwargs, {'conf': merge([pconf, conf])}])
+
+        return source, partial(self.pipe, **kwargs)
+
+    def get_partials(self, name, fields=None, conf=None, **kwargs):
+        """Runs this (parallel processor) pipe on chunks of its source and
+        aggregates each chunk's output in the same worker
+
+        Args:
+            name (str): The aggregator module name
+            fields (Iter[str]): The item fields the aggregator reads (default:
+                None, i.e., all of them)
+
+            conf (dict): The aggregator configuration (default: None)
+
+        Returns:
+            Iter[dict]: The accumulators of each chunk (in source order). See
+                `riko.aggregates.accumulate`.
+        """
+        module = import_module('riko.modules.%s' % name)
+        keys, specs = module.get_aggregation(conf)
+        source, pipeline = self.get_pipeline(fields)
+        chunksize = max(self.chunksize, COMBINE_CHUNKSIZE)
+        chunks = chunk(source, chunksize)
+        zipped = zip(chunks, repeat(pipeline), repeat(keys), repeat(specs))
+        partials = self.pool.imap(aggregate_chunk, zipped)
+
+        if not self.reuse_pool:
+            self.pool.close()
+            self.pool.join()
+
+        return partials
+
+    @property
+    def output(self):
+        return self.get_output()
 
     @property
     def list(self):
@@ -183,14 +378,50 @@ class SyncPipe(PyPipe):
 
 
 class PyCollection(object):
-    """A riko bulk url fetching object"""
-    def __init__(self, sources, parallel=False, workers=None, **kwargs):
+    """A riko bulk url fetching object
+
+    Args:
+        sources (List[dict]): The source configurations
+        parallel (bool): Fetch the sources in a pool of threads (default:
+            False).
+
+        workers (int): Number of threads (default: None, i.e., based on the
+            number of sources).
+
+        merge_rule (dict): If the sources are each sorted, e.g., by date,
+            merge them into one sorted stream (see `riko.modules.sortedmerge`)
+            instead of concatenating them. Can be either a dict or list of
+            dicts of the sort configuration (default: None).
+
+        reorder (int): The size of each source's reorder buffer when merging
+            sources that aren't quite sorted (default: 0).
+    """
+    def __init__(
+        self, sources, parallel=False, workers=None, merge_rule=None,
+        reorder=0, **kwargs
+    ):
         self.parallel = parallel
         conf = kwargs.get('conf', {})
         self.zargs = zip(sources, repeat(conf))
         self.length = lenish(sources)
         self.workers = workers or get_worker_cnt(self.length)
 
+        if merge_rule:
+            self.merge_rules = list(map(Objectify, listize(merge_rule)))
+        else:
+            self.merge_rules = None
+
+        self.reorder = reorder
+
+    def multiplex(self, outputs):
+        """Combine the source outputs into one stream"""
+        if self.merge_rules:
+            stream = merge_sorted(outputs, self.merge_rules, self.reorder)
+        else:
+            stream = multiplex(outputs)
+
+        return stream
+
 
 class SyncCollection(PyCollection):
     """A synchronous PyCollection object"""
@@ -208,7 +439,7 @@ class SyncCollection(PyCollection):
         """Fetch all source urls"""
         kwargs = {'chunksize': self.chunksize} if self.parallel else {}
         mapped = self.map(getpipe, self.zargs, **kwargs)
-        return multiplex(mapped)
+        return self.multiplex(mapped)
 
     def pipe(self, **kwargs):
         """Return a SyncPipe primed with the source feed"""
@@ -272,7 +503,7 @@ class AsyncCollection(PyCollection):
         """Fetch all source urls"""
         args = (async_get_pipe, self.zargs, self.connections)
         mapped = yield ait.async_map(*args)
-        return_value(multiplex(mapped))
+        return_value(self.multiplex(mapped))
 
     def async_pipe(self, **kwargs):
         """Return an AsyncPipe primed with the source feed"""
@@ -285,6 +516,41 @@ class AsyncCollection(PyCollection):
         return_value(list(result))
 
 
+def get_limit(name, conf=None, **kwargs):
+    """Gets the number of items a truncate or tail pipe reads from its source
+
+    Args:
+        name (str): The module name
+        conf (dict): The pipe configuration
+
+    Returns:
+        Tuple[int, bool]: The number of items (or None if the pipe may read
+            all of them) and whether they are read from the end
+
+    Examples:
+        >>> get_limit('truncate', {'count': '3', 'start': 2})
+        (5, False)
+        >>> get_limit('tail', {'count': 3})
+        (3, True)
+        >>> get_limit('tail', {'count': {'subkey': 'num'}})
+        (None, False)
+    """
+    conf = conf or {}
+
+    try:
+        count = int(conf['count'])
+        start = int(conf.get('start', 0)) if name == 'truncate' else 0
+    except (KeyError, TypeError, ValueError):
+        count = None
+
+    if count is not None and name in {'truncate', 'tail'}:
+        limit, last = start + count, name == 'tail'
+    else:
+        limit, last = None, False
+
+    return limit, last
+
+
 def get_chunksize(length, workers):
     return (length // (workers * 4)) or 1
 
@@ -306,6 +572,11 @@ def listpipe(args):
     return list(pipeline(source))
 
 
+def aggregate_chunk(args):
+    source, pipeline, keys, specs = args
+    return accumulate(multiplex(map(pipeline, source)), keys, specs)
+
+
 def getpipe(args, pipe=SyncPipe):
     source, conf = args
     ptype = source.get('type', 'fetch')
@@ -10,7 +10,6 @@ from __future__ import (
 
 import pygogo as gogo
 
-from functools import reduce
 from builtins import *  # noqa # pylint: disable=unused-import
 
 logger = gogo.Gogo(__name__, monolog=True).logger
@@ -24,6 +23,11 @@ class DotDict(dict):
     >>> r['a.content'] == 'value'
     True
     """
+    def __new__(cls, data=None, **kwargs):
+        # defer the fields of lazy mappings (e.g., `riko.feeds.FeedEntry`)
+        lazy = cls is DotDict and hasattr(data, 'pending') and data.pending()
+        return super(DotDict, cls).__new__(LazyDotDict if lazy else cls)
+
     def __init__(self, data=None, **kwargs):
         self.update(data)
 
@@ -64,7 +68,7 @@ class DotDict(dict):
 
     def get(self, key=None, default=None, **kwargs):
         keys = self._parse_key(key)
-        value = DotDict(self.copy())
+        value = self
 
         for key in keys:
             try:
@@ -84,27 +88,87 @@ class DotDict(dict):
         return DotDict(value) if hasattr(value, 'keys') else value
 
     def delete(self, key):
+        """Deletes a (nested) field
+
+        Examples:
+            >>> r = DotDict({'a': {'b': 1, 'c': 2}})
+            >>> c = r.copy()
+            >>> c.delete('a.b')
+            >>> c == {'a': {'c': 2}}, r == {'a': {'b': 1, 'c': 2}}
+            (True, True)
+        """
         keys = self._parse_key(key)
-        last = keys[-1]
+        parent = self
 
-        try:
-            del reduce(lambda i, k: DotDict(i).get(k), [self] + keys[:-1])[last]
-        except KeyError:
-            pass
+        # copy (rather than mutate) the nested dicts along the key's path
+        # (see `set`)
+        for k in keys[:-1]:
+            child = dict.get(parent, k)
+
+            if not hasattr(child, 'keys'):
+                return
+
+            child = dict(child)
+            dict.__setitem__(parent, k, child)
+            parent = child
+
+        if parent is self:
+            self._discard(keys[-1])
+        else:
+            dict.pop(parent, keys[-1], None)
+
+    def pending(self):
+        """The fields that haven't been computed yet (see `LazyDotDict`)"""
+        return []
+
+    def _discard(self, key):
+        # forgets a (top level) field
+        dict.pop(self, key, None)
+
+    def copy(self):
+        """Shallow copies the dict without reparsing its keys
+
+        Examples:
+            >>> r = DotDict({'a': {'content': 'value'}})
+            >>> c = r.copy()
+            >>> c.set('a.content', 'changed')
+            >>> r.get('a.content') == 'value'
+            True
+        """
+        copied = DotDict()
+        dict.update(copied, self)
+        return copied
 
     def set(self, key, value):
         keys = self._parse_key(key)
-        first = keys[:-1]
-        last = keys[-1]
-        item = self.copy()
-        reduce(lambda i, k: i.setdefault(k, {}), first, item)[last] = value
-        super(DotDict, self).update(item)
+        parent = self
+
+        # copy (rather than mutate) the nested dicts along the key's path so
+        # that shallow copies sharing them stay independent
+        for k in keys[:-1]:
+            child = dict.get(parent, k)
+            child = dict(child) if hasattr(child, 'keys') else {}
+            dict.__setitem__(parent, k, child)
+            parent = child
+
+        dict.__setitem__(parent, keys[-1], value)
 
     def update(self, data=None):
         if not data:
             return
 
-        _dict = dict(data)
+        if hasattr(data, 'pending') and data.pending():
+            # `dict()` only copies the stored fields (on python 2)
+            _dict = dict(data.items())
+        elif isinstance(data, LazyDotDict):
+            # `dict()` would get the (transformed) values via `__getitem__`
+            _dict = dict(dict.items(data))
+        else:
+            _dict = dict(data)
+
+        self._update(_dict)
+
+    def _update(self, _dict):
         dot_keys = [k for k in _dict if '.' in k]
 
         if dot_keys:
@@ -116,3 +180,144 @@ class DotDict(dict):
             items = _dict.items()
 
         [self.set(key, value) for key, value in items]
+
+
+class LazyDotDict(DotDict):
+    """A DotDict that defers the fields a lazy mapping (e.g., a
+    `riko.feeds.FeedEntry`) hasn't computed yet, rather than computing them
+    all when it's copied. `DotDict(mapping)` returns one when `mapping` has
+    `pending` fields. It otherwise behaves like a DotDict with the pending
+    fields included.
+
+    Examples:
+        >>> from riko.feeds import FeedEntry
+        >>>
+        >>> r = DotDict(FeedEntry({'title': 'Hi'}))
+        >>> isinstance(r, LazyDotDict)
+        True
+        >>> dict.__len__(r), len(r)
+        (1, 7)
+        >>> r['y:title'] == 'Hi'
+        True
+        >>> r.get('author.name') is None
+        True
+        >>> pending = ['dc:creator', 'pubDate', 'y:id', 'y:published']
+        >>> sorted(r.pending()) == pending
+        True
+        >>> dict.__len__(DotDict(r)), dict.__len__(r.copy())
+        (3, 3)
+    """
+    # the pending fields keyed by their top level key with values of
+    # (mapping, [mapping keys])
+    _lazy = {}
+
+    def __missing__(self, key):
+        try:
+            source, keys = self._lazy[key]
+        except KeyError:
+            raise KeyError(key)
+
+        if keys == [key]:
+            value = source[key]
+        else:
+            # e.g., 'author.name' and 'author.uri' of the key 'author'
+            nested = DotDict()
+            [nested.set(k, source[k]) for k in keys]
+            value = dict.__getitem__(nested, key)
+
+        self._discard(key)
+        dict.__setitem__(self, key, value)
+        return value
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or key in self.pending()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return dict.__len__(self) + len(self.pending())
+
+    def __delitem__(self, key):
+        if key in self.pending():
+            self._discard(key)
+        else:
+            dict.__delitem__(self, key)
+
+    def __eq__(self, other):
+        if hasattr(other, 'pending') and other.pending():
+            other = dict(other.items())
+
+        return dict(self.items()) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def keys(self):
+        return list(dict.keys(self)) + self.pending()
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def pending(self):
+        return [k for k in self._lazy if not dict.__contains__(self, k)]
+
+    def _discard(self, key):
+        if key in self._lazy:
+            self._lazy = {k: v for k, v in self._lazy.items() if k != key}
+
+        dict.pop(self, key, None)
+
+    def _adopt(self, data):
+        # defers the fields that `data` hasn't computed yet
+        if isinstance(data, LazyDotDict):
+            adopted = {key: data._lazy[key] for key in data.pending()}
+        else:
+            adopted = {}
+
+            for key in data.pending():
+                top = self._parse_key(key)[0]
+                adopted.setdefault(top, (data, []))[1].append(key)
+
+        # a pending field redefines a stored one, e.g., 'author.name' and
+        # 'author'
+        [self._discard(key) for key in adopted]
+        lazy = dict(self._lazy)
+        lazy.update(adopted)
+        self._lazy = lazy
+
+    def copy(self):
+        copied = LazyDotDict()
+        dict.update(copied, dict.items(self))
+        copied._lazy = self._lazy
+        return copied
+
+    def _compute_parent(self, key):
+        keys = self._parse_key(key)
+
+        if len(keys) > 1 and keys[0] in self.pending():
+            self.__missing__(keys[0])
+
+    def delete(self, key):
+        self._compute_parent(key)
+        super(LazyDotDict, self).delete(key)
+
+    def set(self, key, value):
+        self._compute_parent(key)
+        super(LazyDotDict, self).set(key, value)
+
+    def update(self, data=None):
+        if hasattr(data, 'pending') and data.pending():
+            # only copy the stored fields, and defer the rest
+            self._update(dict(dict.items(data)))
+            self._adopt(data)
+        else:
+            super(LazyDotDict, self).update(data)
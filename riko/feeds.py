@@ -0,0 +1,548 @@
+# -*- coding: utf-8 -*-
+# vim: sw=4:ts=4:expandtab
+"""
+riko.feeds
+~~~~~~~~~~
+Provides a fast lxml based RSS 2.0, Atom 1.0, and RDF (RSS 1.0) parser.
+
+Entries are built as soon as their end tag is parsed and have the same shape
+as feedparser's (which `riko.utils.gen_entries` expects). Dates are parsed
+(and the Yahoo Pipes style aliases computed) only when first read. Unlike
+feedparser, html content isn't sanitized. Feeds that aren't well-formed (or
+that aren't RSS/Atom/RDF) are handed off to feedparser.
+
+Examples:
+    basic usage::
+
+        >>> from riko import get_path
+        >>> from riko.feeds import parse
+        >>> from riko.utils import fetch
+        >>>
+        >>> with fetch(get_path('feed.xml')) as f:
+        ...     parsed = parse(f.read())
+        >>>
+        >>> entry = next(parsed['entries'])
+        >>> entry['title'], entry['author']
+        ('Donations', 'WriteToReply')
+        >>> entry['published_parsed'][:3]
+        (2009, 5, 11)
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals)
+
+import re
+
+from io import BytesIO
+from functools import partial
+from itertools import chain
+from time import gmtime
+from email.utils import parsedate_tz, mktime_tz
+
+import pygogo as gogo
+import feedparser
+
+from builtins import *  # noqa # pylint: disable=unused-import
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+logger = gogo.Gogo(__name__, monolog=True).logger
+
+ATOM = 'http://www.w3.org/2005/Atom'
+RSS10 = 'http://purl.org/rss/1.0/'
+RDF = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#'
+DC = 'http://purl.org/dc/elements/1.1/'
+CONTENT = 'http://purl.org/rss/1.0/modules/content/'
+CC = 'http://backend.userland.com/creativeCommonsRssModule'
+ITUNES = 'http://www.itunes.com/dtds/podcast-1.0.dtd'
+XHTML = 'http://www.w3.org/1999/xhtml'
+
+ENTRY_TAGS = {'item', '{%s}item' % RSS10, '{%s}entry' % ATOM}
+VERSIONS = {'rss': 'rss20', 'RDF': 'rss10', 'feed': 'atom10'}
+
+# e.g., 'bob@example.com (Bob)'
+RSS_AUTHOR = re.compile(r'^\s*(?P<email>[^\s(]+@[^\s(]+)\s*\((?P<name>.*)\)')
+
+
+class NotAFeed(Exception):
+    pass
+
+
+def parse_date(text):
+    """Parse a date string into a UTC `time.struct_time`. RFC 822 dates (used
+    by RSS) are handled directly, everything else by feedparser.
+
+    Examples:
+        >>> parse_date('Mon, 11 May 2009 22:10:01 +0100')[:6]
+        (2009, 5, 11, 21, 10, 1)
+        >>> parse_date('2003-12-13T08:29:29-04:00')[:6]
+        (2003, 12, 13, 12, 29, 29)
+    """
+    parsed = parsedate_tz(text) if ',' in text else None
+
+    if parsed:
+        # a missing timezone means UTC (not local time)
+        offset = parsed[9] or 0
+        date = gmtime(mktime_tz(parsed[:9] + (offset,)))
+    else:
+        date = feedparser._parse_date(text)
+
+    return date
+
+
+def _parse_entry_date(entry, key):
+    text = entry[key]
+    return parse_date(text) if text else None
+
+
+def _get_updated(entry):
+    # prevent feedparser deprecation warnings
+    if 'published_parsed' in entry:
+        updated = entry['published_parsed']
+    else:
+        updated = entry.get('updated_parsed')
+
+    return updated
+
+
+def _get_author_detail(entry, key):
+    return entry.get('author_detail', {}).get(key)
+
+
+# the fields (and the fields they're computed from) parsed on first access
+PARSED = {'published_parsed': 'published', 'updated_parsed': 'updated'}
+
+# the Yahoo Pipes style aliases
+ALIASES = {
+    'pubDate': _get_updated,
+    'y:published': _get_updated,
+    'dc:creator': lambda entry: entry.get('author'),
+    'author.uri': partial(_get_author_detail, key='href'),
+    'author.name': partial(_get_author_detail, key='name'),
+    'y:title': lambda entry: entry.get('title'),
+    'y:id': lambda entry: entry.get('id')}
+
+DERIVED = list(PARSED) + sorted(ALIASES)
+
+
+class FeedEntry(dict):
+    """A feed entry whose aliases and parsed dates are only computed when
+    first read. It otherwise behaves like a regular dict (e.g., it can be
+    copied, compared, and serialized as json) with the derived fields
+    included. Note: `dict(entry)` only copies the stored fields on python 2,
+    so use `entry.items()` (or `riko.dotdict.DotDict`, which defers the
+    `pending` fields) instead.
+
+    Examples:
+        >>> import json
+        >>>
+        >>> date = 'Mon, 11 May 2009 22:10:01 +0100'
+        >>> entry = FeedEntry({'title': 'Hi', 'published': date})
+        >>> dict.__len__(entry), len(entry)
+        (2, 10)
+        >>> entry['y:title'], entry.get('dc:creator', 'nobody')
+        ('Hi', None)
+        >>> 'pubDate' in entry.pending()
+        True
+        >>> entry['pubDate'][:3]
+        (2009, 5, 11)
+        >>> 'updated_parsed' in entry
+        False
+        >>> json.loads(json.dumps(entry))['y:title']
+        'Hi'
+        >>> entry == dict(entry.items())
+        True
+    """
+    __slots__ = ()
+
+    def _is_derived(self, key):
+        if dict.__contains__(self, key):
+            derived = False
+        elif key in PARSED:
+            derived = dict.__contains__(self, PARSED[key])
+        else:
+            derived = key in ALIASES
+
+        return derived
+
+    def pending(self):
+        """The derived fields that haven't been computed yet"""
+        return [key for key in DERIVED if self._is_derived(key)]
+
+    def __missing__(self, key):
+        if key in PARSED and self._is_derived(key):
+            value = _parse_entry_date(self, PARSED[key])
+        elif self._is_derived(key):
+            value = ALIASES[key](self)
+        else:
+            raise KeyError(key)
+
+        self[key] = value
+        return value
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or self._is_derived(key)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return dict.__len__(self) + len(self.pending())
+
+    def __eq__(self, other):
+        return dict(self.items()) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        return list(dict.keys(self)) + self.pending()
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def copy(self):
+        return FeedEntry(dict.items(self))
+
+
+def get_text(element):
+    if element.get('type') == 'xhtml':
+        div = next(iter(element), None)
+        children = div if div is not None else element
+        text = div.text if div is not None else element.text
+        parts = [text or ''] + [
+            etree.tostring(child, encoding='unicode', with_tail=True)
+            for child in children]
+
+        # drop the xhtml namespace declarations lxml adds to each child
+        value = re.sub(' xmlns="%s"' % XHTML, '', ''.join(parts))
+    else:
+        value = ''.join(element.itertext())
+
+    return value.strip()
+
+
+def _local_name(element):
+    return etree.QName(element).localname
+
+
+def _extra_key(element):
+    qname = etree.QName(element)
+
+    if qname.namespace:
+        prefix = element.prefix or qname.namespace.rstrip('/#').split('/')[-1]
+        key = '%s_%s' % (prefix, qname.localname.lower())
+    else:
+        key = qname.localname
+
+    return key
+
+
+def _add_author(entry, detail, author=None):
+    detail = {k: v for k, v in detail.items() if v}
+
+    if detail:
+        entry.setdefault('authors', []).append(detail)
+        entry.setdefault('author_detail', detail)
+
+        if not author and 'email' in detail:
+            author = '%(name)s (%(email)s)' % detail
+
+    if detail or author is not None:
+        entry['author'] = author or detail.get('name', author)
+
+
+def _add_link(entry, link):
+    entry.setdefault('links', []).append(link)
+
+    if link['rel'] == 'alternate':
+        entry.setdefault('link', link['href'])
+
+
+def _add_tag(entry, term, scheme=None, label=None):
+    if term:
+        tag = {'term': term, 'scheme': scheme, 'label': label}
+        entry.setdefault('tags', []).append(tag)
+
+
+def _finish(entry):
+    if 'summary' not in entry and entry.get('content'):
+        entry['summary'] = entry['content'][0]['value']
+
+    if 'link' not in entry and entry.get('guidislink', True) and 'id' in entry:
+        entry['link'] = entry['id']
+        entry['guidislink'] = True
+
+    return entry
+
+
+def _set_text(key, entry, child, text):
+    entry[key] = text
+
+
+def _rss_link(entry, child, text):
+    _add_link(entry, {'rel': 'alternate', 'type': 'text/html', 'href': text})
+
+
+def _rss_guid(entry, child, text):
+    entry['id'] = text
+    entry['guidislink'] = child.get('isPermaLink', 'true').lower() == 'true'
+
+
+def _rss_author(entry, child, text):
+    match = RSS_AUTHOR.match(text)
+    _add_author(entry, match.groupdict() if match else {}, text)
+
+
+def _rss_category(entry, child, text):
+    _add_tag(entry, text, child.get('domain') or None)
+
+
+def _rss_enclosure(entry, child, text):
+    attrs = dict(child.items(), rel='enclosure')
+    attrs['href'] = attrs.pop('url', '')
+    entry.setdefault('links', []).append(attrs)
+
+
+def _dc_creator(entry, child, text):
+    _add_author(entry, {'name': text}, text)
+
+
+def _dc_subject(entry, child, text):
+    _add_tag(entry, text)
+
+
+def _itunes_keywords(entry, child, text):
+    for keyword in filter(None, text.split(',')):
+        _add_tag(entry, keyword.strip(), 'http://www.itunes.com/')
+
+
+def _cc_license(entry, child, text):
+    _add_link(entry, {'rel': 'license', 'href': text})
+
+
+def _content_encoded(entry, child, text):
+    content = {'type': 'text/html', 'value': text}
+    entry.setdefault('content', []).append(content)
+
+
+def _extra(entry, child, text):
+    entry.setdefault(_extra_key(child), text)
+
+
+# the handlers of RSS 2.0 and RDF item elements, keyed by (namespace, name)
+RSS_HANDLERS = {
+    (None, 'guid'): _rss_guid,
+    (None, 'pubDate'): partial(_set_text, 'published'),
+    (None, 'author'): _rss_author,
+    (None, 'category'): _rss_category,
+    (None, 'enclosure'): _rss_enclosure,
+    (DC, 'creator'): _dc_creator,
+    (DC, 'author'): _dc_creator,
+    (DC, 'date'): partial(_set_text, 'updated'),
+    (DC, 'subject'): _dc_subject,
+    (ITUNES, 'creator'): _dc_creator,
+    (ITUNES, 'author'): _dc_creator,
+    (ITUNES, 'keywords'): _itunes_keywords,
+    (CC, 'license'): _cc_license,
+    (CONTENT, 'encoded'): _content_encoded}
+
+RSS_HANDLERS.update(
+    ((ns, name), handler) for ns in (None, RSS10) for name, handler in [
+        ('link', _rss_link),
+        ('title', partial(_set_text, 'title')),
+        ('comments', partial(_set_text, 'comments')),
+        ('description', partial(_set_text, 'summary'))])
+
+
+def rss2entry(element):
+    """Convert an RSS 2.0 or RDF item element into a feedparser style entry"""
+    entry = FeedEntry()
+
+    for child in element:
+        if isinstance(child.tag, str):
+            key = (etree.QName(child).namespace, _local_name(child))
+            handler = RSS_HANDLERS.get(key, _extra)
+            handler(entry, child, get_text(child))
+
+    if 'link' in entry and 'guidislink' in entry:
+        entry['guidislink'] = False
+    elif 'id' not in entry and element.get('{%s}about' % RDF):
+        entry['id'] = element.get('{%s}about' % RDF)
+
+    return _finish(entry)
+
+
+def atom2entry(element):
+    """Convert an Atom entry element into a feedparser style entry"""
+    entry = FeedEntry()
+
+    for child in element:
+        if not isinstance(child.tag, str):
+            continue
+
+        ns, name = etree.QName(child).namespace, _local_name(child)
+
+        if ns != ATOM:
+            entry.setdefault(_extra_key(child), get_text(child))
+        elif name == 'link':
+            link = dict(child.items())
+            link.setdefault('rel', 'alternate')
+            link.setdefault('type', 'text/html')
+            _add_link(entry, link)
+        elif name in {'title', 'id', 'summary'}:
+            entry[name] = get_text(child)
+        elif name in {'published', 'updated'}:
+            entry[name] = get_text(child)
+        elif name == 'content':
+            ctype = child.get('type', 'text')
+            ctype = 'application/xhtml+xml' if ctype == 'xhtml' else ctype
+            ctype = ctype if '/' in ctype else 'text/%s' % ctype
+            content = {'type': ctype.replace('text/text', 'text/plain')}
+            content['value'] = get_text(child)
+            entry.setdefault('content', []).append(content)
+        elif name == 'author':
+            fields = {_local_name(c): get_text(c) for c in child}
+            detail = {
+                'name': fields.get('name'), 'email': fields.get('email'),
+                'href': fields.get('uri')}
+
+            _add_author(entry, detail)
+        elif name == 'category':
+            scheme, label = child.get('scheme'), child.get('label')
+            _add_tag(entry, child.get('term'), scheme, label)
+
+    return _finish(entry)
+
+
+CONVERTERS = {'rss10': rss2entry, 'rss20': rss2entry, 'atom10': atom2entry}
+
+
+def gen_entries(f, encoding=None):
+    """Incrementally parse a feed, yielding each entry as soon as its end tag
+    is parsed
+
+    Args:
+        f (obj): A file like object (of bytes)
+        encoding (str): Overrides the document's declared encoding
+
+    Yields:
+        dict: entry
+
+    Raises:
+        NotAFeed: If the root element isn't `rss`, `RDF`, or `feed`
+        lxml.etree.XMLSyntaxError: If the feed isn't well-formed
+    """
+    events = ('start', 'end')
+    kwargs = {'encoding': encoding} if encoding else {}
+    kwargs.update({'events': events, 'resolve_entities': False})
+    context = etree.iterparse(f, **kwargs)
+    converter = None
+
+    for event, element in context:
+        if converter is None:
+            version = VERSIONS.get(_local_name(element))
+
+            if not version:
+                raise NotAFeed(_local_name(element))
+
+            converter = CONVERTERS[version]
+        elif event == 'end' and element.tag in ENTRY_TAGS:
+            yield converter(element)
+
+            # free the entry and anything before it
+            element.clear()
+
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+
+def _fallback(entries, content):
+    count = 0
+
+    try:
+        for entry in entries:
+            count += 1
+            yield entry
+    except etree.XMLSyntaxError as e:
+        logger.debug('Falling back to feedparser: %s', e)
+        parsed = feedparser.parse(content)
+
+        if parsed.get('bozo_exception'):
+            raise Exception(parsed['bozo_exception'])
+
+        for entry in parsed['entries'][count:]:
+            yield entry
+
+
+def feedparse(source):
+    """Parse a feed with feedparser
+
+    Args:
+        source (str): The feed content or url
+
+    Returns:
+        dict: The parsed feed. `entries` is an iterator of entries (like
+            `parse` returns).
+
+    Examples:
+        >>> rss = b'<rss><channel><item><title>a</title></item></channel></rss>'
+        >>> [e['title'] for e in feedparse(rss)['entries']]
+        ['a']
+    """
+    parsed = feedparser.parse(source)
+    parsed['entries'] = iter(parsed['entries'])
+    return parsed
+
+
+def parse(content):
+    """Parse a feed
+
+    Args:
+        content (str): The feed content
+
+    Returns:
+        dict: The parsed feed. `entries` is an iterator of entries.
+
+    Examples:
+        >>> list(parse(b'<not>a feed</not>')['entries'])
+        []
+        >>> rss = b'<rss><channel><item><title>a</title></item></channel></rss>'
+        >>> [e['title'] for e in parse(rss)['entries']]
+        ['a']
+    """
+    if not etree:
+        return feedparse(content)
+
+    if isinstance(content, str):
+        encoding, content = 'utf-8', content.encode('utf-8')
+    else:
+        encoding = None
+
+    entries = gen_entries(BytesIO(content), encoding)
+
+    try:
+        first = [next(entries)]
+    except StopIteration:
+        parsed = {'bozo': 0, 'entries': iter([])}
+    except (NotAFeed, etree.XMLSyntaxError) as e:
+        logger.debug('Falling back to feedparser: %s', e)
+        parsed = feedparse(content)
+    else:
+        remaining = _fallback(entries, content)
+        parsed = {'bozo': 0, 'entries': chain(first, remaining)}
+
+    return parsed
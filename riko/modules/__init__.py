@@ -10,6 +10,7 @@ from __future__ import (
 import pygogo as gogo
 
 from functools import partial, wraps
+from importlib import import_module
 from itertools import chain
 
 from builtins import iter, list, map, next
@@ -41,15 +42,19 @@ __sources__ = [
 __aggregators__ = [
     'count',
     'sum',
-    # 'mean',
-    # 'min',
-    # 'max',
+    'mean',
+    'min',
+    'max',
+    'distinct',
+    'quantile',
+    'window',
 ]
 
 __composers__ = [
     'filter',
     'reverse',
     'sort',
+    'sortedmerge',
     'split',
     'tail',
     'truncate',
@@ -89,6 +94,180 @@ __transformers__ = [
 
 __all__ = __sources__ + __composers__ + __transformers__ + __aggregators__
 
+# sources that accept a `fields` option, and other modules whose only reads of
+# an item are the fields named by `field`, `subkey`, or one of `FIELD_KEYS`
+__projectable__ = [
+    'fetch',
+    'fetchdata',
+    'xpathfetchpage',
+    'count',
+    'currencyformat',
+    'dateformat',
+    'distinct',
+    'exchangerate',
+    'filter',
+    'hash',
+    'max',
+    'mean',
+    'min',
+    'quantile',
+    'regex',
+    'rename',
+    'refind',
+    'reverse',
+    'simplemath',
+    'slugify',
+    'sort',
+    'strconcat',
+    'strfind',
+    'strreplace',
+    'strtransform',
+    'substr',
+    'sum',
+    'tail',
+    'tokenizer',
+    'truncate',
+    'typecast',
+    'uniq',
+    'urlparse',
+]
+
+# sources that accept a `chain` of item wise pipes to run on each chunk they
+# read in parallel, and operators that only look at one item at a time (and
+# so can be part of a chain)
+__chainable__ = ['fetchtext']
+__itemwise__ = ['filter']
+
+# aggregators that can merge the partial aggregations of chunks of their
+# source (see `riko.aggregates.combine`)
+__combinable__ = [
+    'count', 'sum', 'mean', 'min', 'max', 'distinct', 'quantile']
+
+FIELD_KEYS = {
+    'field', 'sort_key', 'uniq_key', 'count_key', 'sum_key', 'mean_key',
+    'min_key', 'max_key', 'distinct_key', 'quantile_key', 'group_key'}
+
+
+def _gen_field_reads(value):
+    # yields the reads of a `FIELD_KEYS` value
+    if hasattr(value, 'keys'):
+        yield value.get('value')
+
+        for read in _gen_reads(value):
+            yield read
+    elif isinstance(value, (list, tuple)):
+        # e.g., `uniq` on multiple fields
+        for read in value:
+            yield read
+    elif value:
+        yield value
+
+
+def _gen_reads(conf):
+    # yields None if a read can't be determined until run time
+    if hasattr(conf, 'keys'):
+        items = conf.items()
+    elif isinstance(conf, (list, tuple)):
+        items = ((None, value) for value in conf)
+    else:
+        items = []
+
+    for key, value in items:
+        if key == 'subkey':
+            reads = [value]
+        elif key in FIELD_KEYS:
+            reads = _gen_field_reads(value)
+        else:
+            reads = _gen_reads(value)
+
+        for read in reads:
+            yield read
+
+
+def get_reads(name, **kwargs):
+    """Determines which item fields a module reads
+
+    Args:
+        name (str): The module name
+        kwargs (dict): The module's keyword arguments
+
+    Returns:
+        set: The field names (or None if the module may read any field)
+
+    Examples:
+        >>> conf = {'rule': {'sort_key': 'title'}}
+        >>> get_reads('sort', conf=conf) == {'title'}
+        True
+        >>> sorted(get_reads('tokenizer', conf={'delimiter': {'subkey': 'd'}}))
+        ['content', 'd']
+        >>> get_reads('strconcat', conf={'part': [{'value': 'a'}]}) == set()
+        True
+        >>> get_reads('itembuilder') is None
+        True
+    """
+    skip_if = kwargs.get('skip_if')
+
+    if name not in __projectable__ or callable(skip_if):
+        return None
+
+    module = import_module('riko.modules.%s' % name)
+    opts = getattr(module, 'OPTS', {})
+    conf = merge([getattr(module, 'DEFAULTS', {}), kwargs.get('conf') or {}])
+    reads = list(_gen_reads(conf))
+    reads.extend(skip['field'] for skip in listize(skip_if or []))
+    field = kwargs.get('field', opts.get('field'))
+
+    if field:
+        reads.append(field)
+
+    return None if None in reads else set(reads)
+
+
+def get_source_fields(name, fields=None, **kwargs):
+    """Determines which item fields a module needs from its source
+
+    Args:
+        name (str): The module name
+        fields (set): The fields that are read from the module's output
+            (default: None, i.e., all of them)
+
+        kwargs (dict): The module's keyword arguments
+
+    Returns:
+        set: The field names (or None if all fields are needed)
+
+    Examples:
+        >>> conf = {'rule': {'sort_key': 'title'}}
+        >>> get_source_fields('sort', conf=conf) is None
+        True
+        >>> fields = {'link'}
+        >>> sorted(get_source_fields('sort', fields, conf=conf))
+        ['link', 'title']
+        >>> get_source_fields('count') == set()
+        True
+        >>> sorted(get_source_fields('tokenizer', emit=True))
+        ['content']
+    """
+    reads = get_reads(name, **kwargs)
+
+    if name in __aggregators__ or reads is None:
+        # aggregators emit new items
+        return reads
+
+    module = import_module('riko.modules.%s' % name)
+    opts = getattr(module, 'OPTS', {})
+    ptype = module.pipe.__dict__.get('type')
+
+    if ptype == 'processor' and kwargs.get('emit') and 'emit' not in opts:
+        # the processor emits new items instead of its (updated) source items
+        source_fields = reads
+    elif fields is None:
+        source_fields = None
+    else:
+        source_fields = reads.union(fields)
+
+    return source_fields
+
 
 def get_assignment(result, skip=False, **kwargs):
     # print(result)
@@ -119,8 +298,15 @@ def get_assignment(result, skip=False, **kwargs):
 def assign(item, assignment, **kwargs):
     key = kwargs.get('assign')
     value = next(assignment) if kwargs.get('one') else list(assignment)
-    merged = merge([item, {key: value}])
-    yield DotDict(merged) if kwargs.get('dictize') else merged
+
+    if kwargs.get('dictize'):
+        # don't compute the pending fields of lazy items (e.g., feed entries)
+        merged = DotDict(item)
+        merged.update({key: value})
+    else:
+        merged = merge([item, {key: value}])
+
+    yield merged
 
 
 class processor(object):
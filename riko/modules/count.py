@@ -20,19 +20,37 @@ Attributes:
 from __future__ import (
     absolute_import, division, print_function, unicode_literals)
 
-import itertools as it
 import pygogo as gogo
 
-from operator import itemgetter
 from builtins import *  # noqa # pylint: disable=unused-import
 
 from . import operator
+from riko.aggregates import get_aggregate, get_group_keys
 
 OPTS = {'extract': 'count_key'}
 DEFAULTS = {'count_key': None}
 logger = gogo.Gogo(__name__, monolog=True).logger
 
 
+def get_aggregation(conf=None):
+    """Gets what the pipe aggregates, so that workers can aggregate chunks of
+    its source (see `riko.aggregates.accumulate`)
+
+    Args:
+        conf (dict): The pipe configuration (default: None)
+
+    Returns:
+        Tuple[List[str], List[Tuple[str, str]]]: The group keys and the
+            (aggregate, field) pairs
+
+    Examples:
+        >>> get_aggregation({'count_key': 'word'})
+        (['word'], [('count', None)])
+    """
+    key = (conf or {}).get('count_key', DEFAULTS['count_key'])
+    return get_group_keys(key), [('count', None)]
+
+
 def parser(stream, key, tuples, **kwargs):
     """ Parses the pipe content
 
@@ -40,7 +58,7 @@ def parser(stream, key, tuples, **kwargs):
         stream (Iter[dict]): The source. Note: this shares the `tuples`
             iterator, so consuming it will consume `tuples` as well.
 
-        key (str): the field to group by.
+        key (str): the field (or list of fields) to group by.
 
         tuples (Iter[(dict, obj)]): Iterable of tuples of (item, objconf)
             `item` is an element in the source stream and `objconf` is the item
@@ -51,6 +69,8 @@ def parser(stream, key, tuples, **kwargs):
 
     Kwargs:
         conf (dict): The pipe configuration.
+        partials (Iter[dict]): Accumulators of chunks of the source that
+            were counted by workers (default: None).
 
     Returns:
         mixed: The output either a dict or iterable of dicts
@@ -72,15 +92,7 @@ def parser(stream, key, tuples, **kwargs):
         >>> next(counted) == {'two': 2}
         True
     """
-    if key:
-        keyfunc = itemgetter(key)
-        sorted_stream = sorted(stream, key=keyfunc)
-        grouped = it.groupby(sorted_stream, keyfunc)
-        counted = ({key: len(list(group))} for key, group in grouped)
-    else:
-        counted = {kwargs['assign']: len(list(stream))}
-
-    return counted
+    return get_aggregate(stream, 'count', group_key=key, **kwargs)
 
 
 @operator(DEFAULTS, isasync=True, **OPTS)
@@ -97,11 +109,12 @@ def async_pipe(*args, **kwargs):
 
             count_key (str): Item attribute to count by. This will group items
                 in the stream by the given key and report a count for each
-                group (default: None).
+                group (default: None). If a list of attributes, each group's
+                item holds the attributes along with the count.
 
-        assign (str): Attribute to assign parsed content. If `count_key` is set,
-            this is ignored and the group keys are used instead. (default:
-            content)
+        assign (str): Attribute to assign parsed content. If `count_key` is a
+            single attribute, this is ignored and the group keys are used
+            instead. (default: content)
 
     Returns:
         Deferred: twisted.internet.defer.Deferred iterator of the number of
@@ -129,8 +142,8 @@ def async_pipe(*args, **kwargs):
 
 @operator(DEFAULTS, **OPTS)
 def pipe(*args, **kwargs):
-    """An aggregator that eagerly counts the number of items in a stream.
-    Note that this pipe is not lazy.
+    """An aggregator that eagerly counts the number of items in a stream in a
+    single pass. Note that this pipe is not lazy.
 
     Args:
         items (Iter[dict]): The source.
@@ -141,11 +154,12 @@ def pipe(*args, **kwargs):
 
             count_key (str): Item attribute to count by. This will group items
                 in the stream by the given key and report a count for each
-                group (default: None).
+                group (default: None). If a list of attributes, each group's
+                item holds the attributes along with the count.
 
-        assign (str): Attribute to assign parsed content. If `count_key` is set,
-            this is ignored and the group keys are used instead. (default:
-            content)
+        assign (str): Attribute to assign parsed content. If `count_key` is a
+            single attribute, this is ignored and the group keys are used
+            instead. (default: content)
 
     Yields:
         dict: the number of counted items
@@ -160,5 +174,12 @@ def pipe(*args, **kwargs):
         True
         >>> next(counted) == {'two': 2}
         True
+        >>> stream = [
+        ...     {'word': 'two', 'len': 3},
+        ...     {'word': 'one', 'len': 3},
+        ...     {'word': 'two', 'len': 3}]
+        >>> counted = pipe(stream, conf={'count_key': ['len', 'word']})
+        >>> next(counted) == {'len': 3, 'word': 'one', 'count': 1}
+        True
     """
     return parser(*args, **kwargs)
@@ -22,25 +22,211 @@ Attributes:
 from __future__ import (
     absolute_import, division, print_function, unicode_literals)
 
+import csv
 import pygogo as gogo
 
+from io import StringIO
+from multiprocessing import Pool, cpu_count
+
 from builtins import *  # noqa # pylint: disable=unused-import
 from meza.io import read_csv
 from meza.process import merge
+from meza.fntools import underscorify, dedupe
 
 from . import processor
 from riko import ENCODING
 from riko.bado import coroutine, return_value, io
-from riko.utils import fetch, auto_close, get_abspath
+from riko.utils import fetch, auto_close, get_abspath, get_local_path
 
 OPTS = {'ftype': 'none'}
 DEFAULTS = {
     'delimiter': ',', 'quotechar': '"', 'encoding': ENCODING, 'skip_rows': 0,
-    'sanitize': True, 'dedupe': True, 'col_names': None, 'has_header': True}
+    'sanitize': True, 'dedupe': True, 'col_names': None, 'has_header': True,
+    'parallel': False, 'workers': None, 'ordered': True, 'chunksize': 2 ** 24}
+
+# the size of the blocks read while looking for chunk boundaries
+BLOCK_SIZE = 2 ** 16
 
 logger = gogo.Gogo(__name__, monolog=True).logger
 
 
+def get_header(names, objconf):
+    """Get the field names the same way `meza.io.read_csv` does
+
+    Args:
+        names (List[str]): The first row
+        objconf (obj): The pipe configuration (an Objectify instance)
+
+    Returns:
+        List[str]: The field names
+
+    Examples:
+        >>> from meza.fntools import Objectify
+        >>>
+        >>> objconf = Objectify({'has_header': True, 'sanitize': True})
+        >>> get_header(['Name', ' ', 'Total Miles'], objconf)
+        ['name', 'total_miles']
+        >>> get_header(['a', 'b'], Objectify({'has_header': False}))
+        ['column_1', 'column_2']
+    """
+    if objconf.has_header or objconf.col_names:
+        names = objconf.col_names or names
+        stripped = (name for name in names if name.strip())
+        uscored = underscorify(stripped) if objconf.sanitize else stripped
+        header = list(dedupe(uscored) if objconf.dedupe else uscored)
+    else:
+        header = ['column_%i' % (n + 1) for n in range(len(names))]
+
+    return header
+
+
+def _find_boundary(f, pos, quote, quoted=False):
+    # the offset just past the first newline at or after `pos` that isn't
+    # inside of a quoted field
+    f.seek(pos)
+
+    for block in iter(lambda: f.read(BLOCK_SIZE), b''):
+        start = 0
+
+        while True:
+            newline = block.find(b'\n', start)
+
+            if newline < 0:
+                quoted ^= bool(block.count(quote, start) % 2)
+                break
+
+            quoted ^= bool(block.count(quote, start, newline) % 2)
+
+            if not quoted:
+                return pos + newline + 1
+
+            start = newline + 1
+
+        pos += len(block)
+
+    return pos
+
+
+def gen_ranges(f, start, chunksize, quotechar='"', encoding=ENCODING):
+    """Split a csv file into byte ranges that each end at a row boundary.
+    Newlines inside of quoted fields are skipped over by keeping track of the
+    number of quote characters seen.
+
+    Args:
+        f (obj): The file like object (opened in binary mode)
+        start (int): The offset of the first row
+        chunksize (int): The approximate number of bytes in each range
+        quotechar (str): Quote character (default: '"').
+        encoding (str): File encoding (default: 'utf-8').
+
+    Yields:
+        Tuple[int, int]: The start and end offsets of each range
+
+    Examples:
+        >>> from io import BytesIO
+        >>>
+        >>> f = BytesIO(b'a,b\\n1,"x\\ny"\\n2,z\\n3,w\\n')
+        >>> list(gen_ranges(f, 4, 5))
+        [(4, 12), (12, 20)]
+    """
+    quote = quotechar.encode(encoding)
+    size = f.seek(0, 2)
+
+    while start < size:
+        end = start + chunksize
+
+        if end < size:
+            f.seek(start)
+            quoted = bool(f.read(chunksize).count(quote) % 2)
+            end = _find_boundary(f, end, quote, quoted)
+
+        yield start, min(end, size)
+        start = end
+
+
+def read_range(args):
+    """Parse a byte range of a csv file (in a worker process)
+
+    Args:
+        args (Tuple): The file path, start offset, end offset, field names,
+            encoding, and csv reader keyword arguments.
+
+    Returns:
+        List[dict]: The rows (empty rows are skipped)
+    """
+    path, start, end, header, encoding, kwargs = args
+
+    with open(path, 'rb') as f:
+        f.seek(start)
+        content = f.read(end - start).decode(encoding)
+
+    padding = [None] * len(header)
+    records = []
+
+    # like `csv.DictReader` + `meza.io._read_csv`, but without the per row
+    # overhead
+    for row in csv.reader(StringIO(content, newline=''), **kwargs):
+        if any(value.strip() for value in row[:len(header)]):
+            records.append(dict(zip(header, row + padding)))
+
+    return records
+
+
+def get_reader_kwargs(objconf):
+    return {'delimiter': objconf.delimiter, 'quotechar': objconf.quotechar}
+
+
+def gen_records(pool, path, ranges, header, objconf):
+    kwargs = get_reader_kwargs(objconf)
+    args = ((path, s, e, header, objconf.encoding, kwargs) for s, e in ranges)
+    imap = pool.imap if objconf.ordered else pool.imap_unordered
+
+    try:
+        for records in imap(read_range, args):
+            for record in records:
+                yield record
+    finally:
+        pool.terminate()
+
+
+def parallel_read(path, objconf):
+    """Parse a local csv file with a pool of processes
+
+    Args:
+        path (str): The file path
+        objconf (obj): The pipe configuration (an Objectify instance)
+
+    Returns:
+        Iter[dict]: The stream of items
+
+    Examples:
+        >>> from os import path as p
+        >>> from meza.fntools import Objectify
+        >>>
+        >>> path = p.join(p.dirname(p.dirname(__file__)), 'data')
+        >>> path = p.join(path, 'spreadsheet.csv')
+        >>> conf = merge([DEFAULTS, {'workers': 2, 'chunksize': 1024}])
+        >>> records = list(parallel_read(path, Objectify(conf)))
+        >>> len(records), records[0]['mileage']
+        (645, '7213')
+    """
+    with open(path, 'rb') as f:
+        for _ in range(objconf.skip_rows):
+            f.readline()
+
+        first_row = f.tell()
+        first_line = f.readline().decode(objconf.encoding)
+        reader = csv.reader([first_line], **get_reader_kwargs(objconf))
+        header = get_header(next(reader), objconf)
+        start = f.tell() if objconf.has_header else first_row
+        chunksize = objconf.chunksize or DEFAULTS['chunksize']
+        encoding, quotechar = objconf.encoding, objconf.quotechar
+        ranges = list(gen_ranges(f, start, chunksize, quotechar, encoding))
+
+    pool = Pool(objconf.workers or cpu_count())
+    return gen_records(pool, path, ranges, header, objconf)
+
+
 @coroutine
 def async_parser(_, objconf, skip=False, **kwargs):
     """ Asynchronously parses the pipe content
@@ -120,6 +306,13 @@ def parser(_, objconf, skip=False, **kwargs):
     if skip:
         stream = kwargs['stream']
     else:
+        path = get_local_path(objconf.url, objconf.encoding)
+
+        if objconf.parallel and path:
+            return parallel_read(path, objconf)
+        elif objconf.parallel:
+            logger.warning('Only local files can be read in parallel.')
+
         first_row, custom_header = objconf.skip_rows, objconf.col_names
         renamed = {'first_row': first_row, 'custom_header': custom_header}
 
@@ -193,7 +386,8 @@ def pipe(*args, **kwargs):
     Kwargs:
         conf (dict): The pipe configuration. Must contain the key 'url'. May
             contain the keys 'delimiter', 'quotechar', 'encoding', 'skip_rows',
-            'sanitize', 'dedupe', 'col_names', or 'has_header'.
+            'sanitize', 'dedupe', 'col_names', 'has_header', 'parallel',
+            'workers', 'ordered', or 'chunksize'.
 
             url (str): The csv file to fetch
             delimiter (str): Field delimiter (default: ',').
@@ -208,6 +402,17 @@ def pipe(*args, **kwargs):
 
             dedupe (bool): Deduplicate column names (default: False).
             col_names (List[str]): Custom column names (default: None).
+            parallel (bool): Parse local files in chunks using a pool of
+                processes (default: False).
+
+            workers (int): Number of processes (default: None, i.e., the
+                number of cpus).
+
+            ordered (bool): Keep the rows in file order when parsing in
+                parallel (default: True).
+
+            chunksize (int): Approximate number of bytes each process parses
+                at a time (default: 16 MiB).
 
     Yields:
         dict: item
@@ -217,5 +422,8 @@ def pipe(*args, **kwargs):
         >>> url = get_path('spreadsheet.csv')
         >>> next(pipe(conf={'url': url}))['mileage'] == '7213'
         True
+        >>> conf = {'url': url, 'parallel': True, 'workers': 2}
+        >>> next(pipe(conf=conf))['mileage'] == '7213'
+        True
     """
     return parser(*args, **kwargs)
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+# vim: sw=4:ts=4:expandtab
+"""
+riko.modules.distinct
+~~~~~~~~~~~~~~~~~~~~~
+Provides functions for estimating the number of distinct values of a field in
+a stream (with a fixed size HyperLogLog sketch).
+
+Examples:
+    basic usage::
+
+        >>> from riko.modules.distinct import pipe
+        >>>
+        >>> stream = pipe({'content': x % 3} for x in range(5))
+        >>> next(stream) == {'distinct': 3}
+        True
+
+Attributes:
+    OPTS (dict): The default pipe options
+    DEFAULTS (dict): The default parser options
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals)
+
+import pygogo as gogo
+
+from builtins import *  # noqa # pylint: disable=unused-import
+from meza.process import merge
+
+from . import operator
+from riko.aggregates import get_aggregate, get_group_keys
+
+OPTS = {}
+DEFAULTS = {'distinct_key': 'content', 'group_key': None, 'precision': 12}
+logger = gogo.Gogo(__name__, monolog=True).logger
+
+
+def get_aggregation(conf=None):
+    """Gets what the pipe aggregates, so that workers can aggregate chunks of
+    its source (see `riko.aggregates.accumulate`)
+
+    Args:
+        conf (dict): The pipe configuration (default: None)
+
+    Returns:
+        Tuple[List[str], List[Tuple[str, str]]]: The group keys and the
+            (aggregate, field) pairs
+
+    Examples:
+        >>> get_aggregation({'distinct_key': 'author', 'group_key': 'x'})
+        (['x'], [('distinct', 'author', 12)])
+    """
+    conf = merge([DEFAULTS, conf or {}])
+    spec = ('distinct', conf['distinct_key'], int(conf['precision']))
+    return get_group_keys(conf['group_key']), [spec]
+
+
+def parser(stream, objconf, tuples, **kwargs):
+    """ Parses the pipe content
+
+    Args:
+        stream (Iter[dict]): The source. Note: this shares the `tuples`
+            iterator, so consuming it will consume `tuples` as well.
+
+        objconf (obj): The pipe configuration (an Objectify instance)
+
+        tuples (Iter[(dict, obj)]): Iterable of tuples of (item, objconf)
+            `item` is an element in the source stream and `objconf` is the item
+            configuration (an Objectify instance). Note: this shares the
+            `stream` iterator, so consuming it will consume `stream` as well.
+
+        kwargs (dict): Keyword arguments.
+
+    Kwargs:
+        conf (dict): The pipe configuration.
+        partials (Iter[dict]): Accumulators of chunks of the source that
+            were aggregated by workers (default: None).
+
+    Returns:
+        mixed: The output either a dict or iterable of dicts
+
+    Examples:
+        >>> from itertools import repeat
+        >>> from meza.fntools import Objectify
+        >>>
+        >>> stream = ({'content': x % 3} for x in range(5))
+        >>> objconf = Objectify({'distinct_key': 'content', 'precision': 12})
+        >>> tuples = zip(stream, repeat(objconf))
+        >>> args = (stream, objconf, tuples)
+        >>> parser(*args, assign='content') == {'content': 3}
+        True
+        >>> conf = {'distinct_key': 'author', 'group_key': 'x', 'precision': 4}
+        >>> objconf = Objectify(conf)
+        >>> stream = [
+        ...     {'author': 'ann', 'x': 'one'},
+        ...     {'author': 'bob', 'x': 'one'},
+        ...     {'author': 'ann', 'x': 'two'}]
+        >>> tuples = zip(stream, repeat(objconf))
+        >>> counted = parser(stream, objconf, tuples)
+        >>> next(counted) == {'one': 2}
+        True
+        >>> next(counted) == {'two': 1}
+        True
+    """
+    args = (stream, 'distinct', objconf.distinct_key, objconf.group_key)
+    params = (int(objconf.precision),)
+    return get_aggregate(*args, params=params, **kwargs)
+
+
+@operator(DEFAULTS, isasync=True, **OPTS)
+def async_pipe(*args, **kwargs):
+    """An aggregator that asynchronously and eagerly estimates the number of
+    distinct values of a field of items in a stream. Note that this pipe is
+    not lazy.
+
+    Args:
+        items (Iter[dict]): The source.
+        kwargs (dict): The keyword arguments passed to the wrapper
+
+    Kwargs:
+        conf (dict): The pipe configuration. May contain the keys
+            'distinct_key', 'group_key', or 'precision'.
+
+            distinct_key (str): Item attribute to count the distinct values
+                of. (default: 'content').
+
+            group_key (str): Item attribute to group by. This will group
+                items in the stream by the given key and report a count for
+                each group (default: None). If a list of attributes, each
+                group's item holds the attributes along with the count.
+
+            precision (int): The sketch uses `2 ** precision` bytes (per
+                group) and has a standard error of about
+                `1.04 / sqrt(2 ** precision)`. Must be between 4 and 16
+                (default: 12, i.e., 4 KiB and 1.6%).
+
+        assign (str): Attribute to assign parsed content. If `group_key` is a
+            single attribute, this is ignored and the group keys are used
+            instead. (default: content)
+
+    Returns:
+        Deferred: twisted.internet.defer.Deferred iterator of the distinct
+            counts
+
+    Examples:
+        >>> from riko.bado import react
+        >>> from riko.bado.mock import FakeReactor
+        >>>
+        >>> def run(reactor):
+        ...     callback = lambda x: print(next(x) == {'distinct': 3})
+        ...     items = ({'content': x % 3} for x in range(5))
+        ...     d = async_pipe(items)
+        ...     return d.addCallbacks(callback, logger.error)
+        >>>
+        >>> try:
+        ...     react(run, _reactor=FakeReactor())
+        ... except SystemExit:
+        ...     pass
+        ...
+        True
+    """
+    return parser(*args, **kwargs)
+
+
+@operator(DEFAULTS, **OPTS)
+def pipe(*args, **kwargs):
+    """An aggregator that eagerly estimates the number of distinct values of a
+    field of items in a stream in a single pass and fixed memory. Note that
+    this pipe is not lazy.
+
+    Args:
+        items (Iter[dict]): The source.
+        kwargs (dict): The keyword arguments passed to the wrapper
+
+    Kwargs:
+        conf (dict): The pipe configuration. May contain the keys
+            'distinct_key', 'group_key', or 'precision'.
+
+            distinct_key (str): Item attribute to count the distinct values
+                of. (default: 'content').
+
+            group_key (str): Item attribute to group by. This will group
+                items in the stream by the given key and report a count for
+                each group (default: None). If a list of attributes, each
+                group's item holds the attributes along with the count.
+
+            precision (int): The sketch uses `2 ** precision` bytes (per
+                group) and has a standard error of about
+                `1.04 / sqrt(2 ** precision)`. Must be between 4 and 16
+                (default: 12, i.e., 4 KiB and 1.6%).
+
+        assign (str): Attribute to assign parsed content. If `group_key` is a
+            single attribute, this is ignored and the group keys are used
+            instead. (default: content)
+
+    Yields:
+        dict: the distinct counts
+
+    Examples:
+        >>> stream = ({'content': x % 3} for x in range(5))
+        >>> next(pipe(stream)) == {'distinct': 3}
+        True
+        >>> stream = ({'content': x % 5000} for x in range(10000))
+        >>> count = next(pipe(stream))['distinct']
+        >>> 4800 < count < 5200
+        True
+        >>> stream = [
+        ...     {'author': 'ann', 'x': 'one'},
+        ...     {'author': 'bob', 'x': 'one'},
+        ...     {'author': 'ann', 'x': 'two'}]
+        >>> conf = {'distinct_key': 'author', 'group_key': 'x'}
+        >>> counted = pipe(stream, conf=conf)
+        >>> next(counted) == {'one': 2}
+        True
+        >>> next(counted) == {'two': 1}
+        True
+    """
+    return parser(*args, **kwargs)
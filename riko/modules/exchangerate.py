@@ -28,11 +28,11 @@ from json import loads
 from decimal import Decimal
 
 from builtins import *  # noqa # pylint: disable=unused-import
-from ijson import items
 from meza.compat import decode
 
 from . import processor
 from riko.bado import coroutine, return_value, requests as treq, io
+from riko.parsers import items
 from riko.utils import fetch, get_abspath
 
 EXCHANGE_API_BASE = 'http://finance.yahoo.com/webservice'
@@ -45,6 +45,7 @@ from riko.bado import coroutine, return_value
 
 
 OPTS = {'ftype': 'none'}
+DEFAULTS = {'memoize': True}
 logger = gogo.Gogo(__name__, monolog=True).logger
 
 
@@ -87,7 +88,8 @@ def async_parser(_, objconf, skip=False, **kwargs):
         stream = kwargs['stream']
     else:
         url = get_abspath(objconf.url)
-        stream = yield autorss.async_get_rss(url)
+        cache_kwargs = autorss.get_cache_kwargs(objconf)
+        stream = yield autorss.async_get_rss(url, **cache_kwargs)
 
     return_value(stream)
 
@@ -120,12 +122,13 @@ def parser(_, objconf, skip=False, **kwargs):
         stream = kwargs['stream']
     else:
         url = get_abspath(objconf.url)
-        stream = autorss.get_rss(url)
+        cache_kwargs = autorss.get_cache_kwargs(objconf)
+        stream = autorss.get_rss(url, **cache_kwargs)
 
     return stream
 
 
-@processor(isasync=True, **OPTS)
+@processor(DEFAULTS, isasync=True, **OPTS)
 def async_pipe(*args, **kwargs):
     """A source that fetches and parses the first feed found on a site.
 
@@ -134,9 +137,20 @@ def async_pipe(*args, **kwargs):
         kwargs (dict): The keyword arguments passed to the wrapper.
 
     Kwargs:
-        conf (dict): The pipe configuration. Must contain the key 'url'.
+        conf (dict): The pipe configuration. Must contain the key 'url'. May
+            contain the keys 'memoize', 'cache_type', or 'cache_timeout'.
 
             url (str): The web site to fetch
+            memoize (bool): Cache the discovered feed urls so the site isn't
+                fetched again (default: True).
+
+            cache_type (str): The `mezmorize` cache type (default: 'auto',
+                i.e., memcached or redis if available, a filesystem cache if
+                the `CACHE_DIR` environment variable is set, and an in-memory
+                cache otherwise).
+
+            cache_timeout (int): Number of seconds to cache the discovered
+                feed urls (default: 86400, i.e., a day).
 
     Returns:
         dict: twisted.internet.defer.Deferred an iterator of items
@@ -162,7 +176,7 @@ def async_pipe(*args, **kwargs):
     return async_parser(*args, **kwargs)
 
 
-@processor(**OPTS)
+@processor(DEFAULTS, **OPTS)
 def pipe(*args, **kwargs):
     """A source that fetches and parses the first feed found on a site.
 
@@ -171,9 +185,20 @@ def pipe(*args, **kwargs):
         kwargs (dict): The keyword arguments passed to the wrapper
 
     Kwargs:
-        conf (dict): The pipe configuration. Must contain the key 'url'.
+        conf (dict): The pipe configuration. Must contain the key 'url'. May
+            contain the keys 'memoize', 'cache_type', or 'cache_timeout'.
 
             url (str): The web site to fetch
+            memoize (bool): Cache the discovered feed urls so the site isn't
+                fetched again (default: True).
+
+            cache_type (str): The `mezmorize` cache type (default: 'auto',
+                i.e., memcached or redis if available, a filesystem cache if
+                the `CACHE_DIR` environment variable is set, and an in-memory
+                cache otherwise).
+
+            cache_timeout (int): Number of seconds to cache the discovered
+                feed urls (default: 86400, i.e., a day).
 
     Yields:
         dict: item
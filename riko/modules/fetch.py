@@ -31,6 +31,7 @@ from builtins import *  # noqa # pylint: disable=unused-import
 
 from . import processor
 from riko.bado import coroutine, return_value, io
+from riko.feeds import parse
 from riko.parsers import parse_rss
 from riko.utils import gen_entries, get_abspath
 
@@ -55,6 +56,7 @@ def async_parser(_, objconf, skip=False, **kwargs):
     Kwargs:
         stream (dict): The original item
         conf (dict): The pipe configuration
+        fields (Iter[str]): Only include these fields in each item
 
     Returns:
         Deferred: twisted.internet.defer.Deferred Iter[dict]
@@ -83,8 +85,8 @@ def async_parser(_, objconf, skip=False, **kwargs):
     else:
         url = get_abspath(objconf.url)
         content = yield io.async_url_read(url, delay=objconf.delay)
-        parsed = parse_rss(content)
-        stream = gen_entries(parsed)
+        parsed = parse(content)
+        stream = gen_entries(parsed, kwargs.get('fields'))
 
     return_value(stream)
 
@@ -101,6 +103,7 @@ def parser(_, objconf, skip=False, **kwargs):
     Kwargs:
         stream (dict): The original item
         conf (dict): The pipe configuration
+        fields (Iter[str]): Only include these fields in each item
 
     Returns:
         Iter[dict]: The stream of items
@@ -118,7 +121,7 @@ def parser(_, objconf, skip=False, **kwargs):
         stream = kwargs['stream']
     else:
         parsed = parse_rss(**objconf)
-        stream = gen_entries(parsed)
+        stream = gen_entries(parsed, kwargs.get('fields'))
 
     return stream
 
@@ -140,6 +143,10 @@ def async_pipe(*args, **kwargs):
             delay (flt): Amount of time to sleep (in secs) before fetching the
                 url. Useful for simulating network latency. Default: 0.
 
+        fields (Iter[str]): Only include these fields in each item (default:
+            None, i.e., include all fields). `SyncPipe` sets this
+            automatically when the stages that follow only read some fields.
+
 
     Returns:
         Deferred: twisted.internet.defer.Deferred iterator of items
@@ -182,6 +189,10 @@ def pipe(*args, **kwargs):
             delay (flt): Amount of time to sleep (in secs) before fetching the
                 url. Useful for simulating network latency. Default: 0.
 
+        fields (Iter[str]): Only include these fields in each item (default:
+            None, i.e., include all fields). `SyncPipe` sets this
+            automatically when the stages that follow only read some fields.
+
     Returns:
         dict: an iterator of items
 
@@ -196,5 +207,7 @@ def pipe(*args, **kwargs):
         >>> keys = next(pipe(conf={'url': url, 'memoize': True})).keys()
         >>> set(keys).issuperset(intersection)
         True
+        >>> sorted(next(pipe(conf={'url': url}, fields=['y:title', 'link'])))
+        ['link', 'y:title']
     """
     return parser(*args, **kwargs)
@@ -32,9 +32,9 @@ import pygogo as gogo
 from builtins import *  # noqa # pylint: disable=unused-import
 
 from . import processor
-from riko.bado import coroutine, return_value, io
-from riko.parsers import any2dict
-from riko.utils import fetch, get_abspath
+from riko.bado import coroutine, return_value, io, util
+from riko.parsers import any2dict, iterparse_records, json_records
+from riko.utils import fetch, auto_close, get_abspath
 
 OPTS = {'ftype': 'none'}
 logger = gogo.Gogo(__name__, monolog=True).logger
@@ -52,6 +52,7 @@ def async_parser(_, objconf, skip=False, **kwargs):
 
     Kwargs:
         stream (dict): The original item
+        fields (Iter[str]): Only include these fields in each item
 
     Returns:
         Iter[dict]: The stream of items
@@ -63,7 +64,7 @@ def async_parser(_, objconf, skip=False, **kwargs):
         >>> from meza.fntools import Objectify
         >>>
         >>> def run(reactor):
-        ...     callback = lambda x: print(x[0]['title'])
+        ...     callback = lambda x: print(next(x)['title'])
         ...     url = get_path('gigs.json')
         ...     objconf = Objectify({'url': url, 'path': 'value.items'})
         ...     d = async_parser(None, objconf, stream={})
@@ -76,14 +77,29 @@ def async_parser(_, objconf, skip=False, **kwargs):
         ...
         Business System Analyst
     """
+    fields = kwargs.get('fields')
+
     if skip:
         stream = kwargs['stream']
     else:
         url = get_abspath(objconf.url)
         ext = p.splitext(url)[1].lstrip('.')
-        f = yield io.async_url_open(url)
-        stream = any2dict(f, ext, objconf.html5, path=objconf.path)
-        f.close()
+
+        if objconf.iterparse and ext in {'xml', 'html'}:
+            # the page is parsed chunk by chunk as it arrives, and each record
+            # is converted as soon as its end tag is parsed
+            args = (url, objconf.path, ext == 'xml', fields)
+            stream = yield util.async_iterparse_records(*args)
+        else:
+            f = yield io.async_url_open(url)
+
+            if ext == 'json':
+                records = json_records(f, objconf.path, fields)
+                stream = auto_close(records, f)
+            else:
+                args = (f, ext, objconf.html5, objconf.path, fields)
+                stream = any2dict(*args)
+                f.close()
 
     return_value(stream)
 
@@ -99,6 +115,7 @@ def parser(_, objconf, skip=False, **kwargs):
 
     Kwargs:
         stream (dict): The original item
+        fields (Iter[str]): Only include these fields in each item
 
     Returns:
         Iter[dict]: The stream of items
@@ -110,18 +127,31 @@ def parser(_, objconf, skip=False, **kwargs):
         >>> url = get_path('gigs.json')
         >>> objconf = Objectify({'url': url, 'path': 'value.items'})
         >>> result = parser(None, objconf, stream={})
-        >>> result[0]['title'] == 'Business System Analyst'
+        >>> next(result)['title'] == 'Business System Analyst'
         True
     """
+    fields = kwargs.get('fields')
+
     if skip:
         stream = kwargs['stream']
     else:
         url = get_abspath(objconf.url)
         ext = p.splitext(url)[1].lstrip('.')
-
-        with fetch(**objconf) as f:
-            ext = ext or f.ext
-            stream = any2dict(f, ext, objconf.html5, path=objconf.path)
+        f = fetch(**objconf)
+        ext = ext or f.ext
+
+        if ext == 'json':
+            # each array element is yielded as soon as it is parsed
+            records = json_records(f, objconf.path, fields)
+            stream = auto_close(records, f)
+        elif objconf.iterparse and ext in {'xml', 'html'}:
+            # each record is yielded as soon as its end tag is parsed
+            args = (f, objconf.path, ext == 'xml', fields)
+            stream = auto_close(iterparse_records(*args), f)
+        else:
+            with f:
+                args = (f, ext, objconf.html5, objconf.path, fields)
+                stream = any2dict(*args)
 
     return stream
 
@@ -137,13 +167,21 @@ def async_pipe(*args, **kwargs):
 
     Kwargs:
         conf (dict): The pipe configuration. Must contain the key 'url'. May
-            contain the keys 'path' or 'html5'.
+            contain the keys 'path', 'html5', or 'iterparse'.
 
             url (str): The web site to fetch
             path (str): Dot separated path to extract (default: None, i.e.,
                 return entire page)
 
             html5 (bool): Use the HTML5 parser (default: False)
+            iterparse (bool): Incrementally parse XML/HTML, emitting every
+                element matching `path` as its own item. Memory use stays
+                constant regardless of the file size (default: False).
+
+        fields (Iter[str]): Only include (and parse) these fields of each
+            item (default: None, i.e., include all fields). `SyncPipe` sets
+            this automatically when the stages that follow only read some
+            fields.
 
     Returns:
         Deferred: twisted.internet.defer.Deferred stream of items
@@ -181,13 +219,21 @@ def pipe(*args, **kwargs):
 
     Kwargs:
         conf (dict): The pipe configuration. Must contain the key 'url'. May
-            contain the keys 'path' or 'html5'.
+            contain the keys 'path', 'html5', or 'iterparse'.
 
             url (str): The web site to fetch
             path (str): Dot separated path to extract (default: None, i.e.,
                 return entire page)
 
             html5 (bool): Use the HTML5 parser (default: False)
+            iterparse (bool): Incrementally parse XML/HTML, emitting every
+                element matching `path` as its own item. Memory use stays
+                constant regardless of the file size (default: False).
+
+        fields (Iter[str]): Only include (and parse) these fields of each
+            item (default: None, i.e., include all fields). `SyncPipe` sets
+            this automatically when the stages that follow only read some
+            fields.
 
     Returns:
         dict: an iterator of items
@@ -208,6 +254,11 @@ def pipe(*args, **kwargs):
         >>> conf = {'url': get_path('schools.xml'), 'path': 'data.row'}
         >>> next(pipe(conf=conf))['district_name'] == 'Turkana'
         True
+        >>> conf['iterparse'] = True
+        >>> [i['district_name'] for i in pipe(conf=conf)][:2]
+        ['Turkana', 'Marsabit']
+        >>> next(pipe(conf=conf, fields=['district_name']))
+        {'district_name': 'Turkana'}
 
     """
     return parser(*args, **kwargs)
@@ -31,27 +31,43 @@ from __future__ import (
 
 import pygogo as gogo
 
+from codecs import lookup
 from builtins import *  # noqa # pylint: disable=unused-import
-from meza.compat import encode
+from meza.compat import encode, decode
 
 from . import processor
 from riko.bado import coroutine, return_value, io
 from riko.parsers import get_text
-from riko.utils import betwix, fetch, get_abspath
+from riko.utils import fetch, get_abspath, get_response_encoding
 
 OPTS = {'ftype': 'none'}
 logger = gogo.Gogo(__name__, monolog=True).logger
 
 
 def get_string(content, start, end):
+    """Slice the (utf-8 encoded) content between the first occurrence of
+    `start` and the following occurrence of `end` (both exclusive) in a single
+    pass, without copying anything else.
+
+    Examples:
+        >>> get_string('<a><b>hi</b></a>', '<b>', '</b>') == b'hi'
+        True
+        >>> get_string(b'<a></a>', '<b>', '</b>') == b''
+        True
+    """
     # TODO: convert relative links to absolute
     # TODO: remove the closing tag if using an HTML tag stripped of HTML tags
     # TODO: clean html with Tidy
     content = encode(content)
-    start_pos = content.find(encode(start)) if start else 0
-    right = content[start_pos + (len(start) if start else 0):]
-    end_pos = right[1:].find(encode(end)) + 1 if end else len(right)
-    return right[:end_pos] if end_pos > 0 else right
+    start = encode(start) if start else b''
+    start_pos = content.find(start)
+
+    if start_pos < 0:
+        return b''
+
+    begin = start_pos + len(start)
+    end_pos = content.find(encode(end), begin + 1) if end else -1
+    return content[begin:end_pos] if end_pos > 0 else content[begin:]
 
 
 @coroutine
@@ -135,9 +151,17 @@ def parser(_, objconf, skip=False, **kwargs):
     if skip:
         stream = kwargs['stream']
     else:
-        with fetch(decode=True, **objconf) as f:
-            sliced = betwix(f, objconf.start, objconf.end, True)
-            content = '\n'.join(sliced)
+        with fetch(**objconf) as f:
+            content = f.read()
+
+            if hasattr(f.r, 'info'):
+                encoding = get_response_encoding(f.r, f.def_encoding)
+            else:
+                encoding = f.def_encoding
+
+        # the page is sliced as bytes, so only non utf-8 pages need decoding
+        if lookup(encoding).name != 'utf-8':
+            content = encode(decode(content, encoding))
 
         parsed = get_string(content, objconf.start, objconf.end)
         detagged = get_text(parsed) if objconf.detag else parsed
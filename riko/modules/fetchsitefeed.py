@@ -44,10 +44,12 @@ from . import processor
 
 from riko import autorss
 from riko.utils import gen_entries, get_abspath
+from riko.feeds import parse
 from riko.parsers import parse_rss
 from riko.bado import coroutine, return_value, io
 
 OPTS = {'ftype': 'none'}
+DEFAULTS = {'memoize': True}
 logger = gogo.Gogo(__name__, monolog=True).logger
 
 
@@ -90,10 +92,11 @@ def async_parser(_, objconf, skip=False, **kwargs):
         stream = kwargs['stream']
     else:
         url = get_abspath(objconf.url)
-        rss = yield autorss.async_get_rss(url)
+        cache_kwargs = autorss.get_cache_kwargs(objconf)
+        rss = yield autorss.async_get_rss(url, **cache_kwargs)
         link = get_abspath(next(rss)['link'])
         content = yield io.async_url_read(link)
-        parsed = parse_rss(content)
+        parsed = parse(content)
         stream = gen_entries(parsed)
 
     return_value(stream)
@@ -127,16 +130,16 @@ def parser(_, objconf, skip=False, **kwargs):
         stream = kwargs['stream']
     else:
         url = get_abspath(objconf.url)
-        rss = autorss.get_rss(url)
-        objconf.url = get_abspath(next(rss)['link'])
-
-        parsed = parse_rss(**objconf)
+        cache_kwargs = autorss.get_cache_kwargs(objconf)
+        rss = autorss.get_rss(url, **cache_kwargs)
+        link = get_abspath(next(rss)['link'])
+        parsed = parse_rss(link)
         stream = gen_entries(parsed)
 
     return stream
 
 
-@processor(isasync=True, **OPTS)
+@processor(DEFAULTS, isasync=True, **OPTS)
 def async_pipe(*args, **kwargs):
     """A source that fetches and parses the first feed found on a site.
 
@@ -145,9 +148,20 @@ def async_pipe(*args, **kwargs):
         kwargs (dict): The keyword arguments passed to the wrapper.
 
     Kwargs:
-        conf (dict): The pipe configuration. Must contain the key 'url'.
+        conf (dict): The pipe configuration. Must contain the key 'url'. May
+            contain the keys 'memoize', 'cache_type', or 'cache_timeout'.
 
             url (str): The web site to fetch
+            memoize (bool): Cache the discovered feed urls so the site isn't
+                fetched again (default: True).
+
+            cache_type (str): The `mezmorize` cache type (default: 'auto',
+                i.e., memcached or redis if available, a filesystem cache if
+                the `CACHE_DIR` environment variable is set, and an in-memory
+                cache otherwise).
+
+            cache_timeout (int): Number of seconds to cache the discovered
+                feed urls (default: 86400, i.e., a day).
 
     Returns:
         dict: twisted.internet.defer.Deferred an iterator of items
@@ -173,7 +187,7 @@ def async_pipe(*args, **kwargs):
     return async_parser(*args, **kwargs)
 
 
-@processor(**OPTS)
+@processor(DEFAULTS, **OPTS)
 def pipe(*args, **kwargs):
     """A source that fetches and parses the first feed found on a site.
 
@@ -182,9 +196,20 @@ def pipe(*args, **kwargs):
         kwargs (dict): The keyword arguments passed to the wrapper
 
     Kwargs:
-        conf (dict): The pipe configuration. Must contain the key 'url'.
+        conf (dict): The pipe configuration. Must contain the key 'url'. May
+            contain the keys 'memoize', 'cache_type', or 'cache_timeout'.
 
             url (str): The web site to fetch
+            memoize (bool): Cache the discovered feed urls so the site isn't
+                fetched again (default: True).
+
+            cache_type (str): The `mezmorize` cache type (default: 'auto',
+                i.e., memcached or redis if available, a filesystem cache if
+                the `CACHE_DIR` environment variable is set, and an in-memory
+                cache otherwise).
+
+            cache_timeout (int): Number of seconds to cache the discovered
+                feed urls (default: 86400, i.e., a day).
 
     Yields:
         dict: item
@@ -27,18 +27,152 @@ from __future__ import (
 
 import pygogo as gogo
 
+from io import StringIO
+from functools import partial
+from importlib import import_module
+from multiprocessing import Pool, cpu_count
+
 from builtins import *  # noqa # pylint: disable=unused-import
 
 from . import processor
 from riko import ENCODING
-from riko.utils import fetch, auto_close, get_abspath
+from riko.utils import (
+    fetch, auto_close, get_abspath, get_local_path, multiplex)
 from riko.bado import coroutine, return_value, io
 
 OPTS = {'ftype': 'none', 'assign': 'content'}
-DEFAULTS = {'encoding': ENCODING}
+DEFAULTS = {
+    'encoding': ENCODING, 'parallel': False, 'workers': None,
+    'ordered': True, 'chunksize': 2 ** 24}
+
 logger = gogo.Gogo(__name__, monolog=True).logger
 
 
+def gen_ranges(f, chunksize):
+    """Split a file into byte ranges that each end at a line boundary
+
+    Args:
+        f (obj): The file like object (opened in binary mode)
+        chunksize (int): The approximate number of bytes in each range
+
+    Yields:
+        Tuple[int, int]: The start and end offsets of each range
+
+    Examples:
+        >>> from io import BytesIO
+        >>>
+        >>> f = BytesIO(b'ab\\ncd\\nef\\ngh')
+        >>> list(gen_ranges(f, 4))
+        [(0, 6), (6, 11)]
+    """
+    size = f.seek(0, 2)
+    start = 0
+
+    while start < size:
+        # start one byte early in case we land right after a newline
+        f.seek(start + chunksize - 1)
+        f.readline()
+        end = min(f.tell(), size)
+        yield start, end
+        start = end
+
+
+def run_chain(stream, chain=None):
+    """Run a stream through a chain of pipes
+
+    Args:
+        stream (Iter[dict]): The items
+        chain (List[Tuple[str, dict]]): The (module name, pipe keyword
+            arguments) pairs (default: None).
+
+    Returns:
+        Iter[dict]: The output of the last pipe
+
+    Examples:
+        >>> stream = [{'content': 'a'}, {'content': 'b'}]
+        >>> conf = {'rule': {'field': 'content', 'op': 'is', 'value': 'b'}}
+        >>> list(run_chain(stream, [('filter', {'conf': conf})]))
+        [{'content': 'b'}]
+    """
+    for name, kwargs in chain or []:
+        pipe = import_module('riko.modules.%s' % name).pipe
+
+        if pipe.__dict__.get('type') == 'processor':
+            stream = multiplex(map(partial(pipe, **kwargs), stream))
+        else:
+            stream = pipe(stream, **kwargs)
+
+    return stream
+
+
+def read_range(args):
+    """Parse a byte range of a text file and run the lines through a chain of
+    pipes (in a worker process)
+
+    Args:
+        args (Tuple): The file path, start offset, end offset, encoding,
+            assign, and chain of (module name, pipe keyword arguments) pairs.
+
+    Returns:
+        List[dict]: The items output by the last pipe
+    """
+    path, start, end, encoding, assign, chain = args
+
+    with open(path, 'rb') as f:
+        f.seek(start)
+        content = f.read(end - start).decode(encoding)
+
+    stream = ({assign: line.strip()} for line in StringIO(content))
+    return list(run_chain(stream, chain))
+
+
+def parallel_read(path, objconf, assign='content', chain=None):
+    """Parse a local text file with a pool of processes
+
+    Args:
+        path (str): The file path
+        objconf (obj): The pipe configuration (an Objectify instance)
+        assign (str): Attribute to assign parsed content (default: content)
+        chain (List[Tuple[str, dict]]): The (module name, pipe keyword
+            arguments) pairs of the stream processors to run on each range
+            (default: None).
+
+    Yields:
+        dict: item
+
+    Examples:
+        >>> from riko import get_path
+        >>> from meza.fntools import Objectify
+        >>>
+        >>> path = get_local_path(get_path('lorem.txt'))
+        >>> conf = {'workers': 2, 'chunksize': 256, 'ordered': True}
+        >>> conf.update({'encoding': ENCODING})
+        >>> items = list(parallel_read(path, Objectify(conf)))
+        >>> items[0]['content'] == 'What is Lorem Ipsum?'
+        True
+        >>> fconf = {'rule': {'field': 'content', 'op': 'contains', 'value':
+        ...     'Lorem'}}
+        >>> chain = [('filter', {'conf': fconf})]
+        >>> items = parallel_read(path, Objectify(conf), chain=chain)
+        >>> len(list(items))
+        12
+    """
+    with open(path, 'rb') as f:
+        ranges = list(gen_ranges(f, objconf.chunksize or 2 ** 24))
+
+    encoding, chain = objconf.encoding, chain or []
+    args = ((path, s, e, encoding, assign, chain) for s, e in ranges)
+    pool = Pool(objconf.workers or cpu_count())
+    imap = pool.imap if objconf.ordered else pool.imap_unordered
+
+    try:
+        for items in imap(read_range, args):
+            for item in items:
+                yield item
+    finally:
+        pool.terminate()
+
+
 @coroutine
 def async_parser(_, objconf, skip=False, **kwargs):
     """ Asynchronously parses the pipe content
@@ -113,12 +247,20 @@ def parser(_, objconf, skip=False, **kwargs):
         >>> next(result)['content'] == 'What is Lorem Ipsum?'
         True
     """
+    path = None if skip else get_local_path(objconf.url, objconf.encoding)
+    chain = kwargs.get('chain')
+
     if skip:
         stream = kwargs['stream']
+    elif objconf.parallel and path:
+        stream = parallel_read(path, objconf, kwargs['assign'], chain)
     else:
+        if objconf.parallel:
+            logger.warning('Only local files can be read in parallel.')
+
         f = fetch(decode=True, **objconf)
         _stream = ({kwargs['assign']: line.strip()} for line in f)
-        stream = auto_close(_stream, f)
+        stream = run_chain(auto_close(_stream, f), chain)
 
     return stream
 
@@ -177,12 +319,28 @@ def pipe(*args, **kwargs):
 
     Kwargs:
         conf (dict): The pipe configuration. Must contain the key 'url'. May
-            contain the key 'encoding'.
+            contain the keys 'encoding', 'parallel', 'workers', 'ordered', or
+            'chunksize'.
 
             url (str): The web site to fetch
             encoding (str): The file encoding (default: utf-8).
+            parallel (bool): Read local files in line aligned chunks using a
+                pool of processes (default: False).
+
+            workers (int): Number of processes (default: None, i.e., the
+                number of cpus).
+
+            ordered (bool): Keep the lines in file order when reading in
+                parallel (default: True).
+
+            chunksize (int): Approximate number of bytes each process reads
+                at a time (default: 16 MiB).
 
         assign (str): Attribute to assign parsed content (default: content)
+        chain (List[Tuple[str, dict]]): The (module name, pipe keyword
+            arguments) pairs of item wise pipes to run on the lines. When
+            reading in parallel, each process runs the chain on its own
+            chunk (default: None).
 
     Returns:
         dict: an iterator of items
@@ -193,5 +351,11 @@ def pipe(*args, **kwargs):
         >>> conf = {'url': get_path('lorem.txt')}
         >>> next(pipe(conf=conf))['content'] == 'What is Lorem Ipsum?'
         True
+        >>> conf.update({'parallel': True, 'workers': 2, 'chunksize': 256})
+        >>> rule = {'field': 'content', 'match': 'Lorem', 'replace': 'Ipsum'}
+        >>> chain = [('regex', {'conf': {'rule': rule}})]
+        >>> item = next(pipe(conf=conf, chain=chain))
+        >>> item['content'] == 'What is Ipsum Ipsum?'
+        True
     """
     return parser(*args, **kwargs)
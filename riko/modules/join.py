@@ -28,19 +28,251 @@ from __future__ import (
 
 import pygogo as gogo
 
-from itertools import product
+from collections import defaultdict
+from itertools import chain, groupby, islice
+from numbers import Number
 
+from six import string_types
 from builtins import *  # noqa # pylint: disable=unused-import
 from meza.process import merge, join
 
 from . import operator
+from .sort import external_sort
 
 # disable `dictize` since we do not need to access the configuration
 OPTS = {'dictize': False}
-DEFAULTS = {'join_key': None, 'lower': False}
+DEFAULTS = {
+    'join_key': None, 'lower': False, 'join_type': 'inner',
+    'buffer_size': 10 ** 6, 'build': 'other'}
+
+JOIN_TYPES = {'inner', 'left', 'right', 'outer'}
+BUILDS = {'items', 'other'}
 logger = gogo.Gogo(__name__, monolog=True).logger
 
 
+def get_keyfunc(key, lower=False):
+    """Creates a function that gets the value an item is joined on
+
+    Args:
+        key (str): The item attribute to join on
+        lower (bool): Lower case the value (default: False)
+
+    Returns:
+        func: The key function
+
+    Examples:
+        >>> get_keyfunc('x', True)({'x': 'FOO'})
+        'foo'
+        >>> get_keyfunc('x')({'x': ['foo']})
+        "['foo']"
+    """
+    def keyfunc(item):
+        value = item.get(key, '').lower() if lower else item.get(key)
+
+        try:
+            hash(value)
+        except TypeError:
+            value = repr(value)
+
+        return value
+
+    return keyfunc
+
+
+def _get_kind(value):
+    if isinstance(value, Number):
+        kind = 'number'
+    elif isinstance(value, string_types):
+        kind = 'str'
+    else:
+        kind = type(value).__name__
+
+    return kind
+
+
+def _sortable(keyfunc):
+    """Wraps a key function so that its keys are totally ordered. `None`
+    (i.e., a missing key) sorts first, and keys of different types are
+    ordered by type instead of by value.
+
+    Examples:
+        >>> sortkey = _sortable(get_keyfunc('x'))
+        >>> items = [{'x': '1'}, {'x': 2}, {}, {'x': 1.5}]
+        >>> [item.get('x') for item in sorted(items, key=sortkey)]
+        [None, 1.5, 2, '1']
+    """
+    def sortkey(item):
+        value = keyfunc(item)
+        return (value is not None, _get_kind(value), value)
+
+    return sortkey
+
+
+def sort_merge_join(stream, other, xkey, ykey, join_type='inner', **kwargs):
+    """Joins two streams by sorting both of them on disk (if necessary) and
+    then merging them. Items are output in join key order.
+
+    Args:
+        stream (Iter[dict]): The source.
+        other (Iter[dict]): The stream to join.
+        xkey (func): The `stream` key function (see `get_keyfunc`)
+        ykey (func): The `other` key function (see `get_keyfunc`)
+        join_type (str): One of 'inner', 'left', 'right', or 'outer'
+            (default: 'inner').
+
+        kwargs (dict): Keyword arguments.
+
+    Kwargs:
+        buffer_size (int): The maximum number of items to sort in memory
+            (default: 1000000).
+
+    Yields:
+        dict: a merged stream item
+
+    Examples:
+        >>> stream = ({'x': x % 3, 'sum': x} for x in range(4))
+        >>> other = ({'y': y, 'count': y + 5} for y in [2, 3, 0])
+        >>> xkey, ykey = get_keyfunc('x'), get_keyfunc('y')
+        >>> joined = sort_merge_join(stream, other, xkey, ykey, 'outer')
+        >>> [(i.get('sum'), i.get('count')) for i in joined]
+        [(0, 5), (3, 5), (1, None), (2, 7), (None, 8)]
+        >>> stream = [{'x': 1, 'sum': 1}, {'x': '1', 'sum': 2}]
+        >>> other = [{'y': '1', 'count': 3}]
+        >>> joined = sort_merge_join(stream, other, xkey, ykey, buffer_size=1)
+        >>> [(i.get('sum'), i.get('count')) for i in joined]
+        [(2, 3)]
+    """
+    buffer_size = kwargs.get('buffer_size') or 10 ** 6
+    xsort, ysort = _sortable(xkey), _sortable(ykey)
+    xgroups = groupby(external_sort(stream, xsort, buffer_size), xsort)
+    ygroups = groupby(external_sort(other, ysort, buffer_size), ysort)
+    keep_x = join_type in {'left', 'outer'}
+    keep_y = join_type in {'right', 'outer'}
+    x, y = next(xgroups, None), next(ygroups, None)
+
+    while x or y:
+        # a group can't be read after moving on to the next one
+        if y is None or (x and x[0] < y[0]):
+            unmatched = list(x[1]) if keep_x else []
+            x = next(xgroups, None)
+        elif x is None or y[0] < x[0]:
+            unmatched = list(y[1]) if keep_y else []
+            y = next(ygroups, None)
+        else:
+            others = list(y[1])
+
+            for item in x[1]:
+                for other_item in others:
+                    yield merge([item, other_item])
+
+            unmatched = []
+            x, y = next(xgroups, None), next(ygroups, None)
+
+        for item in unmatched:
+            yield merge([item])
+
+
+def _probe(buffered, probe, probe_key, build_key, keep_probe=False,
+           keep_build=False, swap=False):
+    # looks up the `probe` items in a hash table of the `buffered` items.
+    # `swap` means the `buffered` items are from the source, so they go first
+    # when merging
+    table = defaultdict(list)
+
+    for item in buffered:
+        table[build_key(item)].append(item)
+
+    matched = set()
+
+    for item in probe:
+        key = probe_key(item)
+        matches = table.get(key)
+
+        if matches:
+            matched.add(key)
+
+            for match in matches:
+                yield merge([match, item] if swap else [item, match])
+        elif keep_probe:
+            yield merge([item])
+
+    if keep_build:
+        for item in buffered:
+            if build_key(item) not in matched:
+                yield merge([item])
+
+
+def hash_join(stream, other, xkey, ykey, join_type='inner', **kwargs):
+    """Joins two streams by building a hash table of one of them and then
+    looking up the items of the other. Items are output in the order of the
+    looked up stream, i.e., `stream` unless `build` is 'items', followed by
+    any unmatched items of the hashed stream that the join type keeps. Only
+    the hashed stream is held in memory. Falls back to a sort-merge join if
+    it has more than `buffer_size` items.
+
+    Args:
+        stream (Iter[dict]): The source.
+        other (Iter[dict]): The stream to join.
+        xkey (func): The `stream` key function (see `get_keyfunc`)
+        ykey (func): The `other` key function (see `get_keyfunc`)
+        join_type (str): One of 'inner', 'left', 'right', or 'outer'
+            (default: 'inner').
+
+        kwargs (dict): Keyword arguments.
+
+    Kwargs:
+        buffer_size (int): The maximum number of items to hash (default:
+            None, i.e., no limit).
+
+        build (str): The stream to hash, either 'other' or 'items' (i.e.,
+            `stream`) (default: 'other').
+
+    Yields:
+        dict: a merged stream item
+
+    Examples:
+        >>> stream = [{'x': x % 3, 'sum': x} for x in range(4)]
+        >>> other = [{'y': y, 'count': y + 5} for y in [2, 3, 0]]
+        >>> xkey, ykey = get_keyfunc('x'), get_keyfunc('y')
+        >>> joined = hash_join(stream, other, xkey, ykey, 'left')
+        >>> [(i.get('sum'), i.get('count')) for i in joined]
+        [(0, 5), (1, None), (2, 7), (3, 5)]
+        >>> joined = hash_join(stream, other, xkey, ykey, 'right')
+        >>> [(i.get('sum'), i.get('count')) for i in joined]
+        [(0, 5), (2, 7), (3, 5), (None, 8)]
+        >>> args = (stream, other, xkey, ykey, 'right')
+        >>> joined = hash_join(*args, build='items')
+        >>> [(i.get('sum'), i.get('count')) for i in joined]
+        [(2, 7), (None, 8), (0, 5), (3, 5)]
+        >>> joined = hash_join(stream, other, xkey, ykey, buffer_size=1)
+        >>> [(i.get('sum'), i.get('count')) for i in joined]
+        [(0, 5), (3, 5), (2, 7)]
+    """
+    swap = kwargs.get('build') == 'items'
+    probe, build = (other, stream) if swap else (stream, other)
+    probe_key, build_key = (ykey, xkey) if swap else (xkey, ykey)
+    keep_x = join_type in {'left', 'outer'}
+    keep_y = join_type in {'right', 'outer'}
+    keeps = (keep_y, keep_x) if swap else (keep_x, keep_y)
+    buffer_size = kwargs.get('buffer_size')
+    build = iter(build)
+    limit = None if buffer_size is None else buffer_size + 1
+    buffered = list(islice(build, limit))
+
+    if buffer_size is not None and len(buffered) > buffer_size:
+        # the hashed stream is too big, so sort-merge join the streams instead
+        build = chain(buffered, build)
+        streams = (build, other) if swap else (stream, build)
+        args = streams + (xkey, ykey, join_type)
+        joined = sort_merge_join(*args, **kwargs)
+    else:
+        args = (buffered, probe, probe_key, build_key) + keeps
+        joined = _probe(*args, swap=swap)
+
+    for item in joined:
+        yield item
+
+
 def parser(stream, objconf, tuples, **kwargs):
     """ Parses the pipe content
 
@@ -86,22 +318,26 @@ def parser(stream, objconf, tuples, **kwargs):
         >>> len(list(joined))
         4
     """
-    def compare(x, y):
-        if objconf.lower:
-            x_value, y_value = x.get(x_key, ''), y.get(y_key, '')
-            equal = x_value.lower() == y_value.lower()
-        else:
-            equal = x.get(x_key) == y.get(y_key)
+    join_type = objconf.join_type or 'inner'
+    build = objconf.build or 'other'
 
-        return equal
+    if join_type not in JOIN_TYPES:
+        msg = 'Invalid join_type: %s. (Expected one of %s)'
+        raise ValueError(msg % (join_type, ', '.join(sorted(JOIN_TYPES))))
+
+    if build not in BUILDS:
+        msg = 'Invalid build: %s. (Expected one of %s)'
+        raise ValueError(msg % (build, ', '.join(sorted(BUILDS))))
 
     if objconf.join_key or objconf.other_join_key:
         x_key = objconf.join_key or objconf.other_join_key
         y_key = objconf.other_join_key or x_key
-        prod = product(stream, kwargs['other'])
-
-        joined = (
-            merge([x, y]) for x, y in prod if compare(x, y))
+        xkey = get_keyfunc(x_key, objconf.lower)
+        ykey = get_keyfunc(y_key, objconf.lower)
+        args = (stream, kwargs['other'], xkey, ykey, join_type)
+        buffer_size = objconf.buffer_size
+        buffer_size = None if buffer_size is None else int(buffer_size)
+        joined = hash_join(*args, buffer_size=buffer_size, build=build)
     else:
         joined = join(stream, kwargs['other'])
 
@@ -117,8 +353,10 @@ def async_pipe(*args, **kwargs):
         kwargs (dict): The keyword arguments passed to the wrapper
 
     Kwargs:
-        conf (dict): The pipe configuration. May contain the keys 'join_key' or
-            'other_join_key'.
+        conf (dict): The pipe configuration. May contain the keys 'join_key',
+            'other_join_key', 'lower', 'join_type', 'buffer_size', or
+            'build'.
+
             join_key (str): Item attribute to join `items` on.
                 (default: value of `other_join_key`).
             other_join_key (str): Item attribute to join `other` on.
@@ -126,6 +364,22 @@ def async_pipe(*args, **kwargs):
             lower (str): Transform values to lower case before comparing
                 (for joining purposes, default: False)
 
+            join_type (str): One of 'inner', 'left' (keep unmatched `items`),
+                'right' (keep unmatched `other` items), or 'outer' (keep
+                both) (default: 'inner').
+
+            buffer_size (int): The maximum number of items of the `build`
+                stream to hold in memory. Keyed joins hold at most this many
+                items (plus their hash table) in memory, regardless of the
+                size of the other stream. Larger streams are joined by sorting
+                both streams on disk and outputting the items in join key
+                order (default: 1000000).
+
+            build (str): The stream to hash, either 'other' or 'items'.
+                Items are output in the order of the other stream, followed
+                by any unmatched items of the hashed stream that the join
+                type keeps (default: 'other').
+
 
         other (Iter[dict]): stream to join
 
@@ -163,8 +417,10 @@ def pipe(*args, **kwargs):
         kwargs (dict): The keyword arguments passed to the wrapper
 
     Kwargs:
-        conf (dict): The pipe configuration. May contain the keys 'join_key' or
-            'other_join_key'.
+        conf (dict): The pipe configuration. May contain the keys 'join_key',
+            'other_join_key', 'lower', 'join_type', 'buffer_size', or
+            'build'.
+
             join_key (str): Item attribute to join `items` on.
                 (default: value of `other_join_key`).
             other_join_key (str): Item attribute to join `other` on.
@@ -172,6 +428,22 @@ def pipe(*args, **kwargs):
             lower (str): Transform values to lower case before comparing
                 (for joining purposes, default: False)
 
+            join_type (str): One of 'inner', 'left' (keep unmatched `items`),
+                'right' (keep unmatched `other` items), or 'outer' (keep
+                both) (default: 'inner').
+
+            buffer_size (int): The maximum number of items of the `build`
+                stream to hold in memory. Keyed joins hold at most this many
+                items (plus their hash table) in memory, regardless of the
+                size of the other stream. Larger streams are joined by sorting
+                both streams on disk and outputting the items in join key
+                order (default: 1000000).
+
+            build (str): The stream to hash, either 'other' or 'items'.
+                Items are output in the order of the other stream, followed
+                by any unmatched items of the hashed stream that the join
+                type keeps (default: 'other').
+
         other (Iter[dict]): stream to join
 
     Yields:
@@ -193,5 +465,10 @@ def pipe(*args, **kwargs):
         True
         >>> next(joined) == {'count': 6, 'x': 'foo-1', 'sum': 1, 'y': 'FOO-1'}
         True
+        >>> other = [{'y': 'foo-1', 'count': 6}, {'y': 'bar', 'count': 7}]
+        >>> conf.update({'lower': False, 'join_type': 'outer'})
+        >>> joined = pipe(items, conf=conf, other=other)
+        >>> [(item.get('sum'), item.get('count')) for item in joined]
+        [(0, None), (1, 6), (2, None), (3, None), (4, None), (None, 7)]
     """
     return parser(*args, **kwargs)
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+# vim: sw=4:ts=4:expandtab
+"""
+riko.modules.mean
+~~~~~~~~~~~~~~~~~
+Provides functions for averaging the items in a stream.
+
+Examples:
+    basic usage::
+
+        >>> from riko.modules.mean import pipe
+        >>>
+        >>> stream = pipe({'content': x} for x in range(5))
+        >>> next(stream) == {'mean': Decimal('2')}
+        True
+
+Attributes:
+    OPTS (dict): The default pipe options
+    DEFAULTS (dict): The default parser options
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals)
+
+import pygogo as gogo
+
+from decimal import Decimal  # noqa # pylint: disable=unused-import
+from builtins import *  # noqa # pylint: disable=unused-import
+from meza.process import merge
+
+from . import operator
+from riko.aggregates import get_aggregate, get_group_keys
+
+OPTS = {}
+DEFAULTS = {'mean_key': 'content', 'group_key': None}
+logger = gogo.Gogo(__name__, monolog=True).logger
+
+
+def get_aggregation(conf=None):
+    """Gets what the pipe aggregates, so that workers can aggregate chunks of
+    its source (see `riko.aggregates.accumulate`)
+
+    Args:
+        conf (dict): The pipe configuration (default: None)
+
+    Returns:
+        Tuple[List[str], List[Tuple[str, str]]]: The group keys and the
+            (aggregate, field) pairs
+
+    Examples:
+        >>> get_aggregation({'mean_key': 'amount', 'group_key': 'x'})
+        (['x'], [('mean', 'amount')])
+    """
+    conf = merge([DEFAULTS, conf or {}])
+    return get_group_keys(conf['group_key']), [('mean', conf['mean_key'])]
+
+
+def parser(stream, objconf, tuples, **kwargs):
+    """ Parses the pipe content
+
+    Args:
+        stream (Iter[dict]): The source. Note: this shares the `tuples`
+            iterator, so consuming it will consume `tuples` as well.
+
+        objconf (obj): The pipe configuration (an Objectify instance)
+
+        tuples (Iter[(dict, obj)]): Iterable of tuples of (item, objconf)
+            `item` is an element in the source stream and `objconf` is the item
+            configuration (an Objectify instance). Note: this shares the
+            `stream` iterator, so consuming it will consume `stream` as well.
+
+        kwargs (dict): Keyword arguments.
+
+    Kwargs:
+        conf (dict): The pipe configuration.
+        partials (Iter[dict]): Accumulators of chunks of the source that
+            were aggregated by workers (default: None).
+
+    Returns:
+        mixed: The output either a dict or iterable of dicts
+
+    Examples:
+        >>> from itertools import repeat
+        >>> from meza.fntools import Objectify
+        >>>
+        >>> stream = ({'content': x} for x in range(5))
+        >>> objconf = Objectify({'mean_key': 'content'})
+        >>> tuples = zip(stream, repeat(objconf))
+        >>> args = (stream, objconf, tuples)
+        >>> parser(*args, assign='content') == {'content': Decimal('2')}
+        True
+        >>> objconf = Objectify({'mean_key': 'amount', 'group_key': 'x'})
+        >>> stream = [
+        ...     {'amount': 2, 'x': 'one'},
+        ...     {'amount': 1, 'x': 'one'},
+        ...     {'amount': 2, 'x': 'two'}]
+        >>> tuples = zip(stream, repeat(objconf))
+        >>> averaged = parser(stream, objconf, tuples)
+        >>> next(averaged) == {'one': Decimal('1.5')}
+        True
+        >>> next(averaged) == {'two': Decimal('2')}
+        True
+    """
+    args = (stream, 'mean', objconf.mean_key, objconf.group_key)
+    return get_aggregate(*args, **kwargs)
+
+
+@operator(DEFAULTS, isasync=True, **OPTS)
+def async_pipe(*args, **kwargs):
+    """An aggregator that asynchronously and eagerly averages fields of items
+    in a stream. Note that this pipe is not lazy.
+
+    Args:
+        items (Iter[dict]): The source.
+        kwargs (dict): The keyword arguments passed to the wrapper
+
+    Kwargs:
+        conf (dict): The pipe configuration. May contain the keys 'mean_key'
+            or 'group_key'.
+
+            mean_key (str): Item attribute to average. (default: 'content').
+
+            group_key (str): Item attribute to average by. This will group
+                items in the stream by the given key and report a mean for
+                each group (default: None). If a list of attributes, each
+                group's item holds the attributes along with the mean.
+
+        assign (str): Attribute to assign parsed content. If `group_key` is a
+            single attribute, this is ignored and the group keys are used
+            instead. (default: content)
+
+    Returns:
+        Deferred: twisted.internet.defer.Deferred iterator of the averaged
+            items
+
+    Examples:
+        >>> from riko.bado import react
+        >>> from riko.bado.mock import FakeReactor
+        >>>
+        >>> def run(reactor):
+        ...     callback = lambda x: print(next(x) == {'mean': Decimal('2')})
+        ...     items = ({'content': x} for x in range(5))
+        ...     d = async_pipe(items)
+        ...     return d.addCallbacks(callback, logger.error)
+        >>>
+        >>> try:
+        ...     react(run, _reactor=FakeReactor())
+        ... except SystemExit:
+        ...     pass
+        ...
+        True
+    """
+    return parser(*args, **kwargs)
+
+
+@operator(DEFAULTS, **OPTS)
+def pipe(*args, **kwargs):
+    """An aggregator that eagerly averages fields of items in a stream in a
+    single pass. Note that this pipe is not lazy.
+
+    Args:
+        items (Iter[dict]): The source.
+        kwargs (dict): The keyword arguments passed to the wrapper
+
+    Kwargs:
+        conf (dict): The pipe configuration. May contain the keys 'mean_key'
+            or 'group_key'.
+
+            mean_key (str): Item attribute to average. (default: 'content').
+
+            group_key (str): Item attribute to average by. This will group
+                items in the stream by the given key and report a mean for
+                each group (default: None). If a list of attributes, each
+                group's item holds the attributes along with the mean.
+
+        assign (str): Attribute to assign parsed content. If `group_key` is a
+            single attribute, this is ignored and the group keys are used
+            instead. (default: content)
+
+    Yields:
+        dict: the averaged items
+
+    Examples:
+        >>> stream = ({'content': x} for x in range(5))
+        >>> next(pipe(stream)) == {'mean': Decimal('2')}
+        True
+        >>> stream = [
+        ...     {'amount': 2, 'x': 'one'},
+        ...     {'amount': 1, 'x': 'one'},
+        ...     {'amount': 2, 'x': 'two'}]
+        >>> conf = {'mean_key': 'amount', 'group_key': 'x'}
+        >>> averaged = pipe(stream, conf=conf)
+        >>> next(averaged) == {'one': Decimal('1.5')}
+        True
+        >>> next(averaged) == {'two': Decimal('2')}
+        True
+    """
+    return parser(*args, **kwargs)
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+# vim: sw=4:ts=4:expandtab
+"""
+riko.modules.quantile
+~~~~~~~~~~~~~~~~~~~~~
+Provides functions for estimating a quantile (e.g., the median or 95th
+percentile) of a field in a stream (with a fixed size KLL sketch).
+
+Examples:
+    basic usage::
+
+        >>> from riko.modules.quantile import pipe
+        >>>
+        >>> stream = pipe({'content': x} for x in range(5))
+        >>> next(stream) == {'quantile': Decimal('2')}
+        True
+
+Attributes:
+    OPTS (dict): The default pipe options
+    DEFAULTS (dict): The default parser options
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals)
+
+import pygogo as gogo
+
+from decimal import Decimal  # noqa # pylint: disable=unused-import
+from builtins import *  # noqa # pylint: disable=unused-import
+from meza.process import merge
+
+from . import operator
+from riko.aggregates import get_aggregate, get_group_keys
+
+OPTS = {}
+DEFAULTS = {
+    'quantile_key': 'content', 'group_key': None, 'quantile': 0.5, 'k': 200}
+logger = gogo.Gogo(__name__, monolog=True).logger
+
+
+def get_aggregation(conf=None):
+    """Gets what the pipe aggregates, so that workers can aggregate chunks of
+    its source (see `riko.aggregates.accumulate`)
+
+    Args:
+        conf (dict): The pipe configuration (default: None)
+
+    Returns:
+        Tuple[List[str], List[Tuple[str, str]]]: The group keys and the
+            (aggregate, field) pairs
+
+    Examples:
+        >>> get_aggregation({'quantile_key': 'size', 'quantile': 0.95})
+        ([], [('quantile', 'size', 0.95, 200)])
+    """
+    conf = merge([DEFAULTS, conf or {}])
+    params = (float(conf['quantile']), int(conf['k']))
+    spec = ('quantile', conf['quantile_key']) + params
+    return get_group_keys(conf['group_key']), [spec]
+
+
+def parser(stream, objconf, tuples, **kwargs):
+    """ Parses the pipe content
+
+    Args:
+        stream (Iter[dict]): The source. Note: this shares the `tuples`
+            iterator, so consuming it will consume `tuples` as well.
+
+        objconf (obj): The pipe configuration (an Objectify instance)
+
+        tuples (Iter[(dict, obj)]): Iterable of tuples of (item, objconf)
+            `item` is an element in the source stream and `objconf` is the item
+            configuration (an Objectify instance). Note: this shares the
+            `stream` iterator, so consuming it will consume `stream` as well.
+
+        kwargs (dict): Keyword arguments.
+
+    Kwargs:
+        conf (dict): The pipe configuration.
+        partials (Iter[dict]): Accumulators of chunks of the source that
+            were aggregated by workers (default: None).
+
+    Returns:
+        mixed: The output either a dict or iterable of dicts
+
+    Examples:
+        >>> from itertools import repeat
+        >>> from meza.fntools import Objectify
+        >>>
+        >>> stream = ({'content': x} for x in range(5))
+        >>> conf = {'quantile_key': 'content', 'quantile': 0.5, 'k': 200}
+        >>> objconf = Objectify(conf)
+        >>> tuples = zip(stream, repeat(objconf))
+        >>> args = (stream, objconf, tuples)
+        >>> parser(*args, assign='content') == {'content': Decimal('2')}
+        True
+        >>> conf.update({'quantile_key': 'amount', 'group_key': 'x'})
+        >>> objconf = Objectify(conf)
+        >>> stream = [
+        ...     {'amount': 2, 'x': 'one'},
+        ...     {'amount': 1, 'x': 'one'},
+        ...     {'amount': 2, 'x': 'two'}]
+        >>> tuples = zip(stream, repeat(objconf))
+        >>> medians = parser(stream, objconf, tuples)
+        >>> next(medians) == {'one': Decimal('1')}
+        True
+        >>> next(medians) == {'two': Decimal('2')}
+        True
+    """
+    args = (stream, 'quantile', objconf.quantile_key, objconf.group_key)
+    params = (float(objconf.quantile), int(objconf.k))
+    return get_aggregate(*args, params=params, **kwargs)
+
+
+@operator(DEFAULTS, isasync=True, **OPTS)
+def async_pipe(*args, **kwargs):
+    """An aggregator that asynchronously and eagerly estimates a quantile of a
+    field of items in a stream. Note that this pipe is not lazy.
+
+    Args:
+        items (Iter[dict]): The source.
+        kwargs (dict): The keyword arguments passed to the wrapper
+
+    Kwargs:
+        conf (dict): The pipe configuration. May contain the keys
+            'quantile_key', 'group_key', 'quantile', or 'k'.
+
+            quantile_key (str): Item attribute to get the quantile of.
+                Values are compared as Decimals (default: 'content').
+
+            group_key (str): Item attribute to group by. This will group
+                items in the stream by the given key and report a quantile
+                for each group (default: None). If a list of attributes,
+                each group's item holds the attributes along with the
+                quantile.
+
+            quantile (float): The quantile, e.g., 0.95 for the 95th
+                percentile (default: 0.5, i.e., the median).
+
+            k (int): The sketch keeps O(k) values (per group) and has a rank
+                error of about `1.7 / k` (default: 200, i.e., 0.85%).
+
+        assign (str): Attribute to assign parsed content. If `group_key` is a
+            single attribute, this is ignored and the group keys are used
+            instead. (default: content)
+
+    Returns:
+        Deferred: twisted.internet.defer.Deferred iterator of the quantiles
+
+    Examples:
+        >>> from riko.bado import react
+        >>> from riko.bado.mock import FakeReactor
+        >>>
+        >>> def run(reactor):
+        ...     median = {'quantile': Decimal('2')}
+        ...     callback = lambda x: print(next(x) == median)
+        ...     items = ({'content': x} for x in range(5))
+        ...     d = async_pipe(items)
+        ...     return d.addCallbacks(callback, logger.error)
+        >>>
+        >>> try:
+        ...     react(run, _reactor=FakeReactor())
+        ... except SystemExit:
+        ...     pass
+        ...
+        True
+    """
+    return parser(*args, **kwargs)
+
+
+@operator(DEFAULTS, **OPTS)
+def pipe(*args, **kwargs):
+    """An aggregator that eagerly estimates a quantile of a field of items in a
+    stream in a single pass and fixed memory. Note that this pipe is not
+    lazy.
+
+    Args:
+        items (Iter[dict]): The source.
+        kwargs (dict): The keyword arguments passed to the wrapper
+
+    Kwargs:
+        conf (dict): The pipe configuration. May contain the keys
+            'quantile_key', 'group_key', 'quantile', or 'k'.
+
+            quantile_key (str): Item attribute to get the quantile of.
+                Values are compared as Decimals (default: 'content').
+
+            group_key (str): Item attribute to group by. This will group
+                items in the stream by the given key and report a quantile
+                for each group (default: None). If a list of attributes,
+                each group's item holds the attributes along with the
+                quantile.
+
+            quantile (float): The quantile, e.g., 0.95 for the 95th
+                percentile (default: 0.5, i.e., the median).
+
+            k (int): The sketch keeps O(k) values (per group) and has a rank
+                error of about `1.7 / k` (default: 200, i.e., 0.85%).
+
+        assign (str): Attribute to assign parsed content. If `group_key` is a
+            single attribute, this is ignored and the group keys are used
+            instead. (default: content)
+
+    Yields:
+        dict: the quantiles
+
+    Examples:
+        >>> stream = ({'content': x} for x in range(5))
+        >>> next(pipe(stream)) == {'quantile': Decimal('2')}
+        True
+        >>> stream = ({'size': x} for x in range(10000))
+        >>> conf = {'quantile_key': 'size', 'quantile': 0.95}
+        >>> p95 = next(pipe(stream, conf=conf))['quantile']
+        >>> 9400 < p95 < 9600
+        True
+        >>> stream = [
+        ...     {'amount': 2, 'x': 'one'},
+        ...     {'amount': 1, 'x': 'one'},
+        ...     {'amount': 2, 'x': 'two'}]
+        >>> conf = {'quantile_key': 'amount', 'group_key': 'x'}
+        >>> medians = pipe(stream, conf=conf)
+        >>> next(medians) == {'one': Decimal('1')}
+        True
+        >>> next(medians) == {'two': Decimal('2')}
+        True
+    """
+    return parser(*args, **kwargs)
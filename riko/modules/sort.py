@@ -21,25 +21,478 @@ Attributes:
 from __future__ import (
     absolute_import, division, print_function, unicode_literals)
 
+import pickle
 import pygogo as gogo
 
-from functools import reduce
+from heapq import merge, nsmallest, nlargest
+from numbers import Number
+from itertools import islice, count, chain
+from tempfile import TemporaryFile
+from collections import deque
+from multiprocessing import Pool, cpu_count, current_process
 
 from builtins import *  # noqa # pylint: disable=unused-import
 
 from . import operator
-from riko.bado import itertools as ait
+from meza.fntools import Objectify
+from riko.bado import util
 from riko.utils import def_itemgetter as itemgetter
 
 OPTS = {'listize': True, 'extract': 'rule'}
-DEFAULTS = {'rule': {'sort_dir': 'asc', 'sort_key': 'content'}}
+DEFAULTS = {
+    'rule': {'sort_dir': 'asc', 'sort_key': 'content'},
+    'buffer_size': 10 ** 6, 'limit': None, 'last': False, 'parallel': False,
+    'workers': None, 'chunksize': 2 ** 16}
+
+# the number of items pickled at a time when spilling to disk
+SPILL_BLOCK_SIZE = 1024
+
 logger = gogo.Gogo(__name__, monolog=True).logger
 
 
-def reducer(stream, rule):
-    reverse = rule.sort_dir == 'desc'
-    keyfunc = itemgetter(rule.sort_key, _type=rule.type)
-    return sorted(stream, key=keyfunc, reverse=reverse)
+class Descending(object):
+    """A sort key (component) that orders its value in reverse
+
+    Examples:
+        >>> sorted([Descending('a'), Descending('c')])[0].value
+        'c'
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __getstate__(self):
+        return self.value
+
+    def __setstate__(self, state):
+        self.value = state
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __ne__(self, other):
+        return self.value != other.value
+
+
+def descending(value):
+    """Invert the ordering of a sort key (component)
+
+    Examples:
+        >>> descending(2)
+        -2
+        >>> descending('a').value
+        'a'
+    """
+    return -value if isinstance(value, Number) else Descending(value)
+
+
+def get_getter(sort_key, _type=None):
+    """Creates a function that gets an item's sort key
+
+    Args:
+        sort_key (str): The item attribute to sort by
+        _type (str): The type to cast the attribute to (default: None).
+
+    Returns:
+        func: The key function
+
+    Examples:
+        >>> get_getter('a', 'int')({'a': '2'})
+        2
+        >>> get_getter('a', 'date')({'a': '1970-01-02'})
+        86400
+    """
+    getter = itemgetter(sort_key, _type=_type)
+
+    if _type == 'date':
+        # dates are cast to dicts (which aren't orderable), so use the unix
+        # timestamp
+        keyfunc = lambda item: getter(item).get('utime', 0)
+    else:
+        keyfunc = getter
+
+    return keyfunc
+
+
+def get_getters(rules):
+    """Gets each rule's key function and sort direction. Since each rule sorts
+    the output of the previous one, the last rule is the most significant.
+
+    Args:
+        rules (List[obj]): the sort rules (Objectify instances).
+
+    Returns:
+        List[Tuple[func, bool]]: The key function and whether it sorts in
+            descending order, from the most to least significant rule
+
+    Examples:
+        >>> from meza.fntools import Objectify
+        >>>
+        >>> rules = [
+        ...     Objectify({'sort_key': 'b', 'sort_dir': 'desc'}),
+        ...     Objectify({'sort_key': 'a', 'type': 'int'})]
+        >>> [(f({'a': '2', 'b': 'x'}), desc) for f, desc in get_getters(rules)]
+        [(2, False), ('x', True)]
+    """
+    getters = [get_getter(r.sort_key, r.type) for r in rules]
+    descending = [r.sort_dir == 'desc' for r in rules]
+    return list(reversed(list(zip(getters, descending))))
+
+
+def get_keyfunc(getters):
+    """Creates a function that computes an item's composite sort key
+
+    Args:
+        getters (List[Tuple[func, bool]]): The key functions and directions
+            (see `get_getters`).
+
+    Returns:
+        func: The key function
+
+    Examples:
+        >>> from operator import itemgetter
+        >>>
+        >>> keyfunc = get_keyfunc([(itemgetter('a'), True), (len, False)])
+        >>> keyfunc({'a': 2})
+        (-2, 1)
+    """
+    def reverse(getter):
+        return lambda item: descending(getter(item))
+
+    funcs = [reverse(getter) if desc else getter for getter, desc in getters]
+
+    if len(funcs) == 1:
+        keyfunc = funcs[0]
+    else:
+        def keyfunc(item):
+            return tuple([func(item) for func in funcs])
+
+    return keyfunc
+
+
+def sort_items(items, getters):
+    """Sorts a list of items computing each key only once
+
+    Args:
+        items (List[dict]): The source.
+        getters (List[Tuple[func, bool]]): The key functions and directions
+            (see `get_getters`).
+
+    Returns:
+        List[dict]: The sorted items
+
+    Examples:
+        >>> from operator import itemgetter
+        >>>
+        >>> items = [
+        ...     {'a': 1, 'b': 'x'}, {'a': 2, 'b': 'y'}, {'a': 1, 'b': 'z'}]
+        >>> getters = [(itemgetter('a'), False), (itemgetter('b'), True)]
+        >>> [item['b'] for item in sort_items(items, getters)]
+        ['z', 'x', 'y']
+    """
+    if len(getters) == 1:
+        getter, desc = getters[0]
+        return sorted(items, key=getter, reverse=desc)
+
+    # compute each key once and then stably sort the item positions from the
+    # least to most significant key. This is faster than sorting by composite
+    # keys since tuple (and `Descending`) comparisons are done in python.
+    positions = range(len(items))
+
+    for getter, desc in reversed(getters):
+        keys = [getter(item) for item in items]
+        positions = sorted(positions, key=keys.__getitem__, reverse=desc)
+
+    return [items[pos] for pos in positions]
+
+
+def _spill(run):
+    # write a sorted run of (key, index, item) tuples to a temp file in blocks
+    # (pickling one tuple at a time is much slower)
+    f = TemporaryFile()
+
+    for pos in range(0, len(run), SPILL_BLOCK_SIZE):
+        block = run[pos:pos + SPILL_BLOCK_SIZE]
+        pickle.dump(block, f, pickle.HIGHEST_PROTOCOL)
+
+    f.seek(0)
+    return f
+
+
+def _gen_run(f):
+    while True:
+        try:
+            block = pickle.load(f)
+        except EOFError:
+            break
+
+        for entry in block:
+            yield entry
+
+
+def external_sort(stream, keyfunc, buffer_size):
+    """Sorts a stream using bounded memory by spilling sorted runs of
+    `buffer_size` items to temp files and then merging them. The sort is
+    stable.
+
+    Args:
+        stream (Iter[dict]): The source.
+        keyfunc (func): The sort key function (see `get_keyfunc`).
+
+        buffer_size (int): The maximum number of items to hold in memory
+
+    Yields:
+        dict: an item
+
+    Examples:
+        >>> stream = ({'x': x % 3, 'y': x} for x in range(7))
+        >>> keyfunc = lambda item: item['x']
+        >>> [item['y'] for item in external_sort(stream, keyfunc, 2)]
+        [0, 3, 6, 1, 4, 2, 5]
+    """
+    keyed = ((keyfunc(item), i, item) for i, item in zip(count(), stream))
+    files = []
+
+    try:
+        while True:
+            run = sorted(islice(keyed, buffer_size))
+
+            if not run:
+                break
+
+            files.append(_spill(run))
+
+        # the index is unique, so items themselves are never compared
+        for _, _, item in merge(*map(_gen_run, files)):
+            yield item
+    finally:
+        for f in files:
+            f.close()
+
+
+def top_items(stream, getters, limit, last=False):
+    """Gets the first (or last) items of a sorted stream using a heap of
+    `limit` items, i.e., in O(n log k) time and O(k) memory. The result is
+    the same as fully sorting the stream and then slicing it.
+
+    Args:
+        stream (Iter[dict]): The source.
+        getters (List[Tuple[func, bool]]): The key functions and directions
+            (see `get_getters`).
+
+        limit (int): The number of items to keep
+        last (bool): Keep the last items instead of the first (default:
+            False).
+
+    Returns:
+        List[dict]: The sorted items
+
+    Examples:
+        >>> from operator import itemgetter
+        >>>
+        >>> stream = ({'x': x % 3, 'y': x} for x in range(7))
+        >>> getters = [(itemgetter('x'), False)]
+        >>> [item['y'] for item in top_items(stream, getters, 3)]
+        [0, 3, 6]
+        >>> stream = ({'x': x % 3, 'y': x} for x in range(7))
+        >>> [item['y'] for item in top_items(stream, getters, 3, True)]
+        [4, 2, 5]
+    """
+    keyfunc = get_keyfunc(getters)
+
+    # the index keeps ties in stream order, so items are never compared
+    keyed = ((keyfunc(item), i, item) for i, item in zip(count(), stream))
+
+    if last:
+        entries = reversed(nlargest(limit, keyed))
+    else:
+        entries = nsmallest(limit, keyed)
+
+    return [item for _, _, item in entries]
+
+
+def sort(stream, rules, buffer_size=None, limit=None, last=False):
+    """Sorts a stream by all rules at once, falling back to an external merge
+    sort when there are more than `buffer_size` items
+
+    Args:
+        stream (Iter[dict]): The source.
+        rules (List[obj]): the sort rules (Objectify instances).
+        buffer_size (int): The maximum number of items to sort in memory.
+            If 0 or None, there is no limit (default: None).
+
+    Returns:
+        Iter[dict]: The sorted stream
+
+    Examples:
+        >>> from meza.fntools import Objectify
+        >>>
+        >>> items = [{'a': 1, 'b': 2}, {'a': 2, 'b': 1}, {'a': 1, 'b': 1}]
+        >>> rules = [
+        ...     Objectify({'sort_key': 'b', 'sort_dir': 'desc'}),
+        ...     Objectify({'sort_key': 'a', 'sort_dir': 'asc'})]
+        >>> expected = [(1, 2), (1, 1), (2, 1)]
+        >>> [(i['a'], i['b']) for i in sort(items, rules)] == expected
+        True
+        >>> result = sort(iter(items), rules, buffer_size=1)
+        >>> [(i['a'], i['b']) for i in result] == expected
+        True
+        >>> result = sort(iter(items), rules, buffer_size=0)
+        >>> [(i['a'], i['b']) for i in result] == expected
+        True
+        >>> [(i['a'], i['b']) for i in sort(items, rules, limit=2)]
+        [(1, 2), (1, 1)]
+    """
+    getters = get_getters(rules)
+    buffer_size = buffer_size or None
+
+    if limit is not None and limit <= (buffer_size or limit):
+        return top_items(stream, getters, limit, last)
+
+    stream = iter(stream)
+    buffered = list(islice(stream, buffer_size))
+
+    if buffer_size is None or len(buffered) < buffer_size:
+        sorted_stream = sort_items(buffered, getters)
+    else:
+        keyfunc = get_keyfunc(getters)
+        chained = chain(buffered, stream)
+        sorted_stream = external_sort(chained, keyfunc, buffer_size)
+
+    if limit is not None and last:
+        sorted_stream = deque(sorted_stream, limit)
+    elif limit is not None:
+        sorted_stream = islice(sorted_stream, limit)
+
+    return sorted_stream
+
+
+def sort_run(args):
+    """Sorts a partition of a stream (in a worker process)
+
+    Args:
+        args (Tuple): The items, the index of the first item, the sort rules
+            (dicts), the number of items to keep (or None to keep them all),
+            and whether to keep the last items instead of the first.
+
+    Returns:
+        List[Tuple]: The sorted (key, index, item) entries
+
+    Examples:
+        >>> rules = [{'sort_key': 'x', 'sort_dir': 'desc', 'type': None}]
+        >>> items = [{'x': 1}, {'x': 3}, {'x': 2}]
+        >>> [(key, i) for key, i, _ in sort_run((items, 10, rules, 2, False))]
+        [(-3, 11), (-2, 12)]
+    """
+    items, start, rules, limit, last = args
+    keyfunc = get_keyfunc(get_getters(list(map(Objectify, rules))))
+    keyed = [(keyfunc(item), i, item) for i, item in enumerate(items, start)]
+
+    if limit is None:
+        entries = sorted(keyed)
+    elif last:
+        entries = sorted(nlargest(limit, keyed))
+    else:
+        entries = nsmallest(limit, keyed)
+
+    return entries
+
+
+def _gen_sorted_runs(args, workers):
+    if current_process().daemon:
+        # daemonic processes (e.g., the workers of
+        # `SyncPipe(parallel=True, threads=False)`) can't have children
+        logger.debug('Sorting partitions serially in a daemonic process')
+
+        for arg in args:
+            yield sort_run(arg)
+    else:
+        pool = Pool(workers)
+        pending = deque()
+
+        # only `workers` partitions are queued at a time (`imap` would read
+        # the entire stream into its task queue)
+        try:
+            for arg in args:
+                pending.append(pool.apply_async(sort_run, [arg]))
+
+                if len(pending) > workers:
+                    yield pending.popleft().get()
+
+            while pending:
+                yield pending.popleft().get()
+        finally:
+            pool.terminate()
+
+
+def parallel_sort(stream, rules, workers=None, chunksize=None, **kwargs):
+    """Sorts a stream by splitting it into partitions that are sorted in a
+    pool of processes, and then merging the sorted runs. Best when computing
+    the keys is expensive, e.g., parsing dates. At most `workers + 1`
+    partitions are held in memory since the sorted runs are spilled to temp
+    files. Daemonic processes can't start a pool, so the partitions are
+    sorted serially when called from one.
+
+    Args:
+        stream (Iter[dict]): The source.
+        rules (List[obj]): the sort rules (Objectify instances).
+        workers (int): Number of processes (default: None, i.e., the number
+            of cpus).
+
+        chunksize (int): Number of items in each partition (default: 65536).
+        kwargs (dict): Keyword arguments.
+
+    Kwargs:
+        limit (int): Only output this many items (default: None, i.e., all of
+            them).
+
+        last (bool): Output the last `limit` items instead of the first
+            (default: False).
+
+    Yields:
+        dict: an item
+
+    Examples:
+        >>> from meza.fntools import Objectify
+        >>>
+        >>> stream = ({'x': x % 3, 'y': x} for x in range(7))
+        >>> rule = {'sort_key': 'x', 'sort_dir': 'asc', 'type': None}
+        >>> result = parallel_sort(stream, [Objectify(rule)], 2, chunksize=3)
+        >>> [item['y'] for item in result]
+        [0, 3, 6, 1, 4, 2, 5]
+    """
+    limit, last = kwargs.get('limit'), kwargs.get('last', False)
+    chunksize = chunksize or 2 ** 16
+    attrs = ['sort_key', 'sort_dir', 'type']
+    specs = [{attr: getattr(rule, attr) for attr in attrs} for rule in rules]
+    stream = iter(stream)
+    partitions = iter(lambda: list(islice(stream, chunksize)), [])
+    starts = count(0, chunksize)
+    zipped = zip(partitions, starts)
+    args = ((items, start, specs, limit, last) for items, start in zipped)
+    files = []
+
+    try:
+        for run in _gen_sorted_runs(args, workers or cpu_count()):
+            files.append(_spill(run))
+
+        # the index is unique, so items themselves are never compared
+        merged = (item for _, _, item in merge(*map(_gen_run, files)))
+
+        if limit is not None and last:
+            merged = deque(merged, limit)
+        elif limit is not None:
+            merged = islice(merged, limit)
+
+        for item in merged:
+            yield item
+    finally:
+        for f in files:
+            f.close()
 
 
 def async_parser(stream, rules, tuples, **kwargs):
@@ -88,7 +541,7 @@ def async_parser(stream, rules, tuples, **kwargs):
         ...         pass
         True
     """
-    return ait.async_reduce(reducer, rules, stream)
+    return util.async_return(parser(stream, rules, tuples, **kwargs))
 
 
 def parser(stream, rules, tuples, **kwargs):
@@ -124,7 +577,20 @@ def parser(stream, rules, tuples, **kwargs):
         >>> parser(stream, [rule], tuples, **kwargs)[0] == {'content': 4}
         True
     """
-    return reduce(reducer, rules, stream)
+    conf = kwargs.get('conf') or {}
+    limit = conf.get('limit')
+    limit = None if limit is None else int(limit)
+    last = conf.get('last', False)
+
+    if conf.get('parallel'):
+        pkwargs = {'workers': conf.get('workers'), 'limit': limit}
+        pkwargs.update({'last': last, 'chunksize': conf.get('chunksize')})
+        sorted_stream = parallel_sort(stream, rules, **pkwargs)
+    else:
+        buffer_size = conf.get('buffer_size')
+        sorted_stream = sort(stream, rules, buffer_size, limit, last)
+
+    return sorted_stream
 
 
 @operator(DEFAULTS, isasync=True, **OPTS)
@@ -137,12 +603,15 @@ def async_pipe(*args, **kwargs):
         kwargs (dict): The keyword arguments passed to the wrapper
 
     Kwargs:
-        conf (dict): The pipe configuration. May contain the key 'rule'
+        conf (dict): The pipe configuration. May contain the keys 'rule',
+            'buffer_size', 'limit', 'last', 'parallel', 'workers', or
+            'chunksize'.
 
             rule (dict): The sort configuration, can be either a dict or list
                 of dicts (default: {'sort_dir': 'asc', 'sort_key': 'content'}).
                 Must contain the key 'sort_key'. May contain the key 'sort_dir',
-                    or 'cast'.
+                    or 'type'. When given multiple rules, the last one is the
+                    primary sort key.
 
                 type (str): Expected value type. Must be one of
                     `CAST_SWITCH` (default: None).
@@ -153,6 +622,29 @@ def async_pipe(*args, **kwargs):
                 sort_dir (str): The sort direction. Must be either 'asc' or
                     'desc' (default: 'asc').
 
+            buffer_size (int): The maximum number of items to sort in memory.
+                Larger streams are sorted in runs that are spilled to temp
+                files and then merged. If 0, the entire stream is sorted in
+                memory (default: 1000000).
+
+            limit (int): Only output this many items (default: None, i.e.,
+                all of them). Uses a heap of `limit` items rather than sorting
+                the entire stream.
+
+            last (bool): Output the last `limit` items of the sorted stream
+                instead of the first (default: False).
+
+            parallel (bool): Extract keys and sort partitions of the stream in
+                a pool of processes and then merge them. Partitions are
+                sorted serially in daemonic processes, e.g., under
+                `SyncPipe(parallel=True, threads=False)` (default: False).
+
+            workers (int): Number of processes (default: None, i.e., the
+                number of cpus).
+
+            chunksize (int): Number of items in each partition when sorting
+                in parallel (default: 65536).
+
     Returns:
         Deferred: twisted.internet.defer.Deferred stream
 
@@ -186,12 +678,15 @@ def pipe(*args, **kwargs):
         kwargs (dict): The keyword arguments passed to the wrapper
 
     Kwargs:
-        conf (dict): The pipe configuration. May contain the key 'rule'
+        conf (dict): The pipe configuration. May contain the keys 'rule',
+            'buffer_size', 'limit', 'last', 'parallel', 'workers', or
+            'chunksize'.
 
             rule (dict): The sort configuration, can be either a dict or list
                 of dicts (default: {'sort_dir': 'asc', 'sort_key': 'content'}).
                 Must contain the key 'sort_key'. May contain the key 'sort_dir',
-                    or 'cast'.
+                    or 'type'. When given multiple rules, the last one is the
+                    primary sort key.
 
                 type (str): Expected value type. Must be one of
                     `CAST_SWITCH` (default: None).
@@ -199,6 +694,29 @@ def pipe(*args, **kwargs):
                 sort_dir (str): The sort direction. Must be either 'asc' or
                     'desc'.
 
+            buffer_size (int): The maximum number of items to sort in memory.
+                Larger streams are sorted in runs that are spilled to temp
+                files and then merged. If 0, the entire stream is sorted in
+                memory (default: 1000000).
+
+            limit (int): Only output this many items (default: None, i.e.,
+                all of them). Uses a heap of `limit` items rather than sorting
+                the entire stream.
+
+            last (bool): Output the last `limit` items of the sorted stream
+                instead of the first (default: False).
+
+            parallel (bool): Extract keys and sort partitions of the stream in
+                a pool of processes and then merge them. Partitions are
+                sorted serially in daemonic processes, e.g., under
+                `SyncPipe(parallel=True, threads=False)` (default: False).
+
+            workers (int): Number of processes (default: None, i.e., the
+                number of cpus).
+
+            chunksize (int): Number of items in each partition when sorting
+                in parallel (default: 65536).
+
     Yields:
         dict: an item
 
@@ -216,5 +734,12 @@ def pipe(*args, **kwargs):
         >>> rule = {'sort_key': 'name', 'sort_dir': 'desc'}
         >>> next(pipe(items, conf={'rule': rule}))['name'] == 'sue'
         True
+        >>> rules = [{'sort_key': 'name'}, {'sort_key': 'rank'}]
+        >>> conf = {'rule': rules, 'buffer_size': 2}
+        >>> [item['name'] for item in pipe(items, conf=conf)]
+        ['sue', 'adam', 'bill']
+        >>> conf = {'rule': {'sort_key': 'rank'}, 'limit': 1, 'last': True}
+        >>> [item['name'] for item in pipe(items, conf=conf)]
+        ['bill']
     """
     return parser(*args, **kwargs)
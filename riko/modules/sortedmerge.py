@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+# vim: sw=4:ts=4:expandtab
+"""
+riko.modules.sortedmerge
+~~~~~~~~~~~~~~~~~~~~~~~~
+Provides functions for merging streams that are each sorted by an item field
+(e.g., feeds sorted by date) into a single sorted stream.
+
+Unlike a union followed by a sort, the merge is lazy and only holds one item
+of each stream in memory (plus any reorder buffers).
+
+Examples:
+    basic usage::
+
+        >>> from riko.modules.sortedmerge import pipe
+        >>>
+        >>> items = ({'content': x} for x in (5, 3, 1))
+        >>> others = [({'content': x} for x in (6, 4, 2))]
+        >>> merged = pipe(items, others=others)
+        >>> [item['content'] for item in merged]
+        [6, 5, 4, 3, 2, 1]
+
+Attributes:
+    OPTS (dict): The default pipe options
+    DEFAULTS (dict): The default parser options
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals)
+
+import pygogo as gogo
+
+from heapq import merge, heappush, heappop, heappushpop
+
+from builtins import *  # noqa # pylint: disable=unused-import
+
+from . import operator
+from .sort import get_getters, get_keyfunc
+from riko.bado import coroutine, return_value
+
+try:
+    from twisted.internet.defer import maybeDeferred, gatherResults
+except ImportError:
+    pass
+
+OPTS = {'listize': True, 'extract': 'rule'}
+DEFAULTS = {
+    'rule': {'sort_dir': 'desc', 'sort_key': 'content', 'type': None},
+    'reorder': 0}
+
+logger = gogo.Gogo(__name__, monolog=True).logger
+
+
+def gen_keyed(stream, keyfunc, num=0):
+    """Yields (key, stream number, index, item) entries, so that items
+    themselves are never compared, and ties keep their stream order
+
+    Examples:
+        >>> list(gen_keyed([{'x': 2}], lambda item: item['x'], 1))
+        [(2, 1, 0, {'x': 2})]
+    """
+    for i, item in enumerate(stream):
+        yield (keyfunc(item), num, i, item)
+
+
+def repair(entries, size=0):
+    """Puts a nearly sorted stream of entries in order using a heap of `size`
+    entries. Any entry that is at most `size` positions away from its sorted
+    position is repaired.
+
+    Args:
+        entries (Iter[tuple]): The (key, ...) entries (see `gen_keyed`)
+        size (int): The size of the reorder buffer (default: 0).
+
+    Yields:
+        tuple: an entry
+
+    Examples:
+        >>> entries = [(1,), (3,), (2,), (4,)]
+        >>> list(repair(entries, 1))
+        [(1,), (2,), (3,), (4,)]
+    """
+    heap = []
+
+    for entry in entries:
+        if len(heap) < size:
+            heappush(heap, entry)
+        else:
+            yield heappushpop(heap, entry)
+
+    while heap:
+        yield heappop(heap)
+
+
+def verify(entries):
+    """Logs a warning (once) if a stream of entries is out of order
+
+    Examples:
+        >>> list(verify([(1,), (0,), (2,)]))
+        [(1,), (0,), (2,)]
+    """
+    entries = iter(entries)
+    last = None
+
+    for entry in entries:
+        yield entry
+
+        if last is not None and entry[0] < last[0]:
+            logger.warning('Stream is out of order. Try a larger `reorder`.')
+            break
+
+        last = entry
+
+    for entry in entries:
+        yield entry
+
+
+def merge_sorted(sources, rules, reorder=0):
+    """Merges sorted streams into one sorted stream (holding one item of each
+    stream in memory, i.e., O(sources) memory)
+
+    Args:
+        sources (Iter[Iter[dict]]): The sorted streams.
+        rules (List[obj]): the sort rules (Objectify instances) the streams
+            are sorted by.
+
+        reorder (int): The size of each stream's reorder buffer, for streams
+            that aren't quite sorted (default: 0).
+
+    Returns:
+        Iter[dict]: The merged stream
+
+    Examples:
+        >>> from meza.fntools import Objectify
+        >>>
+        >>> rule = {'sort_key': 'x', 'sort_dir': 'asc', 'type': 'int'}
+        >>> sources = [[{'x': 1}, {'x': '4'}], [{'x': 3}, {'x': 2}]]
+        >>> merged = merge_sorted(sources, [Objectify(rule)], 1)
+        >>> [int(item['x']) for item in merged]
+        [1, 2, 3, 4]
+    """
+    keyfunc = get_keyfunc(get_getters(rules))
+    keyed = (gen_keyed(s, keyfunc, num) for num, s in enumerate(sources))
+    repaired = [verify(repair(entries, reorder)) for entries in keyed]
+    return (entry[-1] for entry in merge(*repaired))
+
+
+def parser(stream, rules, tuples, **kwargs):
+    """ Parses the pipe content
+
+    Args:
+        stream (Iter[dict]): The source. Note: this shares the `tuples`
+            iterator, so consuming it will consume `tuples` as well.
+
+        rules (List[obj]): the item independent rules (Objectify instances).
+
+        tuples (Iter[(dict, obj)]): Iterable of tuples of (item, objconf)
+            `item` is an element in the source stream and `objconf` is the item
+            configuration (an Objectify instance). Note: this shares the
+            `stream` iterator, so consuming it will consume `stream` as well.
+
+        kwargs (dict): Keyword arguments.
+
+    Kwargs:
+        conf (dict): The pipe configuration.
+        others (List[Iter(dict)]): List of sorted streams to merge
+
+    Returns:
+        Iter(dict): The output stream
+
+    Examples:
+        >>> from meza.fntools import Objectify
+        >>> from itertools import repeat
+        >>>
+        >>> rule = Objectify({'sort_key': 'content', 'sort_dir': 'asc'})
+        >>> stream = ({'content': x} for x in (0, 2, 4))
+        >>> others = [({'content': x} for x in (1, 3))]
+        >>> tuples = zip(stream, repeat(rule))
+        >>> merged = parser(stream, [rule], tuples, others=others)
+        >>> [item['content'] for item in merged]
+        [0, 1, 2, 3, 4]
+    """
+    conf = kwargs.get('conf') or {}
+    sources = [stream] + list(kwargs.get('others') or [])
+    return merge_sorted(sources, rules, int(conf.get('reorder') or 0))
+
+
+@coroutine
+def async_parser(stream, rules, tuples, **kwargs):
+    """ Asynchronously parses the pipe content. Any of the `others` may be
+    a deferred stream.
+
+    Args:
+        stream (Iter[dict]): The source. Note: this shares the `tuples`
+            iterator, so consuming it will consume `tuples` as well.
+
+        rules (List[obj]): the item independent rules (Objectify instances).
+
+        tuples (Iter[(dict, obj)]): Iterable of tuples of (item, objconf)
+            `item` is an element in the source stream and `objconf` is the item
+            configuration (an Objectify instance). Note: this shares the
+            `stream` iterator, so consuming it will consume `stream` as well.
+
+        kwargs (dict): Keyword arguments.
+
+    Kwargs:
+        conf (dict): The pipe configuration.
+        others (List[Iter(dict)]): List of (deferred) sorted streams to merge
+
+    Returns:
+        Deferred: twisted.internet.defer.Deferred output stream
+
+    Examples:
+        >>> from itertools import repeat
+        >>> from twisted.internet.defer import succeed
+        >>> from riko.bado import react
+        >>> from riko.bado.mock import FakeReactor
+        >>> from meza.fntools import Objectify
+        >>>
+        >>> def run(reactor):
+        ...     callback = lambda x: print([item['content'] for item in x])
+        ...     rule = Objectify({'sort_key': 'content', 'sort_dir': 'asc'})
+        ...     stream = ({'content': x} for x in (0, 2))
+        ...     tuples = zip(stream, repeat(rule))
+        ...     others = [succeed({'content': x} for x in (1, 3))]
+        ...     d = async_parser(stream, [rule], tuples, others=others)
+        ...     return d.addCallbacks(callback, logger.error)
+        >>>
+        >>> try:
+        ...     react(run, _reactor=FakeReactor())
+        ... except SystemExit:
+        ...     pass
+        ...
+        [0, 1, 2, 3]
+    """
+    others = kwargs.get('others') or []
+    deferreds = [maybeDeferred(lambda x: x, other) for other in others]
+    kwargs['others'] = yield gatherResults(deferreds, consumeErrors=True)
+    return_value(parser(stream, rules, tuples, **kwargs))
+
+
+@operator(DEFAULTS, isasync=True, **OPTS)
+def async_pipe(*args, **kwargs):
+    """An operator that asynchronously merges sorted streams into a single
+    sorted stream.
+
+    Args:
+        items (Iter[dict]): The source.
+        kwargs (dict): The keyword arguments passed to the wrapper
+
+    Kwargs:
+        conf (dict): The pipe configuration. May contain the keys 'rule' or
+            'reorder'.
+
+            rule (dict): The sort configuration the streams are sorted by,
+                can be either a dict or list of dicts (default:
+                {'sort_dir': 'desc', 'sort_key': 'content'}). Must contain
+                the key 'sort_key'. May contain the key 'sort_dir', or
+                'type'. See `riko.modules.sort`.
+
+            reorder (int): The size of each stream's reorder buffer. An item
+                that is at most this many positions away from its sorted
+                position is put back in order (default: 0).
+
+        others (List[Iter(dict)]): List of (deferred) sorted streams to merge
+
+    Returns:
+        Deferred: twisted.internet.defer.Deferred stream
+
+    Examples:
+        >>> from riko.bado import react
+        >>> from riko.bado.mock import FakeReactor
+        >>>
+        >>> def run(reactor):
+        ...     callback = lambda x: print([item['content'] for item in x])
+        ...     items = ({'content': x} for x in (5, 3, 1))
+        ...     others = [({'content': x} for x in (6, 4, 2))]
+        ...     d = async_pipe(items, others=others)
+        ...     return d.addCallbacks(callback, logger.error)
+        >>>
+        >>> try:
+        ...     react(run, _reactor=FakeReactor())
+        ... except SystemExit:
+        ...     pass
+        ...
+        [6, 5, 4, 3, 2, 1]
+    """
+    return async_parser(*args, **kwargs)
+
+
+@operator(DEFAULTS, **OPTS)
+def pipe(*args, **kwargs):
+    """An operator that lazily merges sorted streams into a single sorted
+    stream, e.g., feeds sorted by date into one timeline.
+
+    Args:
+        items (Iter[dict]): The source.
+        kwargs (dict): The keyword arguments passed to the wrapper
+
+    Kwargs:
+        conf (dict): The pipe configuration. May contain the keys 'rule' or
+            'reorder'.
+
+            rule (dict): The sort configuration the streams are sorted by,
+                can be either a dict or list of dicts (default:
+                {'sort_dir': 'desc', 'sort_key': 'content'}). Must contain
+                the key 'sort_key'. May contain the key 'sort_dir', or
+                'type'. See `riko.modules.sort`.
+
+            reorder (int): The size of each stream's reorder buffer. An item
+                that is at most this many positions away from its sorted
+                position is put back in order (default: 0).
+
+        others (List[Iter(dict)]): List of sorted streams to merge
+
+    Yields:
+        dict: an item
+
+    Examples:
+        >>> items = [
+        ...     {'title': 'b', 'pubDate': 'Tue, 02 Jun 2015 10:00:00 GMT'},
+        ...     {'title': 'd', 'pubDate': 'Mon, 01 Jun 2015 12:00:00 GMT'}]
+        >>> others = [[
+        ...     {'title': 'a', 'pubDate': 'Tue, 02 Jun 2015 12:00:00 GMT'},
+        ...     {'title': 'c', 'pubDate': 'Mon, 01 Jun 2015 18:00:00 GMT'}]]
+        >>> rule = {'sort_key': 'pubDate', 'sort_dir': 'desc', 'type': 'date'}
+        >>> merged = pipe(items, conf={'rule': rule}, others=others)
+        >>> [item['title'] for item in merged] == ['a', 'b', 'c', 'd']
+        True
+    """
+    return parser(*args, **kwargs)
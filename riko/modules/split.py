@@ -26,7 +26,7 @@ from __future__ import (
     absolute_import, division, print_function, unicode_literals)
 
 
-from copy import deepcopy
+from itertools import tee
 
 from builtins import *  # noqa # pylint: disable=unused-import
 
@@ -68,17 +68,17 @@ def parser(stream, splits, tuples, **kwargs):
         >>> next(next(streams)) == {'x': 0}
         True
     """
-    source = list(stream)
-
-    # deepcopy each item so that each split is independent
-    for num in range(splits):
-        yield map(deepcopy, source)
+    # the splits share one buffer (which only holds the items that some
+    # splits have yet to consume) and shallow copy each item. The pipes only
+    # change nested fields via `DotDict.set` and `DotDict.delete`, which copy
+    # the nested dicts they change, so a split only copies what it changes
+    for split in tee(stream, splits):
+        yield (item.copy() for item in split)
 
 
 @operator(DEFAULTS, isasync=True, **OPTS)
 def async_pipe(*args, **kwargs):
-    """An operator that asynchronously and eagerly splits a stream into identical
-    copies. Note that this pipe is not lazy.
+    """An operator that asynchronously splits a stream into identical copies.
 
     Args:
         items (Iter[dict]): The source stream.
@@ -113,8 +113,9 @@ def async_pipe(*args, **kwargs):
 
 @operator(DEFAULTS, **OPTS)
 def pipe(*args, **kwargs):
-    """An operator that eagerly splits a stream into identical copies.
-    Note that this pipe is not lazy.
+    """An operator that lazily splits a stream into identical copies. The
+    copies read the source through a shared buffer, so consuming them in
+    lockstep keeps memory bounded.
 
     Args:
         items (Iter[dict]): The source stream.
@@ -135,5 +136,13 @@ def pipe(*args, **kwargs):
         True
         >>> len(list(pipe(items, conf={'splits': '3'})))
         3
+        >>> items = [{'x': {'y': 0}}]
+        >>> stream1, stream2 = pipe(items)
+        >>> item = next(stream1)
+        >>> item.set('x.y', 1)
+        >>> item == {'x': {'y': 1}}
+        True
+        >>> next(stream2) == {'x': {'y': 0}}
+        True
     """
     return parser(*args, **kwargs)
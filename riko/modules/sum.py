@@ -21,20 +21,39 @@ Attributes:
 from __future__ import (
     absolute_import, division, print_function, unicode_literals)
 
-import itertools as it
 import pygogo as gogo
 
-from operator import itemgetter
-from decimal import Decimal
+from decimal import Decimal  # noqa # pylint: disable=unused-import
 from builtins import *  # noqa # pylint: disable=unused-import
+from meza.process import merge
 
 from . import operator
+from riko.aggregates import get_aggregate, get_group_keys
 
 OPTS = {}
 DEFAULTS = {'sum_key': 'content', 'group_key': None}
 logger = gogo.Gogo(__name__, monolog=True).logger
 
 
+def get_aggregation(conf=None):
+    """Gets what the pipe aggregates, so that workers can aggregate chunks of
+    its source (see `riko.aggregates.accumulate`)
+
+    Args:
+        conf (dict): The pipe configuration (default: None)
+
+    Returns:
+        Tuple[List[str], List[Tuple[str, str]]]: The group keys and the
+            (aggregate, field) pairs
+
+    Examples:
+        >>> get_aggregation({'sum_key': 'amount', 'group_key': 'x'})
+        (['x'], [('sum', 'amount')])
+    """
+    conf = merge([DEFAULTS, conf or {}])
+    return get_group_keys(conf['group_key']), [('sum', conf['sum_key'])]
+
+
 def parser(stream, objconf, tuples, **kwargs):
     """ Parses the pipe content
 
@@ -53,6 +72,8 @@ def parser(stream, objconf, tuples, **kwargs):
 
     Kwargs:
         conf (dict): The pipe configuration.
+        partials (Iter[dict]): Accumulators of chunks of the source that
+            were aggregated by workers (default: None).
 
     Returns:
         mixed: The output either a dict or iterable of dicts
@@ -79,17 +100,8 @@ def parser(stream, objconf, tuples, **kwargs):
         >>> next(summed) == {'two': Decimal('2')}
         True
     """
-    _sum = lambda group: sum(Decimal(g[objconf.sum_key]) for g in group)
-
-    if objconf.group_key:
-        keyfunc = itemgetter(objconf.group_key)
-        sorted_stream = sorted(stream, key=keyfunc)
-        grouped = it.groupby(sorted_stream, keyfunc)
-        summed = ({key: _sum(group)} for key, group in grouped)
-    else:
-        summed = {kwargs['assign']: _sum(stream)}
-
-    return summed
+    args = (stream, 'sum', objconf.sum_key, objconf.group_key)
+    return get_aggregate(*args, **kwargs)
 
 
 @operator(DEFAULTS, isasync=True, **OPTS)
@@ -109,11 +121,12 @@ def async_pipe(*args, **kwargs):
 
             group_key (str): Item attribute to sum by. This will group items
                 in the stream by the given key and report a sum for each
-                group (default: None).
+                group (default: None). If a list of attributes, each group's
+                item holds the attributes along with the sum.
 
-        assign (str): Attribute to assign parsed content. If `sum_key` is set,
-            this is ignored and the group keys are used instead. (default:
-            content)
+        assign (str): Attribute to assign parsed content. If `group_key` is a
+            single attribute, this is ignored and the group keys are used
+            instead. (default: content)
 
     Returns:
         Deferred: twisted.internet.defer.Deferred iterator of the summed items
@@ -140,8 +153,8 @@ def async_pipe(*args, **kwargs):
 
 @operator(DEFAULTS, **OPTS)
 def pipe(*args, **kwargs):
-    """An aggregator that eagerly sums fields of items in a stream.
-    Note that this pipe is not lazy if `group_key` is specified.
+    """An aggregator that eagerly sums fields of items in a stream in a single
+    pass. Note that this pipe is not lazy if `group_key` is specified.
 
     Args:
         items (Iter[dict]): The source.
@@ -155,11 +168,12 @@ def pipe(*args, **kwargs):
 
             group_key (str): Item attribute to sum by. This will group items
                 in the stream by the given key and report a sum for each
-                group (default: None).
+                group (default: None). If a list of attributes, each group's
+                item holds the attributes along with the sum.
 
-        assign (str): Attribute to assign parsed content. If `sum_key` is set,
-            this is ignored and the group keys are used instead. (default:
-            content)
+        assign (str): Attribute to assign parsed content. If `group_key` is a
+            single attribute, this is ignored and the group keys are used
+            instead. (default: content)
 
     Yields:
         dict: the summed items
@@ -177,5 +191,13 @@ def pipe(*args, **kwargs):
         True
         >>> next(summed) == {'two': Decimal('2')}
         True
+        >>> stream = [
+        ...     {'amount': 2, 'x': 'one', 'y': 1},
+        ...     {'amount': 1, 'x': 'one', 'y': 2},
+        ...     {'amount': 2, 'x': 'one', 'y': 1}]
+        >>> conf = {'sum_key': 'amount', 'group_key': ['x', 'y']}
+        >>> summed = pipe(stream, conf=conf)
+        >>> next(summed) == {'x': 'one', 'y': 1, 'sum': Decimal('4')}
+        True
     """
     return parser(*args, **kwargs)
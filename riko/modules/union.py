@@ -5,6 +5,12 @@ riko.modules.union
 ~~~~~~~~~~~~~~~~~~
 Provides functions for merging separate sources into a single stream of items.
 
+By default, the sources are read one after another. In 'interleaved' mode,
+each source is read by its own thread and items are yielded as soon as any
+source delivers them. In 'roundrobin' mode, the sources are also read
+concurrently, but take turns yielding an item. The threads stop reading once
+the merged stream is exhausted or closed.
+
 Examples:
     basic usage::
 
@@ -24,18 +30,226 @@ from __future__ import (
     absolute_import, division, print_function, unicode_literals)
 
 import pygogo as gogo
-from itertools import chain
 
+from threading import Thread, Event
+from collections import deque
+
+from six.moves.queue import Queue, Full
 from builtins import *  # noqa # pylint: disable=unused-import
 
 from . import operator
+from riko.bado import coroutine, return_value
 from riko.utils import multiplex
 
-# disable `dictize` since we do not need to access the configuration
+try:
+    from twisted.internet.defer import maybeDeferred, gatherResults
+except ImportError:
+    pass
+
+# disable `dictize` since the items are passed through unchanged
 OPTS = {'dictize': False}
+DEFAULTS = {'mode': 'sequential', 'buffer_size': 1024}
+MODES = {'sequential', 'interleaved', 'roundrobin'}
+
+# how often (in seconds) a blocked feed checks whether it should stop
+POLL_INTERVAL = 0.1
 logger = gogo.Gogo(__name__, monolog=True).logger
 
 
+def put(queue, entry, stop):
+    """Puts an entry in a queue, waiting for a free slot until `stop` is set
+
+    Returns:
+        bool: True if the entry was put in the queue
+    """
+    while not stop.is_set():
+        try:
+            queue.put(entry, timeout=POLL_INTERVAL)
+        except Full:
+            continue
+        else:
+            return True
+
+    return False
+
+
+def feed(source, queue, stop=None):
+    """Puts each item of a source in a queue as a tuple of (item, False),
+    followed by (error, True), where `error` is whatever the source raised
+    (or None). Reading stops as soon as `stop` is set.
+
+    Args:
+        source (Iter[dict]): The source
+        queue (obj): The queue.Queue instance
+        stop (obj): A threading.Event instance (default: None, i.e., never
+            stop early)
+
+    Examples:
+        >>> queue = Queue()
+        >>> feed([{'x': 1}], queue)
+        >>> queue.get() == ({'x': 1}, False)
+        True
+        >>> queue.get()
+        (None, True)
+        >>> stop = Event()
+        >>> stop.set()
+        >>> feed([{'x': 1}], queue, stop)
+        >>> queue.empty()
+        True
+    """
+    stop = stop or Event()
+    error = None
+
+    try:
+        for item in source:
+            if not put(queue, (item, False), stop):
+                return
+    except Exception as err:
+        error = err
+
+    put(queue, (error, True), stop)
+
+
+def start_feed(source, queue, stop=None):
+    thread = Thread(target=feed, args=(source, queue, stop))
+    thread.daemon = True
+    thread.start()
+
+
+def gen_queued(queue, stop):
+    """Yields the items a `feed` puts in a queue, and raises its error. The
+    feed is stopped once the generator is exhausted or closed.
+    """
+    try:
+        while True:
+            item, done = queue.get()
+
+            if done and item:
+                raise item
+            elif done:
+                break
+
+            yield item
+    finally:
+        # also runs on `GeneratorExit`, i.e., when the consumer stops early
+        stop.set()
+
+
+def prefetch(source, buffer_size=1024):
+    """Reads a source in a separate thread
+
+    Args:
+        source (Iter[dict]): The source
+        buffer_size (int): The max number of items to read ahead. If 0, the
+            whole source may be read ahead (default: 1024).
+
+    Returns:
+        Iter[dict]: The items of the source
+
+    Examples:
+        >>> list(prefetch([{'x': 1}, {'x': 2}], 1)) == [{'x': 1}, {'x': 2}]
+        True
+    """
+    queue, stop = Queue(buffer_size), Event()
+    start_feed(source, queue, stop)
+    return gen_queued(queue, stop)
+
+
+def roundrobin(sources):
+    """Yields an item from each source in turn until all are exhausted
+
+    Args:
+        sources (Iter[Iter[dict]]): The sources
+
+    Yields:
+        dict: an item
+
+    Examples:
+        >>> list(roundrobin([[1, 2, 3], [4], [5, 6]]))
+        [1, 4, 5, 2, 6, 3]
+    """
+    active = deque(map(iter, sources))
+
+    try:
+        while active:
+            try:
+                item = next(active[0])
+            except StopIteration:
+                active.popleft()
+            else:
+                yield item
+                active.rotate(-1)
+    finally:
+        for source in active:
+            if hasattr(source, 'close'):
+                source.close()
+
+
+def gen_interleaved(sources, buffer_size=1024):
+    """Reads each source in a separate thread, and yields items in the order
+    the sources deliver them. The threads are stopped once the generator is
+    exhausted or closed.
+
+    Args:
+        sources (Iter[Iter[dict]]): The sources
+        buffer_size (int): The max number of items to read ahead (of all the
+            sources combined). If 0, the sources may be read ahead
+            completely (default: 1024).
+
+    Yields:
+        dict: an item
+
+    Examples:
+        >>> from time import sleep
+        >>>
+        >>> def slow():
+        ...     sleep(0.1)
+        ...     yield {'x': 'slow'}
+        >>>
+        >>> items = gen_interleaved([slow(), [{'x': 'fast'}]])
+        >>> [item['x'] for item in items] == ['fast', 'slow']
+        True
+        >>> def endless():
+        ...     while True:
+        ...         yield {'x': 1}
+        >>>
+        >>> items = gen_interleaved([endless()], 2)
+        >>> next(items) == {'x': 1}
+        True
+        >>> items.close()
+    """
+    queue, stop = Queue(buffer_size), Event()
+    remaining = 0
+
+    for source in sources:
+        start_feed(source, queue, stop)
+        remaining += 1
+
+    try:
+        while remaining:
+            item, done = queue.get()
+
+            if done and item:
+                raise item
+            elif done:
+                remaining -= 1
+            else:
+                yield item
+    finally:
+        # also runs on `GeneratorExit`, i.e., when the consumer stops early
+        stop.set()
+
+
+def get_mode(objconf):
+    mode = objconf.mode or 'sequential'
+
+    if mode not in MODES:
+        msg = 'Invalid mode: %s. (Expected one of %s)'
+        raise ValueError(msg % (mode, ', '.join(sorted(MODES))))
+
+    return mode
+
+
 def parser(stream, objconf, tuples, **kwargs):
     """ Parses the pipe content
 
@@ -61,19 +275,108 @@ def parser(stream, objconf, tuples, **kwargs):
 
     Examples:
         >>> from itertools import repeat
+        >>> from meza.fntools import Objectify
         >>>
         >>> stream = ({'x': x} for x in range(5))
         >>> other1 = ({'x': x + 5} for x in range(5))
         >>> other2 = ({'x': x + 10} for x in range(5))
         >>> kwargs = {'others': [other1, other2]}
         >>> tuples = zip(stream, repeat(None))
-        >>> len(list(parser(stream, None, tuples, **kwargs)))
-        15
+        >>> objconf = Objectify({'mode': 'roundrobin'})
+        >>> merged = parser(stream, objconf, tuples, **kwargs)
+        >>> [item['x'] for item in merged][:6]
+        [0, 5, 10, 1, 6, 11]
     """
-    return chain(stream, multiplex(kwargs['others']))
+    mode = get_mode(objconf)
+    sources = [stream] + list(kwargs['others'])
+    size = objconf.buffer_size
+
+    if size is None:
+        size = DEFAULTS['buffer_size']
 
+    if mode == 'interleaved':
+        merged = gen_interleaved(sources, size)
+    elif mode == 'roundrobin':
+        merged = roundrobin(prefetch(source, size) for source in sources)
+    else:
+        merged = multiplex(sources)
+
+    return merged
+
+
+@coroutine
+def async_parser(stream, objconf, tuples, **kwargs):
+    """ Asynchronously parses the pipe content. Any of the `others` may be
+    a deferred stream. These are waited on concurrently.
+
+    Args:
+        stream (Iter[dict]): The source. Note: this shares the `tuples`
+            iterator, so consuming it will consume `tuples` as well.
+
+        objconf (obj): the item independent configuration (an Objectify
+            instance).
+
+        tuples (Iter[(dict, obj)]): Iterable of tuples of (item, objconf)
+            `item` is an element in the source stream and `objconf` is the item
+            configuration (an Objectify instance). Note: this shares the
+            `stream` iterator, so consuming it will consume `stream` as well.
+
+        kwargs (dict): Keyword arguments.
+
+    Kwargs:
+        others (List[Iter(dict)]): List of (deferred) streams to join. In
+            'interleaved' and 'roundrobin' mode, the streams are merged in
+            the order they become ready.
+
+    Returns:
+        Deferred: twisted.internet.defer.Deferred output stream
 
-@operator(isasync=True, **OPTS)
+    Examples:
+        >>> from itertools import repeat
+        >>> from twisted.internet.defer import Deferred
+        >>> from riko.bado import react
+        >>> from riko.bado.mock import FakeReactor
+        >>> from meza.fntools import Objectify
+        >>>
+        >>> def run(reactor):
+        ...     callback = lambda x: print([item['x'] for item in x])
+        ...     stream = iter([{'x': 0}])
+        ...     tuples = zip(stream, repeat(None))
+        ...     slow, fast = Deferred(), Deferred()
+        ...     kwargs = {'others': [slow, fast]}
+        ...     objconf = Objectify({'mode': 'interleaved'})
+        ...     d = async_parser(stream, objconf, tuples, **kwargs)
+        ...     fast.callback(iter([{'x': 2}]))
+        ...     slow.callback(iter([{'x': 1}]))
+        ...     return d.addCallbacks(callback, logger.error)
+        >>>
+        >>> try:
+        ...     react(run, _reactor=FakeReactor())
+        ... except SystemExit:
+        ...     pass
+        ...
+        [0, 2, 1]
+    """
+    mode = get_mode(objconf)
+    ready = []
+    callback = lambda source: ready.append(source) or source
+    deferreds = [
+        maybeDeferred(lambda x: x, source).addCallback(callback)
+        for source in kwargs['others']]
+
+    others = yield gatherResults(deferreds, consumeErrors=True)
+    sources = [stream] + (others if mode == 'sequential' else ready)
+
+    # the deferreds already ran concurrently, so no threads are needed
+    if mode == 'roundrobin':
+        merged = roundrobin(sources)
+    else:
+        merged = multiplex(sources)
+
+    return_value(merged)
+
+
+@operator(DEFAULTS, isasync=True, **OPTS)
 def async_pipe(*args, **kwargs):
     """An aggregator that asynchronously merges multiple source streams together.
 
@@ -82,7 +385,16 @@ def async_pipe(*args, **kwargs):
         kwargs (dict): The keyword arguments passed to the wrapper
 
     Kwargs:
-        others (List[Iter(dict)]): List of streams to join
+        conf (dict): The pipe configuration. May contain the keys 'mode' or
+            'buffer_size'.
+
+            mode (str): How to merge the streams. Must be one of
+                'sequential', 'interleaved', or 'roundrobin'. (default:
+                'sequential').
+
+            buffer_size (int): Ignored.
+
+        others (List[Iter(dict)]): List of (deferred) streams to join
 
     Returns:
         Deferred: twisted.internet.defer.Deferred iterator of the merged streams
@@ -106,10 +418,10 @@ def async_pipe(*args, **kwargs):
         ...
         15
     """
-    return parser(*args, **kwargs)
+    return async_parser(*args, **kwargs)
 
 
-@operator(**OPTS)
+@operator(DEFAULTS, **OPTS)
 def pipe(*args, **kwargs):
     """An operator that merges multiple streams together.
 
@@ -118,6 +430,22 @@ def pipe(*args, **kwargs):
         kwargs (dict): The keyword arguments passed to the wrapper
 
     Kwargs:
+        conf (dict): The pipe configuration. May contain the keys 'mode' or
+            'buffer_size'.
+
+            mode (str): How to merge the streams. Must be one of
+                'sequential', 'interleaved', or 'roundrobin'. In
+                'sequential' mode, each stream is read after the previous
+                one is exhausted. In the other modes, each stream is read
+                concurrently by its own thread, so slow streams don't hold
+                up the others. 'interleaved' yields items in the order they
+                arrive, 'roundrobin' yields an item of each stream in turn.
+                (default: 'sequential').
+
+            buffer_size (int): The max number of items to read ahead in
+                'interleaved' mode (or per stream in 'roundrobin' mode). If
+                0, streams may be read ahead completely (default: 1024).
+
         others (List[Iter(dict)]): List of streams to join
 
     Yields:
@@ -129,5 +457,11 @@ def pipe(*args, **kwargs):
         >>> other2 = ({'x': x + 10} for x in range(5))
         >>> len(list(pipe(items, others=[other1, other2])))
         15
+        >>> items = ({'x': x} for x in range(5))
+        >>> other = ({'x': x + 5} for x in range(5))
+        >>> conf = {'mode': 'interleaved', 'buffer_size': 2}
+        >>> merged = pipe(items, conf=conf, others=[other])
+        >>> sorted(item['x'] for item in merged)
+        [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
     """
     return parser(*args, **kwargs)
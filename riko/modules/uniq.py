@@ -28,15 +28,183 @@ from __future__ import (
 
 import pygogo as gogo
 
-from collections import deque
+from math import log
+from hashlib import md5
+from struct import unpack
+from collections import OrderedDict
+
 from builtins import *  # noqa # pylint: disable=unused-import
+from meza.fntools import listize
+
 from . import operator
 
 OPTS = {}
-DEFAULTS = {'uniq_key': 'content', 'limit': 1024}
+DEFAULTS = {
+    'uniq_key': 'content', 'limit': 1024, 'mode': 'lru',
+    'capacity': 10 ** 6, 'error_rate': 0.001}
+
 logger = gogo.Gogo(__name__, monolog=True).logger
 
 
+class LRUSet(object):
+    """A set that only remembers its `limit` most recently seen values
+
+    Examples:
+        >>> seen = LRUSet(2)
+        >>> [seen.add(value) for value in [1, 2, 1, 3, 1, 2]]
+        [False, False, True, False, True, False]
+    """
+    def __init__(self, limit):
+        self.limit = limit
+        self.values = OrderedDict()
+
+    def add(self, value):
+        """Adds a value
+
+        Args:
+            value (obj): The (hashable) value
+
+        Returns:
+            bool: Whether the value was already present
+        """
+        present = self.values.pop(value, False)
+        self.values[value] = True
+
+        if len(self.values) > self.limit:
+            self.values.popitem(last=False)
+
+        return present
+
+
+class ExactSet(set):
+    """A set whose `add` method reports whether the value was present
+
+    Examples:
+        >>> seen = ExactSet()
+        >>> [seen.add(value) for value in [1, 2, 1]]
+        [False, False, True]
+    """
+    def add(self, value):
+        present = value in self
+        super(ExactSet, self).add(value)
+        return present
+
+
+class BloomFilter(object):
+    """A fixed size set that may falsely report a value as present (but
+    never the reverse)
+
+    Args:
+        capacity (int): The expected number of distinct values
+        error_rate (float): The false positive rate at `capacity` values
+            (default: 0.001).
+
+    Examples:
+        >>> seen = BloomFilter(1000, 0.01)
+        >>> seen.num_bits, seen.num_hashes
+        (9585, 7)
+        >>> [seen.add(value) for value in ['a', 'b', 'a']]
+        [False, False, True]
+    """
+    def __init__(self, capacity, error_rate=0.001):
+        bits = -capacity * log(error_rate) / log(2) ** 2
+        self.num_bits = max(int(bits), 8)
+        self.num_hashes = max(int(round(log(2) * bits / capacity)), 1)
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def add(self, value):
+        """Adds a value
+
+        Args:
+            value (obj): The value (its `repr` is hashed)
+
+        Returns:
+            bool: Whether the value was (probably) already present
+        """
+        digest = md5(repr(value).encode('utf-8')).digest()
+        h1, h2 = unpack(str('<QQ'), digest)
+        present = True
+
+        # double hashing, i.e., position i is `h1 + i * h2`
+        for i in range(self.num_hashes):
+            byte, bit = divmod((h1 + i * h2) % self.num_bits, 8)
+            mask = 1 << bit
+
+            if not self.bits[byte] & mask:
+                present = False
+                self.bits[byte] |= mask
+
+        return present
+
+
+def get_keyfunc(keys):
+    """Creates a function that gets the value(s) an item should be unique by
+
+    Args:
+        keys (List[str]): The item attributes
+
+    Returns:
+        func: The key function
+
+    Examples:
+        >>> get_keyfunc(['a'])({'a': 1, 'b': 2})
+        1
+        >>> get_keyfunc(['a', 'b'])({'a': 1, 'b': [2]})
+        (1, '[2]')
+    """
+    def get_value(item, key):
+        value = item.get(key)
+
+        try:
+            hash(value)
+        except TypeError:
+            value = repr(value)
+
+        return value
+
+    if len(keys) == 1:
+        keyfunc = lambda item: get_value(item, keys[0])
+    else:
+        keyfunc = lambda item: tuple(get_value(item, key) for key in keys)
+
+    return keyfunc
+
+
+def get_seen(objconf):
+    """Creates the set that tracks the values seen so far
+
+    Args:
+        objconf (obj): The pipe configuration (an Objectify instance)
+
+    Returns:
+        obj: An object whose `add` method returns whether a value was present
+
+    Examples:
+        >>> from meza.fntools import Objectify
+        >>>
+        >>> isinstance(get_seen(Objectify({'mode': 'exact'})), ExactSet)
+        True
+        >>> get_seen(Objectify({'mode': 'lru', 'limit': 0})).limit
+        0
+    """
+    mode = objconf.mode or 'lru'
+    get = lambda key: getattr(objconf, key)
+    option = lambda key: DEFAULTS[key] if get(key) is None else get(key)
+
+    if mode == 'lru':
+        seen = LRUSet(int(option('limit')))
+    elif mode == 'exact':
+        seen = ExactSet()
+    elif mode == 'bloom':
+        capacity = int(option('capacity'))
+        seen = BloomFilter(capacity, float(option('error_rate')))
+    else:
+        msg = "Invalid mode: %s. (Expected 'lru', 'exact', or 'bloom')"
+        raise ValueError(msg % mode)
+
+    return seen
+
+
 def parser(stream, objconf, tuples, **kwargs):
     """ Parses the pipe content
 
@@ -70,14 +238,11 @@ def parser(stream, objconf, tuples, **kwargs):
         ...     {'x': 0, 'mod': 0}, {'x': 1, 'mod': 1}]
         True
     """
-    key, limit = objconf.uniq_key, int(objconf.limit)
-    seen = deque(maxlen=limit)
+    keyfunc = get_keyfunc(listize(objconf.uniq_key))
+    seen = get_seen(objconf)
 
     for item in stream:
-        value = item.get(key)
-
-        if value not in seen:
-            seen.append(value)
+        if not seen.add(keyfunc(item)):
             yield item
 
 
@@ -91,13 +256,25 @@ def async_pipe(*args, **kwargs):
         kwargs (dict): The keyword arguments passed to the wrapper
 
     Kwargs:
-        conf (dict): The pipe configuration. May contain the keys 'uniq_key' or
-            'limit'.
+        conf (dict): The pipe configuration. May contain the keys 'uniq_key',
+            'mode', 'limit', 'capacity', or 'error_rate'.
 
-            uniq_key (str): Item attribute which should be unique (default:
-                'content').
-            limit (int): Maximum number of unique items to track (default:
-                1024)
+            uniq_key (str): Item attribute (or list of attributes) which
+                should be unique (default: 'content').
+
+            mode (str): How to track the values seen so far. Must be one of
+                'lru' (the `limit` most recently seen values), 'exact' (all
+                values), or 'bloom' (a fixed size bloom filter that may drop
+                a small fraction of unique items) (default: 'lru').
+
+            limit (int): Maximum number of unique values to track in 'lru'
+                mode (default: 1024)
+
+            capacity (int): Expected number of unique values in 'bloom' mode
+                (default: 1000000)
+
+            error_rate (float): The rate of unique items dropped in 'bloom'
+                mode once `capacity` values have been seen (default: 0.001)
 
     Returns:
         Deferred: twisted.internet.defer.Deferred stream
@@ -132,13 +309,25 @@ def pipe(*args, **kwargs):
         kwargs (dict): The keyword arguments passed to the wrapper
 
     Kwargs:
-        conf (dict): The pipe configuration. May contain the keys 'uniq_key' or
-            'limit'.
+        conf (dict): The pipe configuration. May contain the keys 'uniq_key',
+            'mode', 'limit', 'capacity', or 'error_rate'.
+
+            uniq_key (str): Item attribute (or list of attributes) which
+                should be unique (default: 'content').
+
+            mode (str): How to track the values seen so far. Must be one of
+                'lru' (the `limit` most recently seen values), 'exact' (all
+                values), or 'bloom' (a fixed size bloom filter that may drop
+                a small fraction of unique items) (default: 'lru').
+
+            limit (int): Maximum number of unique values to track in 'lru'
+                mode (default: 1024)
+
+            capacity (int): Expected number of unique values in 'bloom' mode
+                (default: 1000000)
 
-            uniq_key (str): Item attribute which should be unique (default:
-                'content').
-            limit (int): Maximum number of unique items to track (default:
-                1024)
+            error_rate (float): The rate of unique items dropped in 'bloom'
+                mode once `capacity` values have been seen (default: 0.001)
 
     Yields:
         dict: an item
@@ -153,5 +342,12 @@ def pipe(*args, **kwargs):
         True
         >>> [item['content'] for item in stream]
         [1, 2, 3, 4]
+        >>> items = [{'a': x % 2, 'b': x % 3} for x in range(7)]
+        >>> conf = {'uniq_key': ['a', 'b'], 'mode': 'exact'}
+        >>> len(list(pipe(items, conf=conf)))
+        6
+        >>> conf = {'uniq_key': 'b', 'mode': 'bloom', 'capacity': 100}
+        >>> [item['b'] for item in pipe(items, conf=conf)]
+        [0, 1, 2]
     """
     return parser(*args, **kwargs)
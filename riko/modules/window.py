@@ -0,0 +1,474 @@
+# -*- coding: utf-8 -*-
+# vim: sw=4:ts=4:expandtab
+"""
+riko.modules.window
+~~~~~~~~~~~~~~~~~~~
+Provides functions for aggregating the items in a stream over windows of
+time, e.g., the number of items published each hour.
+
+Windows are based on the date of each item (its event time), not the time
+it is processed. A window is emitted as soon as the stream has advanced past
+its end, so long-lived streams are rolled up continuously and only the open
+windows are held in memory.
+
+Examples:
+    basic usage::
+
+        >>> from riko.modules.window import pipe
+        >>>
+        >>> items = ({'pubDate': t} for t in [0, 1800, 3600, 9000])
+        >>> windows = pipe(items)
+        >>> window = next(windows)
+        >>> window['start']['utime'], window['end']['utime'], window['count']
+        (0, 3600, 2)
+
+Attributes:
+    OPTS (dict): The default pipe options
+    DEFAULTS (dict): The default parser options
+    WINDOW_TYPES (set): The supported window types
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals)
+
+import itertools as it
+import pygogo as gogo
+
+from heapq import heappush, heappop
+
+from builtins import *  # noqa # pylint: disable=unused-import
+
+from . import operator
+from riko.aggregates import AGGREGATORS, get_group_keys, get_keyfunc
+from riko.cast import cast_date
+
+OPTS = {}
+DEFAULTS = {
+    'date_key': 'pubDate', 'type': 'tumbling', 'size': 3600, 'slide': None,
+    'gap': 1800, 'lateness': 0, 'aggregate': 'count', 'aggregate_key': None,
+    'group_key': None}
+
+WINDOW_TYPES = {'tumbling', 'sliding', 'session'}
+logger = gogo.Gogo(__name__, monolog=True).logger
+
+
+def get_utime(value):
+    """Gets the unix time of a date
+
+    Args:
+        value (obj): A date string, unix time, or parsed date (a dict with
+            the key 'utime')
+
+    Returns:
+        int: The unix time (or None if `value` isn't a date)
+
+    Examples:
+        >>> get_utime('Mon, 02 Jan 2017 10:00:00 GMT')
+        1483351200
+        >>> get_utime(3600)
+        3600
+        >>> get_utime({'utime': 3600})
+        3600
+        >>> get_utime(None) is None
+        True
+    """
+    if hasattr(value, 'real'):
+        utime = value
+    elif hasattr(value, 'keys'):
+        utime = value.get('utime')
+    else:
+        try:
+            utime = cast_date(value).get('utime')
+        except (ValueError, OverflowError):
+            utime = None
+
+    return utime
+
+
+def gen_bounds(utime, size, slide=None):
+    """Generates the (start, end) bounds of the fixed windows a time is in
+
+    Args:
+        utime (int): The unix time
+        size (int): The window length in seconds
+        slide (int): The seconds between window starts (default: None, i.e.,
+            `size`)
+
+    Yields:
+        Tuple[int, int]: The window bounds
+
+    Examples:
+        >>> list(gen_bounds(5400, 3600))
+        [(3600, 7200)]
+        >>> list(gen_bounds(5400, 3600, 1800))
+        [(5400, 9000), (3600, 7200)]
+    """
+    slide = slide or size
+    start = utime - utime % slide
+
+    while start > utime - size:
+        yield start, start + size
+        start -= slide
+
+
+class OpenWindows(object):
+    """The windows that are still accumulating items
+
+    Args:
+        new_accs (func): Creates the accumulators of a new window
+
+    Examples:
+        >>> from riko.aggregates import Count
+        >>>
+        >>> windows = OpenWindows(lambda: [Count()])
+        >>> windows.add({'t': 10}, (), [(0, 60, None)])
+        >>> [(s, e, accs[0].value) for s, e, _, accs in windows.close(60)]
+        [(0, 60, 1)]
+    """
+    def __init__(self, new_accs):
+        self.new_accs = new_accs
+        self.counter = it.count()
+
+        # windows keyed by (start, group) with values of [end, accs], the
+        # starts of each group's windows, and a heap of (end, start, tie
+        # breaker, group) to close them in order
+        self.windows, self.starts, self.heap = {}, {}, []
+
+    def merge_sessions(self, group, utime, gap):
+        """Merges the sessions of a group that a time is in (or bridges)
+
+        Args:
+            group (tuple): The group
+            utime (int): The unix time
+            gap (int): The seconds of inactivity that end a session
+
+        Returns:
+            Tuple[int, int, List[Accumulator]]: The start, end, and
+                accumulators of the (merged) session
+        """
+        start, end, accs = utime, utime + gap, self.new_accs()
+        merged = []
+
+        for other in self.starts.get(group, set()):
+            other_end, other_accs = self.windows[(other, group)]
+
+            if other - gap <= utime < other_end:
+                # the item is in (or bridges) existing sessions
+                start, end = min(start, other), max(end, other_end)
+                merged.append((other, other_accs))
+
+        for other, other_accs in sorted(merged, key=lambda m: m[0]):
+            del self.windows[(other, group)]
+            self.starts[group].remove(other)
+
+            for acc, other_acc in zip(accs, other_accs):
+                acc.merge(other_acc)
+
+        return start, end, accs
+
+    def add(self, item, group, bounds, watermark=None):
+        """Adds an item to its windows, opening any that don't exist yet
+
+        Args:
+            item (dict): The item
+            group (tuple): The item's group
+            bounds (Iter[tuple]): The (start, end, accs) of the item's
+                windows. If `accs` is None, new accumulators are created.
+
+            watermark (int): The unix time before which windows have
+                already been closed (default: None)
+        """
+        for start, end, accs in bounds:
+            if watermark is not None and end <= watermark:
+                # the window was already emitted
+                continue
+
+            window = self.windows.get((start, group))
+
+            if window:
+                accs = window[1]
+            else:
+                accs = accs or self.new_accs()
+                self.windows[(start, group)] = [end, accs]
+                self.starts.setdefault(group, set()).add(start)
+                heappush(self.heap, (end, start, next(self.counter), group))
+
+            for acc in accs:
+                acc.add(item)
+
+    def close(self, watermark=None):
+        """Closes the windows that end by a watermark
+
+        Args:
+            watermark (int): The unix time (default: None, i.e., close all
+                windows)
+
+        Yields:
+            Tuple[int, int, tuple, List[Accumulator]]: The start, end,
+                group, and accumulators of each closed window
+        """
+        heap = self.heap
+
+        while heap and (watermark is None or heap[0][0] <= watermark):
+            end, start, _, group = heappop(heap)
+            window = self.windows.get((start, group))
+
+            # sessions that were extended or merged leave stale entries
+            if window and window[0] == end:
+                del self.windows[(start, group)]
+                self.starts[group].discard(start)
+
+                if not self.starts[group]:
+                    del self.starts[group]
+
+                yield start, end, group, window[1]
+
+
+def gen_windows(stream, date_key, keys, specs, **kwargs):
+    """Aggregates a stream over windows of event time
+
+    Args:
+        stream (Iter[dict]): The source
+        date_key (str): The item attribute holding the date
+        keys (List[str]): The item attributes to group by
+        specs (List[tuple]): The aggregates to compute (see
+            `riko.aggregates.accumulate`)
+
+        kwargs (dict): Keyword arguments
+
+    Kwargs:
+        type (str): The window type. One of 'tumbling', 'sliding', or
+            'session' (default: 'tumbling').
+
+        size (int): The (tumbling or sliding) window length in seconds
+            (default: 3600)
+
+        slide (int): The seconds between sliding window starts (default:
+            None, i.e., `size`)
+
+        gap (int): The seconds of inactivity that end a session (default:
+            1800)
+
+        lateness (int): The seconds an item may lag behind the latest item
+            and still be counted (default: 0)
+
+    Yields:
+        Tuple[int, int, tuple, List[Accumulator]]: The start, end, group,
+            and accumulators of each window as soon as it closes
+
+    Examples:
+        >>> stream = ({'t': t} for t in [0, 10, 100, 15])
+        >>> windows = gen_windows(stream, 't', [], [('count', None)], size=60)
+        >>> [(s, e, accs[0].value) for s, e, _, accs in windows]
+        [(0, 60, 2), (60, 120, 1)]
+        >>> stream = ({'t': t} for t in [0, 10, 100, 15])
+        >>> windows = gen_windows(
+        ...     stream, 't', [], [('count', None)], size=60, lateness=90)
+        >>> [(s, e, accs[0].value) for s, e, _, accs in windows]
+        [(0, 60, 3), (60, 120, 1)]
+        >>> stream = ({'t': t} for t in [0, 10, 100, 15])
+        >>> kwargs = {'type': 'session', 'gap': 60, 'lateness': 90}
+        >>> windows = gen_windows(stream, 't', [], [('count', None)], **kwargs)
+        >>> [(s, e, accs[0].value) for s, e, _, accs in windows]
+        [(0, 75, 3), (100, 160, 1)]
+    """
+    _type = kwargs.get('type', 'tumbling')
+    size, slide = kwargs.get('size', 3600), kwargs.get('slide')
+    gap, lateness = kwargs.get('gap', 1800), kwargs.get('lateness', 0)
+    new_accs = lambda: [AGGREGATORS[spec[0]](*spec[1:]) for spec in specs]
+    keyfunc = get_keyfunc(keys)
+    windows = OpenWindows(new_accs)
+    watermark = None
+
+    for item in stream:
+        utime = get_utime(item.get(date_key))
+
+        if utime is None:
+            continue
+
+        group = keyfunc(item)
+
+        if _type == 'session':
+            bounds = [windows.merge_sessions(group, utime, gap)]
+        else:
+            bounds = (
+                (s, e, None) for s, e in gen_bounds(utime, size, slide))
+
+        windows.add(item, group, bounds, watermark)
+
+        if watermark is None or utime - lateness > watermark:
+            watermark = utime - lateness
+
+        for window in windows.close(watermark):
+            yield window
+
+    for window in windows.close():
+        yield window
+
+
+def parser(stream, objconf, tuples, **kwargs):
+    """ Parses the pipe content
+
+    Args:
+        stream (Iter[dict]): The source. Note: this shares the `tuples`
+            iterator, so consuming it will consume `tuples` as well.
+
+        objconf (obj): The pipe configuration (an Objectify instance)
+
+        tuples (Iter[(dict, obj)]): Iterable of tuples of (item, objconf)
+            `item` is an element in the source stream and `objconf` is the item
+            configuration (an Objectify instance). Note: this shares the
+            `stream` iterator, so consuming it will consume `stream` as well.
+
+        kwargs (dict): Keyword arguments.
+
+    Kwargs:
+        conf (dict): The pipe configuration.
+
+    Yields:
+        dict: a window
+
+    Examples:
+        >>> from decimal import Decimal
+        >>> from itertools import repeat
+        >>> from meza.fntools import Objectify
+        >>>
+        >>> conf = {
+        ...     'date_key': 'date', 'type': 'sliding', 'size': 60,
+        ...     'slide': 30, 'lateness': 0, 'aggregate': 'sum',
+        ...     'aggregate_key': 'x', 'group_key': None}
+        >>> objconf = Objectify(conf)
+        >>> stream = [{'date': 0, 'x': 1}, {'date': 40, 'x': 2}]
+        >>> tuples = zip(stream, repeat(objconf))
+        >>> windows = parser(stream, objconf, tuples)
+        >>> [(w['start']['utime'], w['sum']) for w in windows] == [
+        ...     (-30, Decimal('1')), (0, Decimal('3')), (30, Decimal('2'))]
+        True
+    """
+    _type = objconf.type or 'tumbling'
+
+    if _type not in WINDOW_TYPES:
+        msg = 'Invalid window type: %s. (Expected one of %s)'
+        raise ValueError(msg % (_type, ', '.join(sorted(WINDOW_TYPES))))
+
+    keys = get_group_keys(objconf.group_key)
+    specs = [(objconf.aggregate, objconf.aggregate_key)]
+    options = {
+        'type': _type, 'size': int(objconf.size or 3600),
+        'slide': int(objconf.slide or 0), 'gap': int(objconf.gap or 1800),
+        'lateness': int(objconf.lateness or 0)}
+
+    windows = gen_windows(stream, objconf.date_key, keys, specs, **options)
+
+    for start, end, group, accs in windows:
+        window = dict(zip(keys, group))
+        window.update({'start': cast_date(start), 'end': cast_date(end)})
+        window[objconf.aggregate] = accs[0].value
+        yield window
+
+
+@operator(DEFAULTS, isasync=True, **OPTS)
+def async_pipe(*args, **kwargs):
+    """An operator that asynchronously aggregates the items in a stream over
+    windows of time.
+
+    Args:
+        items (Iter[dict]): The source.
+        kwargs (dict): The keyword arguments passed to the wrapper
+
+    Kwargs:
+        conf (dict): The pipe configuration. See `pipe` for the keys it may
+            contain.
+
+    Returns:
+        Deferred: twisted.internet.defer.Deferred iterator of windows
+
+    Examples:
+        >>> from riko.bado import react
+        >>> from riko.bado.mock import FakeReactor
+        >>>
+        >>> def run(reactor):
+        ...     callback = lambda x: print(next(x)['count'])
+        ...     items = ({'pubDate': t} for t in [0, 1800, 3600, 9000])
+        ...     d = async_pipe(items)
+        ...     return d.addCallbacks(callback, logger.error)
+        >>>
+        >>> try:
+        ...     react(run, _reactor=FakeReactor())
+        ... except SystemExit:
+        ...     pass
+        ...
+        2
+    """
+    return parser(*args, **kwargs)
+
+
+@operator(DEFAULTS, **OPTS)
+def pipe(*args, **kwargs):
+    """An operator that aggregates the items in a stream over windows of time
+    (based on a date field of each item). Windows are emitted in order of
+    their end as soon as the stream advances past it. Items without a
+    (parseable) date are skipped.
+
+    Args:
+        items (Iter[dict]): The source.
+        kwargs (dict): The keyword arguments passed to the wrapper
+
+    Kwargs:
+        conf (dict): The pipe configuration. May contain the keys 'date_key',
+            'type', 'size', 'slide', 'gap', 'lateness', 'aggregate',
+            'aggregate_key', or 'group_key'.
+
+            date_key (str): Item attribute holding the date, e.g., a date
+                string, unix time, or parsed date (default: 'pubDate').
+
+            type (str): The window type. Must be one of 'tumbling' (fixed
+                windows of `size`), 'sliding' (overlapping windows of `size`
+                starting every `slide`), or 'session' (windows of activity
+                separated by at least `gap`) (default: 'tumbling').
+
+            size (int): The tumbling or sliding window length in seconds
+                (default: 3600).
+
+            slide (int): The seconds between sliding window starts (default:
+                None, i.e., `size`).
+
+            gap (int): The seconds of inactivity that end a session (default:
+                1800).
+
+            lateness (int): The seconds an (out of order) item may lag behind
+                the latest item and still be counted. Windows are emitted
+                once the latest item is `lateness` past their end, and items
+                of emitted windows are dropped (default: 0).
+
+            aggregate (str): The aggregate to compute, e.g., 'count', 'sum',
+                'mean', 'min', 'max', 'first', 'last', or 'distinct'
+                (default: 'count').
+
+            aggregate_key (str): Item attribute to aggregate (default: None).
+
+            group_key (str): Item attribute (or list of attributes) to group
+                by. Each group has its own windows (default: None).
+
+    Yields:
+        dict: a window with the keys 'start' and 'end' (parsed dates), the
+            name of the aggregate, and the `group_key` attributes
+
+    Examples:
+        >>> items = [
+        ...     {'pubDate': 'Mon, 02 Jan 2017 10:05:00 GMT', 'author': 'ann'},
+        ...     {'pubDate': 'Mon, 02 Jan 2017 10:35:00 GMT', 'author': 'bob'},
+        ...     {'pubDate': 'Mon, 02 Jan 2017 10:10:00 GMT', 'author': 'ann'},
+        ...     {'pubDate': 'Mon, 02 Jan 2017 11:15:00 GMT', 'author': 'ann'}]
+        >>> conf = {'aggregate': 'distinct', 'aggregate_key': 'author'}
+        >>> window = next(pipe(items, conf=conf))
+        >>> window['start']['hour'], window['end']['hour'], window['distinct']
+        (10, 11, 2)
+        >>> conf = {
+        ...     'type': 'session', 'gap': 900, 'lateness': 1800,
+        ...     'group_key': 'author'}
+        >>> windows = pipe(items, conf=conf)
+        >>> [(w['author'], w['count']) for w in windows] == [
+        ...     ('ann', 2), ('bob', 1), ('ann', 1)]
+        True
+    """
+    return parser(*args, **kwargs)
@@ -43,20 +43,24 @@ Attributes:
 from __future__ import (
     absolute_import, division, print_function, unicode_literals)
 
+import re
 import traceback
 import pygogo as gogo
 
+from io import BytesIO
 from os.path import splitext
 
 from builtins import *  # noqa # pylint: disable=unused-import
 
 from . import processor
-from riko.utils import fetch, get_abspath
-from riko.parsers import xml2etree, etree2dict, xpath
+from riko.utils import fetch, auto_close, get_abspath, get_projection, project
+from riko.parsers import xml2etree, etree2dict, xpath, iterparse_records
 from riko.bado import coroutine, return_value, util, io
 from meza.compat import encode
 
 OPTS = {'ftype': 'none'}
+TAG = r'(?:[\w:-][\w.:-]*|\*)'
+PLAIN_PATH = re.compile(r'^/?%s(?:/%s)*$' % (TAG, TAG))
 logger = gogo.Gogo(__name__, monolog=True).logger
 
 
@@ -64,6 +68,24 @@ logger = gogo.Gogo(__name__, monolog=True).logger
 # TODO: remove the closing tag if using an HTML tag stripped of HTML tags
 # TODO: clean html with Tidy
 
+def is_plain(path):
+    """Determines whether an xpath is a plain '/' separated path of tag
+    names, i.e., one the streaming parser can match
+
+    Args:
+        path (str): The xpath
+
+    Returns:
+        bool: True if the path is plain
+
+    Examples:
+        >>> is_plain('/rss/channel/item'), is_plain('results/*')
+        (True, True)
+        >>> is_plain('//item'), is_plain('/rss/channel/item[@id="x"]')
+        (False, False)
+    """
+    return not path or bool(PLAIN_PATH.match(path))
+
 
 @coroutine
 def async_parser(_, objconf, skip=False, **kwargs):
@@ -78,6 +100,7 @@ def async_parser(_, objconf, skip=False, **kwargs):
     Kwargs:
         assign (str): Attribute to assign parsed content (default: content)
         stream (dict): The original item
+        fields (Iter[str]): Only include these fields in each item
 
     Returns:
         Iter[dict]: The stream of items
@@ -117,6 +140,22 @@ def async_parser(_, objconf, skip=False, **kwargs):
         ...
         Running “Native” Data Wrangling Applications
         Help Page -- ScienceDaily
+        >>> @coroutine
+        ... def compare(reactor):
+        ...     path = '//item[position() > 8]/title'
+        ...     objconf = Objectify({'url': xml_url, 'xpath': path})
+        ...     stream = yield async_parser(None, objconf, stream={})
+        ...     items = list(stream)
+        ...     print(len(items), items == list(parser(None, objconf)))
+        >>>
+        >>> xml_url = get_path('ouseful.xml')
+        >>>
+        >>> try:
+        ...     react(compare, _reactor=FakeReactor())
+        ... except SystemExit:
+        ...     pass
+        ...
+        2 True
     """
     if skip:
         stream = kwargs['stream']
@@ -124,19 +163,29 @@ def async_parser(_, objconf, skip=False, **kwargs):
         url = get_abspath(objconf.url)
         ext = splitext(url)[1].lstrip('.')
         xml = (ext == 'xml') or objconf.strict
+        path = objconf.xpath or ''
 
         try:
-            f = yield io.async_url_open(url)
-            tree = yield util.xml2etree(f, xml=xml)
+            if is_plain(path):
+                # elements are converted as soon as their end tag arrives, so
+                # the entire page is never held in memory as a DOM
+                items = yield util.async_parse_elements(url, path, xml=xml)
+            else:
+                # other xpaths (e.g., with predicates) need the entire DOM
+                content = yield io.async_url_read(url)
+                f = BytesIO(content)
+                root = xml2etree(f, xml=xml, html5=objconf.html5).getroot()
+                items = map(etree2dict, xpath(root, path))
         except Exception as e:
             logger.error(e)
             logger.error(traceback.format_exc())
+            raise
 
-        elements = xpath(tree, objconf.xpath)
-        f.close()
-        items = map(util.etree2dict, elements)
-        stringified = ({kwargs['assign']: encode(i)} for i in items)
-        stream = stringified if objconf.stringify else items
+        if objconf.stringify:
+            stream = ({kwargs['assign']: encode(i)} for i in items)
+        else:
+            keys = get_projection(kwargs.get('fields'))
+            stream = (project(i, keys) for i in items)
 
     return_value(stream)
 
@@ -148,6 +197,12 @@ def parser(_, objconf, skip=False, **kwargs):
         _ (None): Ignored
         objconf (obj): The pipe configuration (an Objectify instance)
         skip (bool): Don't parse the content
+        kwargs (dict): Keyword arguments
+
+    Kwargs:
+        assign (str): Attribute to assign parsed content (default: content)
+        stream (dict): The original item
+        fields (Iter[str]): Only include (and parse) these fields in each item
 
     Returns:
         Iter[dict]: The stream of items
@@ -169,12 +224,20 @@ def parser(_, objconf, skip=False, **kwargs):
         url = get_abspath(objconf.url)
         ext = splitext(url)[1].lstrip('.')
         xml = (ext == 'xml') or objconf.strict
+        fields = None if objconf.stringify else kwargs.get('fields')
 
-        with fetch(**objconf) as f:
-            root = xml2etree(f, xml=xml, html5=objconf.html5).getroot()
-            elements = xpath(root, objconf.xpath)
+        if objconf.iterparse:
+            # each element is yielded as soon as its end tag is parsed
+            f = fetch(**objconf)
+            records = iterparse_records(f, objconf.xpath, xml, fields)
+            items = auto_close(records, f)
+        else:
+            with fetch(**objconf) as f:
+                root = xml2etree(f, xml=xml, html5=objconf.html5).getroot()
+                elements = xpath(root, objconf.xpath)
+
+            items = (etree2dict(element, fields) for element in elements)
 
-        items = map(etree2dict, elements)
         stringified = ({kwargs['assign']: str(i)} for i in items)
         stream = stringified if objconf.stringify else items
 
@@ -192,7 +255,7 @@ def async_pipe(*args, **kwargs):
 
     Kwargs:
         conf (dict): The pipe configuration. Must contain the key 'url'. May
-            contain the keys 'xpath', 'html5', or 'stringify'.
+            contain the keys 'xpath', 'html5', 'stringify', or 'iterparse'.
 
             url (str): The web site to fetch
             xpath (str): The XPATH to extract (default: None, i.e., return
@@ -201,8 +264,15 @@ def async_pipe(*args, **kwargs):
             strict (bool): Use the strict XML parser (default: False)
             html5 (bool): Use the HTML5 parser (default: False)
             stringify (bool): Return the web site as a string (default: False)
+            iterparse (bool): Incrementally parse the page, emitting each
+                element as soon as its end tag is parsed. Memory use stays
+                constant regardless of the page size, but `xpath` must be a
+                plain '/' separated path of tag names (default: False).
 
         assign (str): Attribute to assign parsed content (default: content)
+        fields (Iter[str]): Only include (and parse) these fields of each item
+            (default: None, i.e., include all fields). `SyncPipe` sets this
+            automatically when the stages that follow only read some fields.
 
     Returns:
         dict: twisted.internet.defer.Deferred item
@@ -251,7 +321,7 @@ def pipe(*args, **kwargs):
 
     Kwargs:
         conf (dict): The pipe configuration. Must contain the key 'url'. May
-            contain the keys 'xpath', 'html5', or 'stringify'.
+            contain the keys 'xpath', 'html5', 'stringify', or 'iterparse'.
 
             url (str): The web site to fetch
             xpath (str): The XPATH to extract (default: None, i.e., return
@@ -260,8 +330,15 @@ def pipe(*args, **kwargs):
             strict (bool): Use the strict XML parser (default: False)
             html5 (bool): Use the HTML5 parser (default: False)
             stringify (bool): Return the web site as a string (default: False)
+            iterparse (bool): Incrementally parse the page, emitting each
+                element as soon as its end tag is parsed. Memory use stays
+                constant regardless of the page size, but `xpath` must be a
+                plain '/' separated path of tag names (default: False).
 
         assign (str): Attribute to assign parsed content (default: content)
+        fields (Iter[str]): Only include (and parse) these fields of each item
+            (default: None, i.e., include all fields). `SyncPipe` sets this
+            automatically when the stages that follow only read some fields.
 
     Yields:
         dict: item
@@ -277,5 +354,11 @@ def pipe(*args, **kwargs):
         >>> conf = {'url': url, 'xpath': '/html/head/title'}
         >>> next(pipe(conf=conf)) == 'Help Page -- ScienceDaily'
         True
+        >>> url = get_path('ouseful.xml')
+        >>> conf = {'url': url, 'xpath': '/rss/channel/item', 'iterparse': True}
+        >>> len(list(pipe(conf=conf)))
+        10
+        >>> sorted(next(pipe(conf=conf, fields=['title', 'link'])))
+        ['link', 'title']
     """
     return parser(*args, **kwargs)
@@ -116,12 +116,10 @@ def async_parser(_, objconf, skip=False, **kwargs):
 
         if not f:
             params = {'q': objconf.query, 'diagnostics': objconf.debug}
-            r = yield treq.get(objconf.url, params=params)
-            f = yield treq.content(r)
+            f = yield treq.get(objconf.url, params=params)
 
-        tree = yield util.xml2etree(f)
-        results = next(tree.getElementsByTagName('results'))
-        stream = map(util.etree2dict, results.childNodes)
+        # each result is converted as soon as its end tag arrives
+        stream = yield util.async_parse_elements(f, 'results/*')
 
     return_value(stream)
 
@@ -10,7 +10,8 @@ from __future__ import (
 
 import re
 
-from io import StringIO
+from io import BytesIO, StringIO
+from itertools import chain
 from html.entities import name2codepoint
 from html.parser import HTMLParser
 
@@ -22,11 +23,12 @@ except ImportError:
 import pygogo as gogo
 
 from builtins import *  # noqa # pylint: disable=unused-import
-from riko.utils import fetch
+from riko import feeds
+from riko.utils import fetch, get_projection, project
 from meza.fntools import Objectify, remove_keys, listize
 from meza.process import merge
 from meza.compat import decode
-from ijson import items
+from ijson.common import items as event_items
 
 logger = gogo.Gogo(__name__, verbose=False, monolog=True).logger
 
@@ -49,16 +51,28 @@ else:
     logger.debug('xml parser: lxml')
     from lxml.html import html5parser
 
+
+# prefer the C extensions since the pure python backend is an order of
+# magnitude slower
 try:
-    import speedparser
+    import ijson.backends.yajl2_c as ijson
 except ImportError:
-    import feedparser
-    logger.debug('rss parser: feedparser')
-    speedparser = None
+    try:
+        import ijson.backends.yajl2_cffi as ijson
+    except ImportError:
+        import ijson
+        logger.debug('json parser: ijson')
+    else:
+        logger.debug('json parser: yajl2_cffi')
 else:
-    logger.debug('rss parser: speedparser')
+    logger.debug('json parser: yajl2_c')
 
-rssparser = speedparser or feedparser
+items = ijson.items
+
+if html5parser:
+    TEXT_NODES = etree.XPath('//text()', smart_strings=False)
+else:
+    TEXT_NODES = None
 
 
 NAMESPACES = {
@@ -83,7 +97,8 @@ class LinkParser(HTMLParser):
         self.data.write('%s\n' % decode(data))
 
 
-def get_text(html, convert_charrefs=False):
+def parse_text(html, convert_charrefs=False):
+    # the pure python fallback for `get_text`
     try:
         parser = LinkParser(convert_charrefs=convert_charrefs)
     except TypeError:
@@ -97,16 +112,51 @@ def get_text(html, convert_charrefs=False):
     return parser.data.getvalue()
 
 
+def get_text(content, convert_charrefs=False):
+    """Remove the html tags from a string, putting each run of text on its
+    own line. Uses lxml's (C based) html parser when available, in which case
+    entity and character references are always converted.
+
+    Args:
+        content (str): The html (bytes are decoded as utf-8)
+        convert_charrefs (bool): Convert entity and character references when
+            using the fallback parser (default: False)
+
+    Returns:
+        str: The text
+
+    Examples:
+        >>> get_text('<p>Hello</p><!-- hi --><p>World</p>').split('\\n')
+        ['Hello', 'World', '']
+        >>> get_text(b'') == ''
+        True
+    """
+    text = None
+
+    if TEXT_NODES:
+        try:
+            tree = html.fromstring(decode(content))
+        except (etree.LxmlError, ValueError):
+            # e.g., only whitespace
+            pass
+        else:
+            text = ''.join('%s\n' % t for t in TEXT_NODES(tree))
+
+    if text is None:
+        text = parse_text(content, convert_charrefs)
+
+    return text
+
+
 def parse_rss(url=None, **kwargs):
     try:
         f = fetch(decode(url), **kwargs)
     except (ValueError, URLError):
-        parsed = rssparser.parse(url)
+        # let feedparser try (and report its own errors)
+        parsed = feeds.feedparse(url)
     else:
-        content = f.read() if speedparser else f
-
         try:
-            parsed = rssparser.parse(content)
+            parsed = feeds.parse(f.read())
         finally:
             f.close()
 
@@ -159,36 +209,31 @@ def xml2etree(f, xml=True, html5=False):
     return element_tree
 
 
-def _make_content(i, value=None, tag='content', append=True, strip=False):
+def _add_content(i, tag, value, join=False):
+    """Add a value to a dict, collecting the values of repeated tags into a
+    list (or concatenating them if they are all strings and `join` is True).
+    """
     content = i.get(tag)
 
-    try:
-        value = value.strip() if value and strip else value
-    except AttributeError:
+    if not value:
         pass
-
-    if content and value and append:
-        content = listize(content)
+    elif not content:
+        i[tag] = value
+    elif join and isinstance(content, str) and isinstance(value, str):
+        i[tag] = content + value
+    elif isinstance(content, list):
         content.append(value)
-    elif content and value:
-        content = ''.join([content, value])
-    elif value:
-        content = value
-
-    return {tag: content} if content else {}
+    else:
+        i[tag] = [content, value]
 
 
-def etree2dict(element):
-    """Convert an element tree into a dict imitating how Yahoo Pipes does it.
-    """
-    i = dict(element.items())
-    i.update(_make_content(i, element.text, strip=True))
+def _new_content(element, attrs):
+    text = element.text
+    _add_content(attrs, 'content', text.strip() if text else text)
+    return attrs
 
-    for child in element:
-        tag = child.tag
-        value = etree2dict(child)
-        i.update(_make_content(i, value, tag))
 
+def _finish_content(element, i):
     if element.text and not set(i).difference(['content']):
         # element is leaf node and doesn't have attributes
         i = i.get('content')
@@ -196,7 +241,398 @@ def etree2dict(element):
     return i
 
 
-def any2dict(f, ext='xml', html5=False, path=None):
+def _lxml_etree2dict(element):
+    # lxml walks the tree in C, so we only need to track the open elements
+    stack = []
+
+    for event, el in etree.iterwalk(element, events=('start', 'end')):
+        if event == 'start':
+            stack.append(_new_content(el, dict(el.attrib)))
+        else:
+            value = _finish_content(el, stack.pop())
+
+            if stack:
+                _add_content(stack[-1], el.tag, value)
+
+    return value
+
+
+def _project_element(element, keys):
+    # only convert the children that are needed
+    i = _new_content(element, dict(element.items()))
+
+    for child in element:
+        if child.tag in keys:
+            _add_content(i, child.tag, etree2dict(child))
+
+    return project(i if len(element) else _finish_content(element, i), keys)
+
+
+def etree2dict(element, fields=None):
+    """Convert an element tree into a dict imitating how Yahoo Pipes does it.
+    The tree is walked iteratively, so deeply nested documents can't exceed
+    the recursion limit.
+
+    Args:
+        element (obj): The root element
+        fields (Iter[str]): Only include (and convert) these fields (default:
+            None, i.e., include all fields)
+
+    Examples:
+        >>> xml = '<a id="1"> x <b>y</b><b>z</b><c><d>w</d></c></a>'
+        >>> etree2dict(etree.fromstring(xml)) == {
+        ...     'id': '1', 'content': 'x', 'b': ['y', 'z'], 'c': {'d': 'w'}}
+        True
+        >>> root = element = etree.Element('a')
+        >>> for _ in range(5000):
+        ...     element = etree.SubElement(element, 'a')
+        >>> element.text = 'x'
+        >>> content = etree2dict(root)
+        >>> for _ in range(5000):
+        ...     content = content['a']
+        >>> content
+        'x'
+        >>> etree2dict(etree.fromstring(xml), ['c.d', 'id']) == {
+        ...     'id': '1', 'c': {'d': 'w'}}
+        True
+    """
+    if fields is not None:
+        return _project_element(element, get_projection(fields))
+
+    if hasattr(etree, 'iterwalk') and isinstance(element, etree._Element):
+        return _lxml_etree2dict(element)
+
+    content = _new_content(element, dict(element.items()))
+    stack = [(element, content, iter(element))]
+
+    while stack:
+        child = next(stack[-1][2], None)
+
+        if child is None:
+            el, i, _ = stack.pop()
+            value = _finish_content(el, i)
+
+            if stack:
+                _add_content(stack[-1][1], el.tag, value)
+        else:
+            content = _new_content(child, dict(child.items()))
+            stack.append((child, content, iter(child)))
+
+    return value
+
+
+def _local_name(tag):
+    return tag.split('}')[-1] if isinstance(tag, str) else None
+
+
+class RecordParser(object):
+    """Converts each record element of an XML/HTML document into a dict as
+    soon as its end tag is parsed. Records (and anything which can't be part
+    of a record) are removed from the tree once they've been seen, so memory
+    use doesn't grow with the size of the document. The document can either
+    be parsed from a file (`iterparse`) or fed to the parser chunk by chunk
+    (`feed` and `close`).
+
+    Args:
+        path (str): '/' or '.' separated tag names of the repeating record
+            element. Paths starting with '/' include the root element,
+            otherwise the path is relative to the root. '*' matches any tag
+            (default: None, i.e., the root element).
+
+        xml (bool): Use the XML parser (default: True)
+        fields (Iter[str]): Only include (and convert) these fields of each
+            record (default: None, i.e., include all fields)
+
+    Examples:
+        >>> parser = RecordParser('b')
+        >>> parser.feed(b'<a><b>x</b><b>y')
+        ['x']
+        >>> parser.feed(b'</b><c>z</c></a>')
+        ['y']
+        >>> parser.close()
+        []
+    """
+    def __init__(self, path=None, xml=True, fields=None):
+        self.path = '/'.join((path or '').split('.'))
+        stripped = self.path.strip('/')
+        tags = stripped.split('/') if stripped else []
+        self.tags = tags if self.path.startswith('/') and tags else ['*'] + tags
+        self.xml = xml
+        self.fields = fields
+        self.ancestry, self.stack, self.depth = [], [], 0
+        self.pull = None
+        self.chunks = []
+
+    def matches(self):
+        pairs = zip(self.tags, self.ancestry)
+        same = all(t in {'*', a} for t, a in pairs)
+        return len(self.ancestry) == len(self.tags) and same
+
+    def convert(self, events):
+        """Converts the records whose end tags are in an iterable of
+        ('start', element) and ('end', element) events
+
+        Args:
+            events (Iter[tuple]): The parser events
+
+        Yields:
+            dict: record
+        """
+        for event, element in events:
+            if event == 'start':
+                self.ancestry.append(_local_name(element.tag))
+                self.stack.append(element)
+                matched = self.matches()
+                self.depth += 1 if matched or self.depth else 0
+                continue
+
+            if self.matches():
+                yield etree2dict(element, self.fields)
+
+            if self.depth:
+                self.depth -= 1
+
+            self.ancestry.pop()
+            self.stack.pop()
+
+            # nothing is needed from elements outside of a record once
+            # they've ended, i.e., keep only the open elements on the stack
+            if self.stack and not self.depth:
+                element.clear()
+                self.stack[-1].remove(element)
+
+    def search(self, f):
+        root = xml2etree(f, xml=self.xml).getroot()
+        return (etree2dict(e, self.fields) for e in xpath(root, self.path))
+
+    def iterparse(self, f):
+        """Parses a file like object
+
+        Args:
+            f (obj): A file like object
+
+        Yields:
+            dict: record
+        """
+        events = ('start', 'end')
+
+        if self.xml:
+            records = self.convert(etree.iterparse(f, events=events))
+        elif html5parser:
+            context = etree.iterparse(f, events=events, html=True)
+            records = self.convert(context)
+        else:
+            # the ElementTree html parser can't work incrementally
+            records = self.search(f)
+
+        for record in records:
+            yield record
+
+    def feed(self, chunk):
+        """Parses the next chunk of the document
+
+        Args:
+            chunk (bytes): The chunk
+
+        Returns:
+            List[dict]: The records completed by the chunk
+        """
+        if self.pull is None and self.xml:
+            self.pull = etree.XMLPullParser(events=('start', 'end'))
+        elif self.pull is None and html5parser:
+            self.pull = etree.HTMLPullParser(events=('start', 'end'))
+
+        if self.pull is None:
+            # the ElementTree html parser can't work incrementally
+            self.chunks.append(chunk)
+            records = []
+        else:
+            self.pull.feed(chunk)
+            records = list(self.convert(self.pull.read_events()))
+
+        return records
+
+    def close(self):
+        """Finishes parsing the document
+
+        Returns:
+            List[dict]: The remaining records
+        """
+        if self.pull is None:
+            records = list(self.search(BytesIO(b''.join(self.chunks))))
+        else:
+            self.pull.close()
+            records = list(self.convert(self.pull.read_events()))
+
+        return records
+
+
+def iterparse_records(f, path=None, xml=True, fields=None):
+    """Incrementally parse an XML/HTML file, converting each record element
+    into a dict as soon as its end tag is parsed. Records (and anything which
+    can't be part of a record) are removed from the tree once they've been
+    seen, so memory use doesn't grow with the size of the file.
+
+    Args:
+        f (obj): A file like object
+        path (str): '/' or '.' separated tag names of the repeating record
+            element. Paths starting with '/' include the root element,
+            otherwise the path is relative to the root. '*' matches any tag
+            (default: None, i.e., the root element).
+
+        xml (bool): Use the XML parser (default: True)
+        fields (Iter[str]): Only include (and convert) these fields of each
+            record (default: None, i.e., include all fields)
+
+    Yields:
+        dict: record
+
+    Examples:
+        >>> from riko import get_path
+        >>>
+        >>> with fetch(get_path('schools.xml')) as f:
+        ...     records = iterparse_records(f, 'data.row')
+        ...     [r['district_name'] for r in records][:2]
+        ['Turkana', 'Marsabit']
+        >>> with fetch(get_path('ouseful.xml')) as f:
+        ...     records = iterparse_records(f, '/rss/channel/item')
+        ...     next(records)['guid']['content']
+        'http://blog.ouseful.info/?p=12065'
+    """
+    return RecordParser(path, xml, fields).iterparse(f)
+
+
+class Rewindable(object):
+    """A file like object that remembers everything read from it until
+    `rewind` is called, and then replays it.
+
+    Args:
+        f (obj): A file like object
+        limit (int): Maximum number of bytes to remember. Once more has been
+            read, everything is forgotten and `rewind` has no effect
+            (default: 1048576).
+
+    Examples:
+        >>> from io import BytesIO
+        >>>
+        >>> f = Rewindable(BytesIO(b'hello world'))
+        >>> f.read(5)
+        b'hello'
+        >>> f.rewind()
+        True
+        >>> f.read(8)
+        b'hello wo'
+        >>> f.read()
+        b'rld'
+        >>> f = Rewindable(BytesIO(b'hello world'), limit=4)
+        >>> f.read(5)
+        b'hello'
+        >>> f.rewind()
+        False
+        >>> f.read()
+        b' world'
+    """
+    def __init__(self, f, limit=2 ** 20):
+        self.f = f
+        self.limit = limit
+        self.chunks = []
+        self.size = 0
+        self.recording = True
+
+    def rewind(self):
+        """Replays everything read so far
+
+        Returns:
+            bool: False if more than `limit` bytes were read, i.e., nothing
+                will be replayed
+        """
+        rewound, self.recording = self.recording, False
+        return rewound
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+
+        if self.recording:
+            self.chunks.append(data)
+            self.size += len(data)
+
+            if self.size > self.limit:
+                self.recording, self.chunks = False, []
+        elif self.chunks:
+            data = data[:0].join(self.chunks + [data])
+            self.chunks = []
+
+            if size > -1:
+                self.chunks.append(data[size:]) if data[size:] else None
+                data = data[:size]
+
+        return data
+
+
+def json_records(f, path=None, fields=None):
+    """Lazily parse a JSON file, yielding each element of the array at `path`
+    as soon as it has been parsed. If `path` doesn't point to an array, its
+    value is yielded as the only record.
+
+    Args:
+        f (obj): A file like object
+        path (str): Dot separated path to the records (default: None, i.e.,
+            the entire document)
+
+        fields (Iter[str]): Only include these fields of each record
+            (default: None, i.e., include all fields)
+
+    Yields:
+        dict: record
+
+    Raises:
+        ValueError: If `path` isn't in the document
+
+    Examples:
+        >>> from io import BytesIO
+        >>> from riko import get_path
+        >>>
+        >>> with fetch(get_path('gigs.json')) as f:
+        ...     records = json_records(f, 'value.items')
+        ...     next(records)['title'] == 'Business System Analyst'
+        True
+        >>> with fetch(get_path('quote.json')) as f:
+        ...     sorted(next(json_records(f)))
+        ['list']
+        >>> content = '{"a": "%s", "b": [1, 2]}' % ('x' * 2 ** 21)
+        >>> list(json_records(BytesIO(content.encode('utf-8')), 'b'))
+        [1, 2]
+        >>> next(json_records(BytesIO(b'{"a": 1}'), 'b'))
+        Traceback (most recent call last):
+        ValueError: Path 'b' not found
+    """
+    prefix = path or ''
+    keys = get_projection(fields)
+    rewindable = Rewindable(f)
+
+    # peek at the value's type, then replay what was read so far so the
+    # (C) backend builds the records instead of `ijson.common`
+    events = ijson.parse(rewindable)
+    event = next((e for e in events if e[0] == prefix), None)
+
+    if not event:
+        raise ValueError("Path '%s' not found" % prefix)
+
+    array = event[1] == 'start_array'
+    nested = '%s.item' % prefix if prefix else 'item'
+    record_prefix = nested if array else prefix
+
+    if rewindable.rewind():
+        records = items(rewindable, record_prefix)
+    else:
+        # too much was read to replay it, so continue from the events
+        records = event_items(chain([event], events), record_prefix)
+
+    for record in records:
+        yield project(record, keys)
+
+
+def any2dict(f, ext='xml', html5=False, path=None, fields=None):
     path = path or ''
 
     if ext in {'xml', 'html'}:
@@ -204,9 +640,15 @@ def any2dict(f, ext='xml', html5=False, path=None):
         root = xml2etree(f, xml, html5).getroot()
         replaced = '/'.join(path.split('.'))
         tree = next(xpath(root, replaced)) if replaced else root
-        content = etree2dict(tree)
+        content = etree2dict(tree, fields)
     elif ext == 'json':
         content = next(items(f, path))
+        keys = get_projection(fields)
+
+        if hasattr(content, 'append'):
+            content = [project(c, keys) for c in content]
+        else:
+            content = project(content, keys)
     else:
         raise TypeError("Invalid file type: '%s'" % ext)
 
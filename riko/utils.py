@@ -36,6 +36,7 @@ from meza.compat import decode
 from meza.fntools import SleepyDict
 from riko import ENCODING
 from riko.cast import cast
+from riko.feeds import FeedEntry
 
 logger = gogo.Gogo(__name__, verbose=False, monolog=True).logger
 
@@ -57,6 +58,31 @@ def get_abspath(url):
     return decode(url)
 
 
+def get_local_path(url, encoding=ENCODING):
+    """Get the path of a local file that can be split on byte offsets
+
+    Args:
+        url (str): The url
+        encoding (str): The file encoding
+
+    Returns:
+        str: The file path (or None if `url` isn't a local file or the
+            encoding isn't ascii compatible)
+
+    Examples:
+        >>> from riko import get_path
+        >>>
+        >>> get_local_path(get_path('lorem.txt')).endswith('lorem.txt')
+        True
+        >>> get_local_path(get_path('lorem.txt'), 'utf-16')
+        >>> get_local_path('http://google.com')
+    """
+    abspath = get_abspath(url)
+    path = abspath[7:] if abspath.startswith('file://') else None
+    ascii_compatible = '\n,"'.encode(encoding) == b'\n,"'
+    return path if path and p.isfile(path) and ascii_compatible else None
+
+
 # https://trac.edgewall.org/ticket/2066#comment:1
 # http://stackoverflow.com/a/22675049/408556
 def make_blocking(f):
@@ -518,27 +544,74 @@ def multiplex(sources):
     return it.chain.from_iterable(sources)
 
 
-def gen_entries(parsed):
+def get_projection(fields):
+    """Get the top level keys of the items that `fields` refer to
+
+    Args:
+        fields (Iter[str]): Dot separated field names
+
+    Returns:
+        set: The keys (or None if `fields` is None, i.e., all keys)
+
+    Examples:
+        >>> sorted(get_projection(['title', 'author.name']))
+        ['author', 'author.name', 'title']
+    """
+    if fields is not None:
+        fields = set(fields)
+        return fields.union(field.split('.')[0] for field in fields)
+
+
+def project(item, keys=None):
+    """Remove the keys of an item that aren't in `keys`
+
+    Args:
+        item (dict): The item
+        keys (set): The keys to keep (default: None, i.e., all keys)
+
+    Examples:
+        >>> project({'title': 'Hi', 'link': 'x'}, {'title'})
+        {'title': 'Hi'}
+        >>> project('Hi', {'title'})
+        'Hi'
+    """
+    if keys is not None and hasattr(item, 'items'):
+        # only look up the values we keep
+        item = {k: item[k] for k in item if k in keys}
+
+    return item
+
+
+def gen_entries(parsed, fields=None):
+    """Provide parsed feed entries (with their Yahoo Pipes style aliases) as
+    `riko.feeds.FeedEntry` instances
+
+    Args:
+        parsed (dict): The parsed feed
+        fields (Iter[str]): Only include these fields in each entry (default:
+            None, i.e., include all fields)
+
+    Yields:
+        dict: entry
+
+    Examples:
+        >>> parsed = {'entries': [{'title': 'Hi', 'link': 'x'}]}
+        >>> next(gen_entries(parsed))['y:title']
+        'Hi'
+        >>> parsed = {'entries': [{'title': 'Hi', 'link': 'x'}]}
+        >>> next(gen_entries(parsed, ['y:title']))
+        {'y:title': 'Hi'}
+    """
     if parsed.get('bozo_exception'):
         raise Exception(parsed['bozo_exception'])
 
+    keys = get_projection(fields)
+
     for entry in parsed['entries']:
-        # prevent feedparser deprecation warnings
-        if 'published_parsed' in entry:
-            updated = entry['published_parsed']
-        else:
-            updated = entry.get('updated_parsed')
-
-        entry['pubDate'] = updated
-        entry['y:published'] = updated
-        entry['dc:creator'] = entry.get('author')
-        entry['author.uri'] = entry.get('author_detail', {}).get(
-            'href')
-        entry['author.name'] = entry.get('author_detail', {}).get(
-            'name')
-        entry['y:title'] = entry.get('title')
-        entry['y:id'] = entry.get('id')
-        yield entry
+        if not isinstance(entry, FeedEntry):
+            entry = FeedEntry(entry)
+
+        yield project(entry, keys)
 
 
 def gen_items(content, key=None):
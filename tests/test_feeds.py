@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# vim: sw=4:ts=4:expandtab
+"""
+tests.test_feeds
+~~~~~~~~~~~~~~~~
+
+Provides conformance tests comparing the lxml feed parser with feedparser.
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals)
+
+import nose.tools as nt
+import feedparser
+
+from glob import glob
+from os import path as p
+
+from builtins import *  # noqa # pylint: disable=unused-import
+from riko import get_path
+from riko.feeds import parse
+from riko.utils import fetch
+from riko.modules import strtransform, filter as _filter
+
+DATA_DIR = p.join(p.dirname(p.dirname(__file__)), 'riko', 'data')
+
+# feedparser sanitizes html, so only compare the fields it leaves alone
+KEYS = [
+    'title', 'link', 'id', 'guidislink', 'comments', 'author',
+    'author_detail', 'tags', 'published', 'published_parsed', 'updated',
+    'updated_parsed']
+
+
+def setup_module():
+    """site initialization"""
+    global initialized
+    initialized = True
+    print('Basic Module Setup\n')
+
+
+class TestFeeds(object):
+    def __init__(self):
+        self.cls_initialized = False
+
+    def _parse(self, name):
+        with fetch(get_path(name)) as f:
+            content = f.read()
+
+        entries = list(parse(content)['entries'])
+        expected = feedparser.parse(content)['entries']
+        return entries, expected
+
+    def _check_feed(self, name):
+        entries, expected = self._parse(name)
+        nt.assert_equal(len(entries), len(expected))
+
+        for entry, other in zip(entries, expected):
+            for key in KEYS:
+                # feedparser can't parse some of the (non RFC 822) dates we
+                # can
+                value = dict.get(other, key)
+
+                if value or not key.endswith('_parsed'):
+                    nt.assert_equal(entry.get(key), value, (name, key))
+
+            content = [c['value'] for c in other.get('content', [])]
+            nt.assert_equal(entry.get('content', [{}])[0].get('value'),
+                            content[0] if content else None)
+
+    def test_conformance(self):
+        """Tests that the bundled feeds parse the same as with feedparser
+        """
+        for path in sorted(glob(p.join(DATA_DIR, '*.xml'))):
+            yield self._check_feed, p.basename(path)
+
+    def test_atom(self):
+        """Tests parsing an atom feed
+        """
+        content = (
+            '<feed xmlns="http://www.w3.org/2005/Atom"><entry><title>a</title>'
+            '<id>urn:1</id><updated>2003-12-13T18:30:02Z</updated><author>'
+            '<name>Bob</name><email>bob@example.com</email></author>'
+            '<content type="xhtml"><div xmlns="http://www.w3.org/1999/xhtml">'
+            '<p>hi <b>there</b></p></div></content></entry></feed>')
+
+        entry = next(parse(content)['entries'])
+        nt.assert_equal(entry['link'], 'urn:1')
+        nt.assert_equal(entry['author'], 'Bob (bob@example.com)')
+        nt.assert_equal(entry['updated_parsed'][:4], (2003, 12, 13, 18))
+        nt.assert_equal(entry['summary'], '<p>hi <b>there</b></p>')
+
+    def test_rdf(self):
+        """Tests parsing an rdf feed
+        """
+        content = (
+            '<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" '
+            'xmlns="http://purl.org/rss/1.0/" '
+            'xmlns:dc="http://purl.org/dc/elements/1.1/"><channel />'
+            '<item rdf:about="http://x/1"><title>One</title><link>http://x/1'
+            '</link><dc:creator>Bob</dc:creator></item></rdf:RDF>')
+
+        entry = next(parse(content)['entries'])
+        nt.assert_equal(entry['title'], 'One')
+        nt.assert_equal(entry['id'], 'http://x/1')
+        nt.assert_equal(entry['author_detail'], {'name': 'Bob'})
+
+    def test_malformed(self):
+        """Tests that malformed feeds are handed off to feedparser
+        """
+        content = '<rss><channel><item><title>a & b</title></item></rss>'
+        nt.assert_true(parse(content)['bozo'])
+
+        # the error isn't found until after the first entry
+        content = '<rss><channel><item><title>a</title></item></rss>'
+        entries = parse(content)['entries']
+        nt.assert_equal(next(entries)['title'], 'a')
+        nt.assert_raises(Exception, next, entries)
+
+    def test_lazy_fields(self):
+        """Tests that pipes don't compute the derived fields of entries
+        """
+        content = (
+            '<rss><channel><item><title>a</title><pubDate>Mon, 11 May 2009 '
+            '22:10:01 +0100</pubDate></item></channel></rss>')
+
+        entry = next(parse(content)['entries'])
+        stored = dict.__len__(entry)
+        kwargs = {'field': 'title', 'assign': 'title'}
+        conf = {'rule': {'transform': 'upper'}}
+        item = next(strtransform.pipe(entry, conf=conf, **kwargs))
+        nt.assert_equal(dict.__len__(item), stored)
+
+        rule = {'field': 'title', 'op': 'is', 'value': 'A'}
+        item = next(_filter.pipe([item], conf={'rule': rule}))
+        nt.assert_equal(dict.__len__(item), stored)
+        nt.assert_equal(dict.__len__(entry), stored)
+
+        nt.assert_equal(item['title'], 'A')
+        nt.assert_equal(item['y:title'], 'a')
+        nt.assert_equal(item['pubDate'][:3], (2009, 5, 11))
+        nt.assert_equal(item.get('author.name'), None)
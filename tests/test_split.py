@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# vim: sw=4:ts=4:expandtab
+"""
+tests.test_split
+~~~~~~~~~~~~~~~~
+
+Provides tests guarding that the copies `split` creates stay isolated.
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals)
+
+import nose.tools as nt
+
+from copy import deepcopy
+
+from builtins import *  # noqa # pylint: disable=unused-import
+from riko.dotdict import DotDict
+from riko.modules import split, rename, strtransform, regex, subelement
+
+
+def setup_module():
+    """site initialization"""
+    global initialized
+    initialized = True
+    print('Basic Module Setup\n')
+
+
+class TestSplit(object):
+    def __init__(self):
+        self.cls_initialized = False
+
+    def test_isolation(self):
+        """Tests that nested writes to one split don't leak into the others
+        """
+        items = [
+            {'title': 'a', 'author': {'name': 'ann', 'uri': 'x'}},
+            {'title': 'b', 'author': {'name': 'bob', 'uri': 'y'}}]
+
+        original = deepcopy(items)
+        stream1, stream2 = split.pipe(items)
+
+        for item in stream1:
+            rule = {'field': 'author.name', 'newval': 'name'}
+            item = next(rename.pipe(item, conf={'rule': rule}))
+            item.delete('author.name')
+
+            conf = {'rule': {'transform': 'upper'}}
+            kwargs = {'field': 'author.uri', 'assign': 'author.uri'}
+            item = next(strtransform.pipe(item, conf=conf, **kwargs))
+            nt.assert_true(item['author.uri'].isupper())
+
+            sub = next(subelement.pipe(item, conf={'path': 'author'}))
+            sub['uri'] = 'z'
+            item.set('author.id', 1)
+            nt.assert_equal(sorted(item['author']), ['id', 'uri'])
+
+            rule = {'field': 'author.uri', 'match': '[A-Z]', 'replace': '_'}
+            item = next(regex.pipe(item, conf={'rule': rule}))
+            nt.assert_equal(item['author.uri'], '_')
+
+        nt.assert_equal(list(stream2), original)
+        nt.assert_equal(items, original)
+
+    def test_copy(self):
+        """Tests that `DotDict` copies don't share the nested dicts they set
+        """
+        item = DotDict({'author': {'name': 'ann', 'uri': 'x'}})
+        copied = item.copy()
+        copied.set('author.name', 'bob')
+        copied.delete('author.uri')
+        nt.assert_equal(item, {'author': {'name': 'ann', 'uri': 'x'}})
+        nt.assert_equal(copied, {'author': {'name': 'bob'}})